@@ -0,0 +1,162 @@
+# core/access.py
+"""
+Per-user authorization context.
+
+Every permission check in core.views comes down to three questions: what role
+does the user have, which classes do they teach, and which students are their
+children. AccessContext answers all three with plain attributes and sets, so a
+check such as "may this teacher see this student" is a set lookup instead of
+`hasattr(user, 'teacherprofile')` plus `user.class_teacher_of.all()` queries.
+
+The context is built with at most four small queries, cached per user in the
+default cache and memoized on the request. core.signals drops the cached entry
+whenever a profile, a class teacher assignment, a parent link or the user itself
+changes.
+"""
+from functools import wraps
+
+from django.contrib import messages
+from django.contrib.auth.decorators import login_required
+from django.contrib.auth.mixins import LoginRequiredMixin
+from django.core.cache import cache
+from django.db import transaction
+from django.shortcuts import redirect
+
+from .models import ParentProfile, SchoolClass, Student, TeacherProfile
+
+ACCESS_CACHE_TIMEOUT = 60 * 60 # Signals invalidate on change; the timeout only bounds stale entries
+ACCESS_CACHE_VERSION = 1 # Bump when the cached layout changes
+
+ROLE_PARENT = 'parent'
+ROLE_TEACHER = 'teacher'
+ROLE_STAFF = 'staff'
+
+
+class AccessContext:
+    """What one user may see; built by access_for(), never from request data."""
+    def __init__(self, user_id, is_staff=False, is_teacher=False, is_parent=False, class_ids=(), child_ids=()):
+        self.user_id = user_id
+        self.is_staff = is_staff
+        self.is_teacher = is_teacher   # Has a TeacherProfile
+        self.is_parent = is_parent     # Has a ParentProfile
+        self.class_ids = frozenset(class_ids) # Classes this user is class teacher of
+        self.child_ids = frozenset(child_ids) # Students this user is a parent of
+
+    @property
+    def role(self):
+        """Primary role, in the order dashboard_redirect has always used: parent, teacher, staff."""
+        if self.is_parent:
+            return ROLE_PARENT
+        if self.is_teacher:
+            return ROLE_TEACHER
+        if self.is_staff:
+            return ROLE_STAFF
+        return None
+
+    def teaches(self, class_id):
+        """Teacher assigned to this class (staff status does not count)."""
+        return self.is_teacher and class_id in self.class_ids
+
+    def can_manage_class(self, class_id):
+        """Staff, or the class teacher of this class."""
+        return self.is_staff or self.teaches(class_id)
+
+    def can_view_student(self, student):
+        """Same rules as the student profile: staff, a parent of the student, or their class teacher."""
+        if self.is_staff:
+            return True
+        if self.is_parent:
+            return student.pk in self.child_ids
+        return self.teaches(student.current_class_id)
+
+    def home_url_name(self):
+        """Where to send the user after a refused request."""
+        return {ROLE_PARENT: 'parent_dashboard', ROLE_TEACHER: 'teacher_dashboard'}.get(self.role, 'home')
+
+    def as_cache_value(self):
+        return (self.is_staff, self.is_teacher, self.is_parent, tuple(self.class_ids), tuple(self.child_ids))
+
+
+def _cache_key(user_id):
+    return f'core:access:{user_id}'
+
+
+def access_for(user):
+    """The AccessContext of a user, from the cache or built and cached."""
+    if not user.is_authenticated:
+        return AccessContext(None)
+    cached = cache.get(_cache_key(user.pk), version=ACCESS_CACHE_VERSION)
+    if cached is None:
+        context = AccessContext(
+            user.pk,
+            is_staff=user.is_staff,
+            is_teacher=TeacherProfile.objects.filter(user=user.pk).exists(),
+            is_parent=ParentProfile.objects.filter(user=user.pk).exists(),
+            class_ids=SchoolClass.objects.filter(class_teacher=user.pk).values_list('pk', flat=True),
+            child_ids=Student.parents.through.objects.filter(user=user.pk).values_list('student', flat=True),
+        )
+        cache.set(_cache_key(user.pk), context.as_cache_value(), ACCESS_CACHE_TIMEOUT, version=ACCESS_CACHE_VERSION)
+        return context
+    return AccessContext(user.pk, *cached)
+
+
+def invalidate(*user_ids):
+    """
+    Forget the cached context of these users (None entries are ignored). Deleted
+    now and again on commit, so a request that read the old rows before the
+    transaction committed cannot leave a stale entry behind.
+    """
+    keys = [_cache_key(user_id) for user_id in user_ids if user_id is not None]
+    if keys:
+        cache.delete_many(keys, version=ACCESS_CACHE_VERSION)
+        transaction.on_commit(lambda: cache.delete_many(keys, version=ACCESS_CACHE_VERSION))
+
+
+def request_access(request):
+    """The request's AccessContext, resolved once per request."""
+    if not hasattr(request, '_access'):
+        request._access = access_for(request.user)
+    return request._access
+
+
+# --- View helpers ---
+
+def with_access(roles=None, message="You do not have permission to access this page.", redirect_to='home'):
+    """
+    Decorator for function views: requires login, attaches `request.access` and,
+    when `roles` is given, refuses users without one of those roles
+    (with `message`, unless it is None, and a redirect to `redirect_to`).
+    """
+    def decorator(view):
+        @login_required
+        @wraps(view)
+        def wrapped(request, *args, **kwargs):
+            request.access = request_access(request)
+            if roles and not _has_any_role(request.access, roles):
+                if message:
+                    messages.error(request, message)
+                return redirect(redirect_to)
+            return view(request, *args, **kwargs)
+        return wrapped
+    return decorator
+
+
+class AccessMixin(LoginRequiredMixin):
+    """Class-based view counterpart of @with_access: set `access_roles` to restrict."""
+    access_roles = None
+    access_denied_message = "You do not have permission to access this page."
+    access_denied_redirect = 'home'
+
+    def dispatch(self, request, *args, **kwargs):
+        if not request.user.is_authenticated:
+            return self.handle_no_permission()
+        request.access = request_access(request)
+        if self.access_roles and not _has_any_role(request.access, self.access_roles):
+            messages.error(request, self.access_denied_message)
+            return redirect(self.access_denied_redirect)
+        return super().dispatch(request, *args, **kwargs)
+
+
+def _has_any_role(access, roles):
+    flags = {ROLE_PARENT: access.is_parent, ROLE_TEACHER: access.is_teacher, ROLE_STAFF: access.is_staff}
+    return any(flags[role] for role in roles)
@@ -7,8 +7,82 @@ from django.shortcuts import render # Add render
 from django.http import HttpResponseRedirect # Add redirect
 from .models import SchoolClass, Subject, TeacherProfile, ParentProfile, Student, Result, Announcement, AttendanceRecord, NewsArticle, NewsImage
 from import_export.admin import ImportExportModelAdmin # Import
-from .forms import AssignClassForm
+from .forms import AssignClassForm, ResultImportForm
 from .models import CarouselImage # Import the new model
+from django.core.exceptions import PermissionDenied
+from django.urls import path, reverse
+from django.utils import timezone
+from django.utils.html import format_html
+from django.db.models import Prefetch, Q
+from django.utils.dateparse import parse_date
+from . import jobs, result_import, search, tasks
+from .changelists import AutocompleteFilter, AutocompleteFilterMixin, LargeTableAdminMixin
+from .table_exports import ChunkedExportMixin
+from .models import Job
+
+# Selections / files larger than this are handled by a background job (manage.py run_jobs)
+ASSIGN_IN_BACKGROUND_OVER = 200 # students
+IMPORT_IN_BACKGROUND_OVER = 2000 # result rows
+
+# --- Full-text admin search (see core/search.py) ---
+class IndexedSearchMixin:
+    """
+    Search the changelist (and autocomplete) through the full-text index: every
+    word must start a word of the object's document. search_fields stays set
+    for the search box and autocomplete but is not used for matching.
+    """
+    search_kind = None
+
+    def get_search_results(self, request, queryset, search_term):
+        if not search_term.strip():
+            return queryset, False
+        return search.matching(queryset, self.search_kind, search_term), False
+
+
+def indexed_student_search(queryset, search_term, **extra):
+    """Rows of students matching `search_term` in the index, or matching any `extra` lookup."""
+    if not search_term.strip():
+        return queryset, False
+    condition = Q(student__in=search.matching(Student.objects.all(), search.STUDENT, search_term))
+    for lookup, value in extra.items():
+        condition |= Q(**{lookup: value})
+    return queryset.filter(condition), False
+
+
+# --- Sidebar filters for large tables (choices come from small tables, not a DISTINCT over the rows) ---
+class AcademicYearFilter(admin.SimpleListFilter):
+    title = 'academic year'
+    parameter_name = 'academic_year'
+
+    def lookups(self, request, model_admin):
+        years = SchoolClass.objects.order_by('-academic_year').values_list('academic_year', flat=True).distinct()
+        return [(year, year) for year in years]
+
+    def queryset(self, request, queryset):
+        if self.value():
+            return queryset.filter(current_class__academic_year=self.value())
+        return queryset
+
+
+class TermFilter(admin.SimpleListFilter):
+    title = 'term/exam'
+    parameter_name = 'term_exam_name'
+
+    def lookups(self, request, model_admin):
+        # Every term of any result (scored or not), skipping through result_term_idx one
+        # term at a time: a handful of index seeks instead of a DISTINCT over every result
+        terms = []
+        ordered = Result.objects.order_by('term_exam_name').values_list('term_exam_name', flat=True)
+        term = ordered.first()
+        while term is not None:
+            terms.append(term)
+            term = ordered.filter(term_exam_name__gt=term).first()
+        return [(term, term) for term in terms]
+
+    def queryset(self, request, queryset):
+        if self.value():
+            return queryset.filter(term_exam_name=self.value())
+        return queryset
 # --- Inline Admin for Profiles (to show on User page) ---
 
 class TeacherProfileInline(admin.StackedInline):
@@ -78,10 +152,14 @@ class SubjectAdmin(admin.ModelAdmin):
     search_fields = ('name',)
 
 @admin.register(Student)
-class StudentAdmin(admin.ModelAdmin):
+class StudentAdmin(LargeTableAdminMixin, IndexedSearchMixin, admin.ModelAdmin):
     list_display = ('student_id', 'full_name', 'current_class', 'display_parents')
+    list_select_related = ('current_class',)
+    keyset_ordering = ('-id',)
     search_fields = ('student_id', 'first_name', 'last_name', 'current_class__name', 'parents__username')
-    list_filter = ('current_class__academic_year', 'current_class__name')
+    search_kind = search.STUDENT
+    search_help_text = "Name, student ID, class or parent; word beginnings match (\"ann sm\" finds Anna Smith)."
+    list_filter = (AcademicYearFilter, 'current_class')
     autocomplete_fields = ['current_class', 'parents'] # Easier selection
     # --- ADD ADMIN ACTIONS ---
     actions = ['assign_to_class']
@@ -102,6 +180,11 @@ class StudentAdmin(admin.ModelAdmin):
     # --- End fieldsets ---
 
 
+    def get_queryset(self, request):
+        # display_parents: one query for the page's parents, not one per student
+        parents = User.objects.only('username', 'first_name', 'last_name')
+        return super().get_queryset(request).prefetch_related(Prefetch('parents', queryset=parents))
+
     def display_parents(self, obj):
         return ", ".join([parent.get_full_name() or parent.username for parent in obj.parents.all()])
     display_parents.short_description = 'Parents/Guardians'
@@ -114,8 +197,16 @@ class StudentAdmin(admin.ModelAdmin):
             form = AssignClassForm(request.POST)
             if form.is_valid():
                 school_class = form.cleaned_data['school_class']
-                # Update selected students
-                updated_count = queryset.update(current_class=school_class)
+                student_ids = list(queryset.values_list('pk', flat=True))
+                # Large selections move (and rebuild their classes' aggregates) in a background job
+                if len(student_ids) > ASSIGN_IN_BACKGROUND_OVER:
+                    job = jobs.enqueue('assign_students_to_class',
+                                       {'student_ids': student_ids, 'class_id': school_class.pk}, user=request.user)
+                    self.message_user(request, format_html(
+                        'Assigning {} students to class {} in the background. <a href="{}">Follow its progress</a>.',
+                        len(student_ids), school_class, reverse('job_status', args=[job.pk])), messages.INFO)
+                    return HttpResponseRedirect(request.get_full_path())
+                updated_count = tasks.move_students(student_ids, school_class)
                 # Display success message
                 self.message_user(request,
                                   f"Successfully assigned {updated_count} students to class {school_class}.",
@@ -138,17 +229,78 @@ class StudentAdmin(admin.ModelAdmin):
     # --- END ACTION FUNCTION ---
 
 @admin.register(Result)
-class ResultAdmin(ImportExportModelAdmin):
+class ResultAdmin(LargeTableAdminMixin, ChunkedExportMixin, ImportExportModelAdmin):
     list_display = ('student', 'subject', 'term_exam_name', 'score', 'grade', 'date_recorded', 'recorded_by')
-    search_fields = ('student__first_name', 'student__last_name', 'student__student_id', 'subject__name', 'term_exam_name')
-    list_filter = ('subject', 'term_exam_name', 'date_recorded', 'school_class', 'student', 'recorded_by')
+    list_select_related = ('student', 'subject', 'recorded_by')
+    keyset_ordering = ('-date_recorded', '-id')
+    search_fields = ('student__first_name', 'student__last_name', 'student__student_id', 'subject__name')
+    search_help_text = "Student name or ID, or an exact subject name."
+    list_filter = (
+        'subject', TermFilter, 'date_recorded', 'school_class',
+        ('student', AutocompleteFilter), ('recorded_by', AutocompleteFilter),
+    )
     autocomplete_fields = ['student', 'subject', 'school_class', 'recorded_by'] # Easier selection
     readonly_fields = ('date_recorded', 'last_updated') # Prevent manual editing
+    change_list_template = 'admin/core/result/change_list.html' # Adds "Bulk import"; import-export wraps it
+
+    def get_search_results(self, request, queryset, search_term):
+        # Students through the search index; the term itself has a list filter
+        subjects = Subject.objects.filter(name__iexact=search_term.strip())
+        return indexed_student_search(queryset, search_term, subject__in=subjects)
+
+    # --- BULK IMPORT (see core/result_import.py) ---
+    def get_urls(self):
+        urls = [
+            path('bulk-import/', self.admin_site.admin_view(self.bulk_import_view), name='core_result_bulk_import'),
+        ]
+        return urls + super().get_urls()
+
+    def bulk_import_view(self, request):
+        if not (self.has_add_permission(request) and self.has_change_permission(request)):
+            raise PermissionDenied
+        context = {
+            **self.admin_site.each_context(request),
+            'title': 'Bulk import results',
+            'opts': self.model._meta,
+        }
+
+        # Step 2: the user confirmed a previewed file; write the saved plan as-is
+        if request.method == 'POST' and 'confirm' in request.POST:
+            token = request.POST.get('token', '')
+            try:
+                rows = result_import.load_plan(token, discard=False)
+            except result_import.ResultImportError as e:
+                self.message_user(request, str(e), messages.ERROR)
+                return HttpResponseRedirect(request.path)
+            # Large files are written by a background job (which carries the rows); the page follows its progress
+            if len(rows) > IMPORT_IN_BACKGROUND_OVER:
+                job = jobs.enqueue('import_results', {'rows': rows}, user=request.user)
+                result_import.discard_plan(token)
+                return HttpResponseRedirect(reverse('job_status', args=[job.pk]))
+            count = result_import.apply_rows(rows, recorded_by=request.user)
+            result_import.discard_plan(token)
+            self.message_user(request, f"Imported {count} results.", messages.SUCCESS)
+            return HttpResponseRedirect(reverse('admin:core_result_changelist'))
+
+        # Step 1: validate the upload and show a preview
+        form = ResultImportForm(request.POST or None, request.FILES or None)
+        if request.method == 'POST' and form.is_valid():
+            try:
+                plan = result_import.plan_import(form.cleaned_data['import_file'])
+            except result_import.ResultImportError as e:
+                form.add_error('import_file', str(e))
+            else:
+                if plan.is_valid and plan.rows:
+                    result_import.save_plan(plan)
+                context['plan'] = plan
+        context['form'] = form
+        return render(request, 'admin/core/result/bulk_import.html', context)
+    # --- END BULK IMPORT ---
 
 # Direct ModelAdmin for TeacherProfile (optional)
 # Uncomment if you want to manage TeacherProfile separately
 @admin.register(TeacherProfile)
-class TeacherProfileAdmin(ImportExportModelAdmin):
+class TeacherProfileAdmin(ChunkedExportMixin, ImportExportModelAdmin):
      list_display = ('user',)
      search_fields = (
          'user__username',
@@ -158,7 +310,7 @@ class TeacherProfileAdmin(ImportExportModelAdmin):
 
 # Direct ModelAdmin for ParentProfile
 @admin.register(ParentProfile)
-class ParentProfileAdmin(ImportExportModelAdmin):
+class ParentProfileAdmin(ChunkedExportMixin, ImportExportModelAdmin):
     list_display = ('user',)
     search_fields = (
         'user__username',
@@ -168,10 +320,12 @@ class ParentProfileAdmin(ImportExportModelAdmin):
 
 # Register Announcement model
 @admin.register(Announcement)
-class AnnouncementAdmin(admin.ModelAdmin):
+class AnnouncementAdmin(AutocompleteFilterMixin, IndexedSearchMixin, admin.ModelAdmin):
     list_display = ('title', 'posted_by', 'timestamp')
-    list_filter = ('timestamp', 'posted_by')
+    list_select_related = ('posted_by',)
+    list_filter = ('timestamp', ('posted_by', AutocompleteFilter))
     search_fields = ('title', 'content', 'posted_by__username')
+    search_kind = search.ANNOUNCEMENT
     readonly_fields = ('timestamp',) # Timestamp is auto-set
 
     # Auto-set posted_by to current user when adding in admin
@@ -182,13 +336,19 @@ class AnnouncementAdmin(admin.ModelAdmin):
 
 # Register AttendanceRecord models
 @admin.register(AttendanceRecord)
-class AttendanceAdmin(admin.ModelAdmin):
+class AttendanceAdmin(LargeTableAdminMixin, admin.ModelAdmin):
     list_display = ('student', 'date', 'status', 'school_class', 'recorded_by')
-    list_filter = ('date', 'status', 'school_class', 'student__current_class') # Filter by status, class, etc.
+    list_select_related = ('student', 'school_class', 'recorded_by')
+    keyset_ordering = ('-date', '-id')
+    list_filter = ('date', 'status', 'school_class', ('student', AutocompleteFilter)) # Filter by status, class, etc.
     search_fields = ('student__first_name', 'student__last_name', 'student__student_id', 'date')
+    search_help_text = "Student name or ID, or a date (YYYY-MM-DD)."
     autocomplete_fields = ['student', 'recorded_by', 'school_class']
     list_editable = ('status',) # Allow quick status changes in the list view
-    date_hierarchy = 'date' # Add date navigation
+
+    def get_search_results(self, request, queryset, search_term):
+        day = parse_date(search_term.strip()) if search_term.strip() else None
+        return indexed_student_search(queryset, search_term, **({'date': day} if day else {}))
 
     # Limit student choices based on selected class (optional improvement)
     # def formfield_for_foreignkey(self, db_field, request, **kwargs):
@@ -212,10 +372,11 @@ class NewsImageInline(admin.StackedInline): # Or admin.TabularInline for more co
 
 # --- Admin for News Articles ---
 @admin.register(NewsArticle)
-class NewsArticleAdmin(admin.ModelAdmin):
+class NewsArticleAdmin(IndexedSearchMixin, admin.ModelAdmin):
     list_display = ('title', 'published_date', 'author', 'created_at')
     list_filter = ('published_date', 'author')
     search_fields = ('title', 'content')
+    search_kind = search.NEWS
     inlines = [NewsImageInline] # Add the image inline here
     readonly_fields = ('created_at', 'updated_at')
 
@@ -231,4 +392,22 @@ class NewsArticleAdmin(admin.ModelAdmin):
 # Optionally register NewsImage separately if needed (usually not necessary with inline)
 # @admin.register(NewsImage)
 # class NewsImageAdmin(admin.ModelAdmin):
-#     list_display = ('article', 'caption', 'order')
\ No newline at end of file
+#     list_display = ('article', 'caption', 'order')
+
+# --- Background jobs (read-only; queued by the site and run by manage.py run_jobs) ---
+@admin.register(Job)
+class JobAdmin(admin.ModelAdmin):
+    list_display = ('id', 'kind', 'status', 'created_by', 'attempts', 'created_at', 'finished_at')
+    list_filter = ('status', 'kind')
+    list_select_related = ('created_by',)
+    readonly_fields = [field.name for field in Job._meta.fields]
+    actions = ['retry_jobs']
+
+    def has_add_permission(self, request):
+        return False
+
+    @admin.action(description='Retry selected failed jobs')
+    def retry_jobs(self, request, queryset):
+        count = queryset.filter(status='failed').update(
+            status='queued', attempts=0, run_after=timezone.now(), started_at=None, finished_at=None, message='')
+        self.message_user(request, f"Queued {count} jobs again.", messages.SUCCESS)
@@ -0,0 +1,210 @@
+# core/aggregates.py
+"""
+Maintenance of the materialized gradebook aggregates.
+
+StudentTermAggregate and ClassTermSubjectAggregate hold the running sum and count
+of scored results. Rather than applying +/- deltas (which drift if a write is ever
+missed), every change recomputes just the affected keys from the Result table:
+a handful of indexed rows per key, in one grouped query per table.
+
+Keys:
+- student key: (student_id, term_exam_name)
+- class key:   (class_id, term_exam_name, subject_id), where class_id is the
+               student's *current* class, matching SchoolClass.term_subject_averages.
+"""
+from django.db.models import Count, Q, Sum
+
+from .models import ClassTermSubjectAggregate, Result, Student, StudentTermAggregate
+
+UPSERT_BATCH_SIZE = 1000
+# Students refreshed per round trip, keeps IN (...) lists under backend parameter limits
+REFRESH_CHUNK_SIZE = 500
+# Stale keys deleted per statement: each key is one OR term, and SQLite caps expression depth at 1000
+DELETE_BATCH_SIZE = 200
+
+
+def refresh_student_terms(keys):
+    """Recompute the StudentTermAggregate rows for the given (student_id, term) keys."""
+    keys = set(keys)
+    if not keys:
+        return
+    totals = Result.objects.filter(
+        student__in={student_id for student_id, _ in keys},
+        term_exam_name__in={term for _, term in keys},
+        score__isnull=False
+    ).values('student', 'term_exam_name').annotate(
+        score_sum=Sum('score'), score_count=Count('score')
+    ).order_by()
+    totals = {(row['student'], row['term_exam_name']): row for row in totals}
+
+    to_save = [
+        StudentTermAggregate(
+            student_id=student_id, term_exam_name=term,
+            score_sum=totals[student_id, term]['score_sum'],
+            score_count=totals[student_id, term]['score_count'],
+        )
+        for student_id, term in keys if (student_id, term) in totals
+    ]
+    _upsert(StudentTermAggregate, to_save, ['student', 'term_exam_name'])
+    _delete_keys(StudentTermAggregate, ('student_id', 'term_exam_name'), keys - totals.keys())
+
+
+def refresh_class_subjects(keys):
+    """Recompute the ClassTermSubjectAggregate rows for the given (class_id, term, subject_id) keys."""
+    keys = {key for key in keys if key[0] is not None} # Students without a class have no class row
+    if not keys:
+        return
+    totals = Result.objects.filter(
+        student__current_class__in={class_id for class_id, _, _ in keys},
+        term_exam_name__in={term for _, term, _ in keys},
+        subject__in={subject_id for _, _, subject_id in keys},
+        score__isnull=False
+    ).values('student__current_class', 'term_exam_name', 'subject').annotate(
+        score_sum=Sum('score'), score_count=Count('score')
+    ).order_by()
+    totals = {(row['student__current_class'], row['term_exam_name'], row['subject']): row for row in totals}
+
+    to_save = [
+        ClassTermSubjectAggregate(
+            school_class_id=class_id, term_exam_name=term, subject_id=subject_id,
+            score_sum=totals[class_id, term, subject_id]['score_sum'],
+            score_count=totals[class_id, term, subject_id]['score_count'],
+        )
+        for class_id, term, subject_id in keys if (class_id, term, subject_id) in totals
+    ]
+    _upsert(ClassTermSubjectAggregate, to_save, ['school_class', 'term_exam_name', 'subject'])
+    _delete_keys(ClassTermSubjectAggregate, ('school_class_id', 'term_exam_name', 'subject_id'), keys - totals.keys())
+
+
+def refresh_for_results(result_keys):
+    """
+    Refresh both aggregate tables for a batch of (student_id, term_exam_name, subject_id)
+    keys, e.g. after a bulk import or a single save/delete.
+    """
+    by_student = {}
+    for student_id, term, subject_id in result_keys:
+        by_student.setdefault(student_id, set()).add((term, subject_id))
+    student_ids = sorted(by_student)
+    for start in range(0, len(student_ids), REFRESH_CHUNK_SIZE):
+        chunk = student_ids[start:start + REFRESH_CHUNK_SIZE]
+        class_of = dict(Student.objects.filter(pk__in=chunk).values_list('pk', 'current_class'))
+        refresh_student_terms(
+            (student_id, term) for student_id in chunk for term, _ in by_student[student_id]
+        )
+        refresh_class_subjects(
+            (class_of.get(student_id), term, subject_id)
+            for student_id in chunk for term, subject_id in by_student[student_id]
+        )
+
+
+def refresh_for_student_move(student_id, class_ids):
+    """A student changed class: their scores leave one class's rows and join another's."""
+    keys = set(
+        Result.objects.filter(student=student_id, score__isnull=False)
+        .values_list('term_exam_name', 'subject').distinct()
+    )
+    refresh_class_subjects(
+        (class_id, term, subject_id) for class_id in class_ids for term, subject_id in keys
+    )
+
+
+def compute_class_aggregates(class_id):
+    """
+    Live aggregates for one class partition, straight from Result:
+    the class rows plus the student rows for students currently in the class.
+    Returns (student_totals, class_totals) as {key: (score_sum, score_count)} dicts.
+    """
+    scored = Result.objects.filter(student__current_class=class_id, score__isnull=False)
+    student_totals = {
+        (row['student'], row['term_exam_name']): (row['score_sum'], row['score_count'])
+        for row in scored.values('student', 'term_exam_name').annotate(
+            score_sum=Sum('score'), score_count=Count('score')).order_by()
+    }
+    class_totals = {}
+    if class_id is not None:
+        class_totals = {
+            (class_id, row['term_exam_name'], row['subject']): (row['score_sum'], row['score_count'])
+            for row in scored.values('term_exam_name', 'subject').annotate(
+                score_sum=Sum('score'), score_count=Count('score')).order_by()
+        }
+    return student_totals, class_totals
+
+
+def stored_class_aggregates(class_id):
+    """The materialized counterpart of compute_class_aggregates(), read from the aggregate tables."""
+    student_totals = {
+        (student_id, term): (score_sum, score_count)
+        for student_id, term, score_sum, score_count in StudentTermAggregate.objects.filter(
+            student__current_class=class_id
+        ).values_list('student', 'term_exam_name', 'score_sum', 'score_count')
+    }
+    class_totals = {}
+    if class_id is not None:
+        class_totals = {
+            (class_id, term, subject_id): (score_sum, score_count)
+            for term, subject_id, score_sum, score_count in ClassTermSubjectAggregate.objects.filter(
+                school_class=class_id
+            ).values_list('term_exam_name', 'subject', 'score_sum', 'score_count')
+        }
+    return student_totals, class_totals
+
+
+def rebuild_class(class_id):
+    """
+    Rebuild every aggregate row in one class partition from scratch.
+    `class_id=None` rebuilds the student rows of students without a class.
+    Returns the number of rows written.
+    """
+    student_totals, class_totals = compute_class_aggregates(class_id)
+
+    StudentTermAggregate.objects.filter(student__current_class=class_id).delete()
+    _upsert(StudentTermAggregate, [
+        StudentTermAggregate(student_id=student_id, term_exam_name=term, score_sum=score_sum, score_count=score_count)
+        for (student_id, term), (score_sum, score_count) in student_totals.items()
+    ], ['student', 'term_exam_name'])
+
+    if class_id is not None:
+        ClassTermSubjectAggregate.objects.filter(school_class=class_id).delete()
+        _upsert(ClassTermSubjectAggregate, [
+            ClassTermSubjectAggregate(school_class_id=cid, term_exam_name=term, subject_id=subject_id,
+                                      score_sum=score_sum, score_count=score_count)
+            for (cid, term, subject_id), (score_sum, score_count) in class_totals.items()
+        ], ['school_class', 'term_exam_name', 'subject'])
+    return len(student_totals) + len(class_totals)
+
+
+def verify_class(class_id, tolerance=1e-6):
+    """
+    Compare the stored aggregates of one class partition against a live recomputation.
+    Returns a list of (table, key, stored, expected) mismatches; empty means consistent.
+    """
+    expected_students, expected_classes = compute_class_aggregates(class_id)
+    stored_students, stored_classes = stored_class_aggregates(class_id)
+    mismatches = []
+    for table, expected, stored in (
+        ('student', expected_students, stored_students),
+        ('class', expected_classes, stored_classes),
+    ):
+        for key in expected.keys() | stored.keys():
+            want, have = expected.get(key), stored.get(key)
+            if want is None or have is None or want[1] != have[1] or abs(want[0] - have[0]) > tolerance:
+                mismatches.append((table, key, have, want))
+    return mismatches
+
+
+def _upsert(model, objs, unique_fields):
+    if objs:
+        model.objects.bulk_create(
+            objs, batch_size=UPSERT_BATCH_SIZE, update_conflicts=True,
+            unique_fields=unique_fields, update_fields=['score_sum', 'score_count'],
+        )
+
+
+def _delete_keys(model, fields, keys):
+    """Delete rows whose key no longer has any scored results."""
+    keys = list(keys)
+    for start in range(0, len(keys), DELETE_BATCH_SIZE):
+        condition = Q()
+        for key in keys[start:start + DELETE_BATCH_SIZE]:
+            condition |= Q(**dict(zip(fields, key)))
+        model.objects.filter(condition).delete()
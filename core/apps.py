@@ -0,0 +1,15 @@
+# core/apps.py
+from django.apps import AppConfig
+
+
+class CoreConfig(AppConfig):
+    default_auto_field = 'django.db.models.BigAutoField'
+    name = 'core'
+
+    def ready(self):
+        # Connect the signal handlers that keep derived data in sync
+        from . import signals  # noqa: F401
+        # Register the background job tasks (core/jobs.py)
+        from . import tasks  # noqa: F401
+        # Apply the database tuning profile to new connections (core/db_tuning.py)
+        from . import db_tuning  # noqa: F401
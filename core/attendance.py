@@ -0,0 +1,184 @@
+# core/attendance.py
+"""
+Saving attendance registers.
+
+A register (one class, one or more days) is written with a single
+INSERT ... ON CONFLICT (student, date) DO UPDATE statement. Two teachers or
+two browser tabs saving the same register at once therefore cannot trip the
+unique constraint, and on SQLite the write lock is held only for that
+statement and the rollup refresh, never across the read of the register.
+
+It also maintains AttendanceDailySummary, the per-(class, date) rollup of
+status counts. As with the gradebook aggregates, a change recomputes only the
+affected (class, date) keys from AttendanceRecord instead of applying deltas.
+"""
+from datetime import datetime, timedelta
+
+from django.db import transaction
+from django.db.models import Count, Q, Sum
+
+from . import attendance_bitmap
+from .models import AttendanceDailySummary, AttendanceRecord
+
+STATUS_VALUES = {value for value, _ in AttendanceRecord.STATUS_CHOICES}
+UPSERT_BATCH_SIZE = 1000
+# Stale keys deleted per statement: each key is one OR term, and SQLite caps expression depth at 1000
+DELETE_BATCH_SIZE = 200
+# Rollup column for each status
+COUNT_FIELDS = {
+    'PRESENT': 'present_count',
+    'ABSENT': 'absent_count',
+    'LATE': 'late_count',
+    'EXCUSED': 'excused_count',
+}
+SCHOOL_DAYS_PER_WEEK = 5 # Monday to Friday
+
+
+def existing_register(school_class, dates):
+    """{(student_id, date): (status, notes)} for a class over the given dates, in one query."""
+    return {
+        (student_id, day): (status, notes)
+        for student_id, day, status, notes in AttendanceRecord.objects.filter(
+            school_class=school_class, date__in=list(dates)
+        ).values_list('student_id', 'date', 'status', 'notes')
+    }
+
+
+def save_register(school_class, entries, recorded_by=None, existing=None):
+    """
+    Upsert attendance for one class. `entries` maps (student_id, date) to
+    (status, notes); when `existing` (from existing_register) is given, cells that
+    did not change are skipped. Returns the number of records written.
+    Raises ValueError for an unknown status before anything is written.
+    """
+    existing = existing or {}
+    records = []
+    for (student_id, day), (status, notes) in entries.items():
+        if status not in STATUS_VALUES:
+            raise ValueError(f"Unknown attendance status '{status}'.")
+        if existing.get((student_id, day)) == (status, notes):
+            continue
+        records.append(AttendanceRecord(
+            student_id=student_id, date=day, status=status, notes=notes,
+            recorded_by=recorded_by, school_class=school_class,
+        ))
+    if records:
+        # A record filed under another class (student moved) is taken over by this one;
+        # that class's rollup for the day must be refreshed too. Usually returns nothing.
+        keys = {(school_class.pk, record.date) for record in records}
+        keys.update(AttendanceRecord.objects.filter(
+            student__in={record.student_id for record in records},
+            date__in={record.date for record in records},
+            school_class__isnull=False,
+        ).exclude(school_class=school_class).values_list('school_class', 'date'))
+        with transaction.atomic():
+            # One statement per batch: bulk_create does not send signals, so refresh the rollup here
+            AttendanceRecord.objects.bulk_create(
+                records,
+                batch_size=UPSERT_BATCH_SIZE,
+                update_conflicts=True,
+                unique_fields=['student', 'date'],
+                update_fields=['status', 'notes', 'recorded_by', 'school_class', 'timestamp'],
+            )
+            refresh_daily_summaries(keys)
+            attendance_bitmap.refresh_for_records((record.student_id, record.date) for record in records)
+    return len(records)
+
+
+def week_dates(day):
+    """The school days (Monday to Friday) of the week containing `day`."""
+    monday = day - timedelta(days=day.weekday())
+    return [monday + timedelta(days=offset) for offset in range(SCHOOL_DAYS_PER_WEEK)]
+
+
+# --- Daily rollup (AttendanceDailySummary) ---
+
+def status_counts():
+    """Conditional counts of AttendanceRecord rows per status, for .annotate()/.aggregate()."""
+    return {field: Count('pk', filter=Q(status=status)) for status, field in COUNT_FIELDS.items()}
+
+
+def empty_counts():
+    return {field: 0 for field in COUNT_FIELDS.values()}
+
+
+def refresh_daily_summaries(keys):
+    """Recompute the AttendanceDailySummary rows for the given (class_id, date) keys."""
+    keys = {
+        # AttendanceRecord.date defaults to timezone.now, so an unsaved default is a datetime
+        (class_id, day.date() if isinstance(day, datetime) else day)
+        for class_id, day in keys
+        if class_id is not None # Records without a class are not rolled up
+    }
+    if not keys:
+        return
+    totals = {
+        (row.pop('school_class'), row.pop('date')): row
+        for row in AttendanceRecord.objects.filter(
+            school_class__in={class_id for class_id, _ in keys},
+            date__in={day for _, day in keys},
+        ).values('school_class', 'date').annotate(**status_counts()).order_by()
+    }
+    _upsert([
+        AttendanceDailySummary(school_class_id=class_id, date=day, **totals[class_id, day])
+        for class_id, day in keys if (class_id, day) in totals
+    ])
+    stale = list(keys - totals.keys())
+    for start in range(0, len(stale), DELETE_BATCH_SIZE):
+        condition = Q()
+        for class_id, day in stale[start:start + DELETE_BATCH_SIZE]:
+            condition |= Q(school_class_id=class_id, date=day)
+        AttendanceDailySummary.objects.filter(condition).delete()
+
+
+def compute_class_summaries(class_id):
+    """Live {date: counts} for one class, straight from AttendanceRecord."""
+    return {
+        row.pop('date'): row
+        for row in AttendanceRecord.objects.filter(school_class=class_id)
+        .values('date').annotate(**status_counts()).order_by()
+    }
+
+
+def stored_class_summaries(class_id):
+    """The rollup counterpart of compute_class_summaries()."""
+    return {
+        row.pop('date'): row
+        for row in AttendanceDailySummary.objects.filter(school_class=class_id)
+        .values('date', *COUNT_FIELDS.values())
+    }
+
+
+def rebuild_class_summaries(class_id):
+    """Rebuild every rollup row of one class from scratch; returns the number of rows written."""
+    totals = compute_class_summaries(class_id)
+    AttendanceDailySummary.objects.filter(school_class=class_id).delete()
+    _upsert([AttendanceDailySummary(school_class_id=class_id, date=day, **counts) for day, counts in totals.items()])
+    return len(totals)
+
+
+def verify_class_summaries(class_id):
+    """(table, key, stored, expected) for every rollup row of one class that is out of date."""
+    expected, stored = compute_class_summaries(class_id), stored_class_summaries(class_id)
+    return [
+        ('attendance', (class_id, day), stored.get(day), expected.get(day))
+        for day in expected.keys() | stored.keys() if stored.get(day) != expected.get(day)
+    ]
+
+
+def class_range_summaries(class_ids, start_date, end_date):
+    """{class_id: counts} summed over a date range, read from the rollup (one row per class and day)."""
+    summaries = {class_id: empty_counts() for class_id in class_ids}
+    for row in AttendanceDailySummary.objects.filter(
+        school_class__in=class_ids, date__range=(start_date, end_date)
+    ).values('school_class').annotate(**{field: Sum(field) for field in COUNT_FIELDS.values()}).order_by():
+        summaries[row.pop('school_class')] = row
+    return summaries
+
+
+def _upsert(summaries):
+    if summaries:
+        AttendanceDailySummary.objects.bulk_create(
+            summaries, batch_size=UPSERT_BATCH_SIZE, update_conflicts=True,
+            unique_fields=['school_class', 'date'], update_fields=list(COUNT_FIELDS.values()),
+        )
@@ -0,0 +1,286 @@
+# core/attendance_bitmap.py
+"""
+Compact per-student attendance history.
+
+StudentAttendanceYear packs one academic year of a student's attendance into a
+138-byte bitmap: 3 bits per calendar day since the start of the academic year
+(0 = not recorded, then one code per status). It is rebuilt from
+AttendanceRecord for every affected (student, year) whenever attendance is saved,
+so it never drifts, and lets the profile, dashboards and reports read one small
+row per student-year instead of ~190 record rows.
+
+Counting uses whole-bitmap integer operations (SWAR): a bitmap is read as one
+Python int, every day matching a status is isolated with a few shifts and masks,
+and int.bit_count() counts them. That is the vectorised path for the
+whole-school report; NumPy is not a dependency of this project and is not needed.
+"""
+from datetime import date, timedelta
+
+from django.conf import settings
+from django.db.models import Q
+
+from .models import AttendanceRecord, StudentAttendanceYear
+
+BITS_PER_DAY = 3
+DAYS_PER_YEAR = 366
+BITMAP_BYTES = (DAYS_PER_YEAR * BITS_PER_DAY + 7) // 8
+UPSERT_BATCH_SIZE = 1000
+REFRESH_CHUNK_SIZE = 500
+
+STATUS_CODES = {'PRESENT': 1, 'ABSENT': 2, 'LATE': 3, 'EXCUSED': 4}
+CODE_STATUSES = {code: status for status, code in STATUS_CODES.items()}
+ATTENDED = ('PRESENT', 'LATE')
+ABSENCES = ('ABSENT', 'EXCUSED') # Chronic absence counts excused days too
+
+# Lowest bit of every day slot: 0b...001001001
+_LOW_BITS = sum(1 << (BITS_PER_DAY * index) for index in range(DAYS_PER_YEAR))
+
+
+# --- Calendar ---
+
+def academic_year_of(day):
+    """Academic years are named by the calendar year they start in."""
+    start_month = getattr(settings, 'ACADEMIC_YEAR_START_MONTH', 9)
+    return day.year if day.month >= start_month else day.year - 1
+
+
+def year_start(year):
+    return date(year, getattr(settings, 'ACADEMIC_YEAR_START_MONTH', 9), 1)
+
+
+def years_between(start_date, end_date):
+    return range(academic_year_of(start_date), academic_year_of(end_date) + 1)
+
+
+# --- Encoding ---
+
+def encode(codes_by_index):
+    """{day index: status code} -> bitmap bytes."""
+    packed = 0
+    for index, code in codes_by_index.items():
+        packed |= code << (BITS_PER_DAY * index)
+    return packed.to_bytes(BITMAP_BYTES, 'little')
+
+
+class AttendanceYear:
+    """Read-only view over one stored bitmap."""
+    def __init__(self, year, bitmap):
+        self.year = year
+        self.start = year_start(year)
+        self.packed = int.from_bytes(bytes(bitmap), 'little')
+
+    def counts(self, start_date=None, end_date=None):
+        """{'present_count', 'absent_count', 'late_count', 'excused_count'} within the range."""
+        masked = self.packed & self._range_mask(start_date, end_date)
+        return {f'{status.lower()}_count': _count_code(masked, code) for status, code in STATUS_CODES.items()}
+
+    def days(self, start_date=None, end_date=None):
+        """(date, status or None) for every calendar day of the year within the range."""
+        first, last = self._range_indexes(start_date, end_date)
+        for index in range(first, last):
+            code = (self.packed >> (BITS_PER_DAY * index)) & 0b111
+            yield self.start + timedelta(days=index), CODE_STATUSES.get(code)
+
+    def _range_indexes(self, start_date, end_date):
+        first = max(0, (start_date - self.start).days) if start_date else 0
+        last = min(DAYS_PER_YEAR, (end_date - self.start).days + 1) if end_date else DAYS_PER_YEAR
+        return first, max(first, last)
+
+    def _range_mask(self, start_date, end_date):
+        first, last = self._range_indexes(start_date, end_date)
+        return (1 << (BITS_PER_DAY * last)) - (1 << (BITS_PER_DAY * first))
+
+
+def _count_code(packed, code):
+    """Number of day slots in `packed` holding exactly `code`, without unpacking."""
+    matches = _LOW_BITS
+    for bit in range(BITS_PER_DAY):
+        plane = (packed >> bit) & _LOW_BITS
+        matches &= plane if code >> bit & 1 else _LOW_BITS ^ plane
+    return matches.bit_count()
+
+
+# --- Reading ---
+
+def load_years(student_ids, years):
+    """{(student_id, year): AttendanceYear} in one query."""
+    return {
+        (student_id, year): AttendanceYear(year, bitmap)
+        for student_id, year, bitmap in StudentAttendanceYear.objects.filter(
+            student__in=student_ids, academic_year__in=list(years)
+        ).values_list('student', 'academic_year', 'statuses')
+    }
+
+
+def empty_counts():
+    return {f'{status.lower()}_count': 0 for status in STATUS_CODES}
+
+
+def range_counts(student_ids, start_date, end_date):
+    """{student_id: status counts} over a date range (any length), one query for all students."""
+    totals = {student_id: empty_counts() for student_id in student_ids}
+    for (student_id, _), history in load_years(student_ids, years_between(start_date, end_date)).items():
+        for field, count in history.counts(start_date, end_date).items():
+            totals[student_id][field] += count
+    return totals
+
+
+def streaks(history, until=None):
+    """
+    Recorded school days only (weekends and holidays have no record and are skipped):
+    - current: consecutive attended days ending at the latest recorded day up to `until`
+    - longest_absence: longest run of consecutive absences in the year
+    """
+    current = longest_absence = absence_run = 0
+    for _, status in history.days(end_date=until):
+        if status is None:
+            continue
+        if status in ATTENDED:
+            current += 1
+            absence_run = 0
+        else:
+            current = 0
+            absence_run += 1
+            longest_absence = max(longest_absence, absence_run)
+    return {'current': current, 'longest_absence': longest_absence}
+
+
+def attendance_rate(counts):
+    """Percentage of recorded days attended (present or late), or None if nothing is recorded."""
+    recorded = sum(counts.values())
+    if not recorded:
+        return None
+    return round(100 * (counts['present_count'] + counts['late_count']) / recorded, 1)
+
+
+def heatmap(history, until=None):
+    """
+    Calendar weeks (Monday first) of (date, status) cells from the start of the year
+    to `until`; days outside that span have the status 'outside'.
+    """
+    last = until or history.start + timedelta(days=DAYS_PER_YEAR - 1)
+    statuses = dict(history.days(end_date=last))
+    weeks = []
+    monday = history.start - timedelta(days=history.start.weekday())
+    while monday <= last:
+        week = []
+        for offset in range(7):
+            day = monday + timedelta(days=offset)
+            week.append((day, statuses.get(day) if history.start <= day <= last else 'outside'))
+        weeks.append(week)
+        monday += timedelta(days=7)
+    return weeks
+
+
+def school_absence_rates(year, threshold=10.0):
+    """
+    Whole-school chronic absence for one academic year in one pass over the bitmaps:
+    a list of dicts (student fields, recorded, absences, rate) for students whose
+    absence rate is at least `threshold` percent, worst first.
+    """
+    flagged = []
+    rows = StudentAttendanceYear.objects.filter(academic_year=year).values_list(
+        'student', 'student__student_id', 'student__first_name', 'student__last_name',
+        'student__current_class__name', 'statuses',
+    )
+    absence_codes = [STATUS_CODES[status] for status in ABSENCES]
+    for student_id, code, first_name, last_name, class_name, bitmap in rows.iterator(chunk_size=2000):
+        packed = int.from_bytes(bytes(bitmap), 'little')
+        recorded = ((packed | packed >> 1 | packed >> 2) & _LOW_BITS).bit_count()
+        if not recorded:
+            continue
+        absences = sum(_count_code(packed, absence_code) for absence_code in absence_codes)
+        rate = 100 * absences / recorded
+        if rate >= threshold:
+            flagged.append({
+                'student_id': student_id, 'code': code, 'name': f'{first_name} {last_name}',
+                'class_name': class_name, 'recorded': recorded, 'absences': absences, 'rate': round(rate, 1),
+            })
+    flagged.sort(key=lambda row: (-row['rate'], row['name']))
+    return flagged
+
+
+# --- Maintenance ---
+
+def refresh_years(keys):
+    """Rebuild the bitmaps for the given (student_id, academic_year) keys from AttendanceRecord."""
+    keys = set(keys)
+    if not keys:
+        return
+    by_year = {}
+    for student_id, year in keys:
+        by_year.setdefault(year, set()).add(student_id)
+    for year, student_ids in by_year.items():
+        student_ids = sorted(student_ids)
+        for start in range(0, len(student_ids), REFRESH_CHUNK_SIZE):
+            _rebuild(Q(student__in=student_ids[start:start + REFRESH_CHUNK_SIZE]), year,
+                     {(student_id, year) for student_id in student_ids[start:start + REFRESH_CHUNK_SIZE]})
+
+
+def refresh_for_records(pairs):
+    """Refresh after saving or deleting the records for these (student_id, date) pairs."""
+    refresh_years({(student_id, academic_year_of(day)) for student_id, day in pairs})
+
+
+def compute_class_years(class_id):
+    """Live {(student_id, year): bitmap bytes} for the students currently in a class (None = no class)."""
+    codes = {}
+    for student_id, day, status in AttendanceRecord.objects.filter(
+        student__current_class=class_id
+    ).values_list('student', 'date', 'status'):
+        year = academic_year_of(day)
+        codes.setdefault((student_id, year), {})[(day - year_start(year)).days] = STATUS_CODES[status]
+    return {key: encode(day_codes) for key, day_codes in codes.items()}
+
+
+def stored_class_years(class_id):
+    return {
+        (student_id, year): bytes(bitmap)
+        for student_id, year, bitmap in StudentAttendanceYear.objects.filter(
+            student__current_class=class_id
+        ).values_list('student', 'academic_year', 'statuses')
+    }
+
+
+def rebuild_class_years(class_id):
+    """Rebuild every bitmap of the students currently in one class; returns the number of rows written."""
+    bitmaps = compute_class_years(class_id)
+    StudentAttendanceYear.objects.filter(student__current_class=class_id).delete()
+    _upsert(bitmaps)
+    return len(bitmaps)
+
+
+def verify_class_years(class_id):
+    """(table, key, stored, expected) for every bitmap of one class partition that is out of date."""
+    expected, stored = compute_class_years(class_id), stored_class_years(class_id)
+    return [
+        ('attendance_bitmap', key,
+         AttendanceYear(key[1], stored[key]).counts() if key in stored else None,
+         AttendanceYear(key[1], expected[key]).counts() if key in expected else None)
+        for key in expected.keys() | stored.keys() if stored.get(key) != expected.get(key)
+    ]
+
+
+def _rebuild(student_filter, year, keys):
+    start = year_start(year)
+    codes = {}
+    for student_id, day, status in AttendanceRecord.objects.filter(
+        student_filter, date__range=(start, start + timedelta(days=DAYS_PER_YEAR - 1))
+    ).values_list('student', 'date', 'status'):
+        if academic_year_of(day) == year: # A 365-day year ends one day before the next starts
+            codes.setdefault((student_id, year), {})[(day - start).days] = STATUS_CODES[status]
+    _upsert({key: encode(day_codes) for key, day_codes in codes.items()})
+    empty = keys - codes.keys()
+    if empty:
+        StudentAttendanceYear.objects.filter(
+            academic_year=year, student__in=[student_id for student_id, _ in empty]
+        ).delete()
+
+
+def _upsert(bitmaps):
+    if bitmaps:
+        StudentAttendanceYear.objects.bulk_create([
+            StudentAttendanceYear(student_id=student_id, academic_year=year, statuses=bitmap)
+            for (student_id, year), bitmap in bitmaps.items()
+        ], batch_size=UPSERT_BATCH_SIZE, update_conflicts=True,
+            unique_fields=['student', 'academic_year'], update_fields=['statuses'])
@@ -0,0 +1,197 @@
+# core/changelists.py
+"""
+Admin changelists for tables with millions of rows (results, attendance, students).
+
+The stock changelist gets slower as the table grows: it counts every matching
+row (twice, with the unfiltered total), pages with OFFSET, lists every related
+object in the sidebar filters and, without list_select_related, loads related
+objects one row at a time. LargeTableAdminMixin replaces each of those:
+
+- pages follow `keyset_ordering` with a cursor (core/keyset.py), an index range
+  read on any page, as long as the list is in its default order; sorting by a
+  column header falls back to numbered pages;
+- counts stop at COUNT_LIMIT rows; beyond that the changelist says "more than"
+  COUNT_LIMIT, or "about" the planner's estimate on PostgreSQL (a guess, which
+  may be off either way, so never shown as a lower bound);
+- no full total, no facet counts;
+- AutocompleteFilter picks a student or user with the admin's search-as-you-type
+  widget instead of rendering all of them into the sidebar (admins of smaller
+  tables use it through AutocompleteFilterMixin).
+"""
+from django import forms
+from django.contrib import admin
+from django.contrib.admin.views.main import ORDER_VAR, ChangeList
+from django.contrib.admin.widgets import AutocompleteSelect
+from django.core.paginator import Paginator
+from django.db import connections
+from django.utils.functional import cached_property
+
+from .keyset import KeysetPaginator, PAGE_PARAMS
+
+COUNT_LIMIT = 10000 # Rows counted exactly; larger results are estimated
+
+# How a changelist's result count is known (ChangeList.result_count_kind)
+EXACT = 'exact'
+ESTIMATE = 'estimate' # The database's guess, shown as "about N"
+LOWER_BOUND = 'lower bound' # Shown as "more than N"
+
+
+def estimated_count(queryset):
+    """
+    (count, kind): the exact count up to COUNT_LIMIT, else the planner's estimate
+    (PostgreSQL) or COUNT_LIMIT as a lower bound.
+    """
+    rows = queryset.select_related(None).prefetch_related(None).order_by().values('pk')
+    count = rows[:COUNT_LIMIT + 1].count()
+    if count <= COUNT_LIMIT:
+        return count, EXACT
+    connection = connections[queryset.db]
+    if connection.vendor == 'postgresql':
+        sql, params = rows.query.sql_with_params()
+        with connection.cursor() as cursor:
+            cursor.execute(f'EXPLAIN (FORMAT JSON) {sql}', params)
+            plan = cursor.fetchone()[0]
+        estimate = int(plan[0]['Plan']['Plan Rows'])
+        if estimate > COUNT_LIMIT: # A lower guess is known to be wrong
+            return estimate, ESTIMATE
+    return COUNT_LIMIT, LOWER_BOUND
+
+
+class EstimatedCountPaginator(Paginator):
+    """Numbered pages (column sorting) without an unbounded COUNT(*)."""
+
+    @cached_property
+    def estimate(self):
+        return estimated_count(self.object_list)
+
+    @property
+    def count(self):
+        return self.estimate[0]
+
+
+class KeysetChangeList(ChangeList):
+    """ChangeList paging by cursor through model_admin.keyset_ordering (see LargeTableAdminMixin)."""
+
+    def __init__(self, request, *args, **kwargs):
+        self.cursor_params = {name: request.GET[name] for name in PAGE_PARAMS if name in request.GET}
+        self.keyset_page = None
+        self.result_count_kind = EXACT
+        super().__init__(request, *args, **kwargs)
+
+    def get_filters_params(self, params=None):
+        # The cursor is not a field lookup
+        lookup_params = super().get_filters_params(params)
+        for name in PAGE_PARAMS:
+            lookup_params.pop(name, None)
+        return lookup_params
+
+    def get_query_string(self, new_params=None, remove=None):
+        # Changing a filter, the search or the sort order starts again from the first page
+        # (None drops a parameter; `remove` would also drop filters sharing a prefix, e.g. last_name)
+        return super().get_query_string({**dict.fromkeys(PAGE_PARAMS), **(new_params or {})}, remove)
+
+    def get_results(self, request):
+        if ORDER_VAR in self.params or not self.model_admin.keyset_ordering: # Sorted by a column header
+            super().get_results(request)
+            self.result_count_kind = self.paginator.estimate[1]
+            return
+        ordering = self.model_admin.keyset_ordering
+        fields = [name.lstrip('-') for name in ordering]
+        # Find the page's rows on the ordering index alone, then load them with their related objects
+        keys = self.queryset.select_related(None).prefetch_related(None).only(*fields)
+        paginator = KeysetPaginator(keys, ordering, self.list_per_page)
+        count, kind = estimated_count(self.queryset)
+        position = paginator.position(self.cursor_params)
+        if position.mode == 'last' and kind != EXACT:
+            position = paginator.position({}) # The last page can only be sized from an exact count
+        page = paginator.page(position, count)
+
+        self.keyset_page = page
+        self.keyset_links = {
+            'first': self.get_query_string(),
+            'previous': self.get_query_string({'before': page.first_cursor, 'page': page.number - 1}),
+            'next': self.get_query_string({'after': page.last_cursor, 'page': page.number + 1}),
+            'last': self.get_query_string({'last': 1}) if kind == EXACT else None,
+        }
+        self.result_count = count
+        self.result_count_kind = kind
+        self.full_result_count = None
+        self.show_full_result_count = False
+        self.show_admin_actions = True
+        # A queryset, not a list: list_editable builds its formset from it
+        self.result_list = self.queryset.filter(pk__in=[row.pk for row in page.object_list])
+        self.can_show_all = False
+        self.multi_page = False # Numbered page links do not apply; admin/core/pagination.html draws the cursor links
+        self.paginator = paginator
+
+
+class AutocompleteFilterMixin:
+    """ModelAdmin with AutocompleteFilters in list_filter: adds their widget scripts to the changelist."""
+
+    @property
+    def media(self):
+        media = super().media
+        for list_filter in self.list_filter:
+            if isinstance(list_filter, tuple) and issubclass(list_filter[1], AutocompleteFilter):
+                field = self.model._meta.get_field(list_filter[0])
+                media += AutocompleteSelect(field, self.admin_site).media
+        return media
+
+
+class LargeTableAdminMixin(AutocompleteFilterMixin):
+    """ModelAdmin settings for very large tables; set keyset_ordering to an indexed ordering ending in the pk."""
+    keyset_ordering = None
+    show_full_result_count = False
+    show_facets = admin.ShowFacets.NEVER
+
+    def get_ordering(self, request):
+        return self.keyset_ordering or super().get_ordering(request)
+
+    def get_changelist(self, request, **kwargs):
+        return KeysetChangeList
+
+    def get_paginator(self, request, queryset, per_page, orphans=0, allow_empty_first_page=True):
+        return EstimatedCountPaginator(queryset, per_page, orphans, allow_empty_first_page)
+
+
+class AutocompleteFilter(admin.FieldListFilter):
+    """
+    Sidebar filter on a foreign key that picks the object with the admin's
+    autocomplete widget (the related model's admin needs search_fields), so
+    the sidebar never lists the whole related table. The admin needs
+    AutocompleteFilterMixin (or LargeTableAdminMixin) for the widget's scripts:
+
+        list_filter = (('student', AutocompleteFilter),)
+    """
+    template = 'admin/core/autocomplete_filter.html'
+
+    def __init__(self, field, request, params, model, model_admin, field_path):
+        self.lookup_kwarg = f'{field_path}__{field.target_field.name}__exact'
+        super().__init__(field, request, params, model, model_admin, field_path)
+        self.model_admin = model_admin
+
+    def expected_parameters(self):
+        return [self.lookup_kwarg]
+
+    def value(self):
+        values = self.used_parameters.get(self.lookup_kwarg)
+        return values[-1] if values else None
+
+    def choices(self, changelist):
+        choice_field = forms.ModelChoiceField(
+            queryset=self.field.remote_field.model._default_manager.all(), required=False,
+            widget=AutocompleteSelect(self.field, self.model_admin.admin_site),
+        )
+        # Every other parameter of the current list is carried over by the filter's form
+        hidden = [
+            (name, value)
+            for name, values in changelist.filter_params.items()
+            if name != self.lookup_kwarg and name not in PAGE_PARAMS
+            for value in values
+        ]
+        yield {
+            'selected': self.value() is not None,
+            'widget': choice_field.widget.render(self.lookup_kwarg, self.value(), attrs={'id': f'filter_{self.field_path}'}),
+            'hidden': hidden,
+            'clear_url': changelist.get_query_string(remove=[self.lookup_kwarg]),
+        }
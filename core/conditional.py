@@ -0,0 +1,77 @@
+# core/conditional.py
+"""
+Validators for conditional GET (ETag / Last-Modified) on frequently reloaded pages.
+
+Each *_etag function is passed to django.views.decorators.http.condition, which
+answers a matching If-None-Match / If-Modified-Since with 304 Not Modified
+before the view runs, so no template is rendered and none of the page's data
+is loaded. A validator must therefore change whenever anything on the page can:
+- Public pages use the public cache versions (core/public_cache.py), bumped on
+  every save and delete, including image edits that leave no timestamp behind.
+- The parent dashboard uses the newest Result.last_updated and
+  AttendanceRecord.timestamp of the children, plus row counts so deletions show,
+  and the school version, bumped when a student, class or subject is saved or
+  deleted (names, class moves).
+Every ETag also covers what base.html shows for the visitor (user and CSRF
+cookie), and pages with pending flash messages are never validated.
+"""
+import hashlib
+from datetime import timedelta
+
+from django.conf import settings
+from django.contrib import messages
+from django.db.models import Count, Max
+from django.utils import timezone
+
+from . import keyset, public_cache
+from .models import AttendanceRecord, Result
+
+PARENT_ATTENDANCE_DAYS = 14 # Same window as the parent dashboard summary
+
+
+def _etag(request, *parts):
+    if len(messages.get_messages(request)): # Loaded but not consumed: still shown on the page
+        return None
+    visitor = (request.user.pk, request.COOKIES.get(settings.CSRF_COOKIE_NAME, ''))
+    return hashlib.md5(repr(visitor + parts).encode(), usedforsecurity=False).hexdigest()
+
+
+# --- Public pages ---
+
+def home_etag(request):
+    groups = (public_cache.ANNOUNCEMENTS, public_cache.CAROUSEL)
+    return _etag(request, 'home', public_cache.version(*groups), keyset.page_key(request.GET))
+
+
+def home_last_modified(request):
+    return public_cache.modified(public_cache.ANNOUNCEMENTS, public_cache.CAROUSEL)
+
+
+def news_list_etag(request):
+    return _etag(request, 'news_list', public_cache.version(public_cache.NEWS), keyset.page_key(request.GET))
+
+
+def news_detail_etag(request, article_id):
+    return _etag(request, 'news_detail', public_cache.version(public_cache.NEWS), article_id)
+
+
+def news_last_modified(request, *args, **kwargs):
+    return public_cache.modified(public_cache.NEWS)
+
+
+# --- Parent dashboard ---
+
+def parent_dashboard_etag(request):
+    """Children, their results and recent attendance, today's date and the announcements page."""
+    child_ids = sorted(request.access.child_ids)
+    today = timezone.now().date()
+    results = Result.objects.filter(student__in=child_ids).aggregate(
+        latest=Max('last_updated'), rows=Count('pk'))
+    attendance = AttendanceRecord.objects.filter(
+        student__in=child_ids, date__gte=today - timedelta(days=PARENT_ATTENDANCE_DAYS)
+    ).aggregate(latest=Max('timestamp'), rows=Count('pk'))
+    return _etag(
+        request, 'parent_dashboard', child_ids, today,
+        results['latest'], results['rows'], attendance['latest'], attendance['rows'],
+        public_cache.version(public_cache.ANNOUNCEMENTS, public_cache.SCHOOL), keyset.page_key(request.GET),
+    )
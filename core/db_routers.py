@@ -0,0 +1,132 @@
+# core/db_routers.py
+"""
+Read replicas with read-your-writes (settings.DB_REPLICAS, from DJANGO_DB_REPLICAS).
+
+Report-release days are almost all reads of a few pages, so those pages can
+be served by any number of replicas while the primary takes the writes:
+
+- ReplicaRoutingMiddleware picks one replica per request (so a page reads one
+  consistent copy) for GET/HEAD requests to the views in REPLICA_VIEWS;
+  everything else, including every admin page, reads the primary.
+- PrimaryReplicaRouter sends all writes to the primary. Once a request has
+  written, its remaining reads go to the primary as well, and the response
+  sets a short-lived cookie (DB_REPLICA_STICKY_SECONDS) that keeps that
+  browser's reads on the primary until the replicas have caught up: a
+  teacher who saves attendance sees it on the next page.
+- Sessions and users are always read from the primary, so a lagging replica
+  never makes a fresh login look missing (the user would appear logged out).
+- Objects read through a relation stay on the database their parent came
+  from, and the public page cache fills from the primary (see primary()),
+  so a lagging replica never pins old content in the cache.
+
+Outside a request (jobs, commands, the shell) everything uses the primary.
+"""
+import random
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+from django.conf import settings
+
+PRIMARY = 'default'
+STICKY_COOKIE = 'db_primary'
+
+# Apps whose models are always read from the primary: the session and user of every request
+PRIMARY_APPS = {'sessions', 'auth'}
+
+# URL names of the read-only pages served from replicas
+REPLICA_VIEWS = {
+    'home', 'news_list', 'news_detail',
+    'dashboard', 'parent_dashboard', 'teacher_dashboard',
+    'student_profile', 'student_report_card', 'view_class_attendance',
+    'export_class_results', 'export_parent_results', 'site_search',
+}
+
+
+class _RequestState:
+    __slots__ = ('replica', 'wrote')
+
+    def __init__(self):
+        self.replica = None # Alias this request reads from, or None for the primary
+        self.wrote = False
+
+
+_state = ContextVar('core_db_routing', default=None)
+
+
+@contextmanager
+def primary():
+    """Read from the primary inside the block, whatever the current request was routed to."""
+    state = _state.get()
+    replica = state.replica if state else None
+    if state:
+        state.replica = None
+    try:
+        yield
+    finally:
+        if state:
+            state.replica = replica
+
+
+class PrimaryReplicaRouter:
+    """Writes to the primary; reads to the request's replica until the request writes."""
+
+    def db_for_read(self, model, **hints):
+        state = _state.get()
+        if not state or state.wrote or model._meta.app_label in PRIMARY_APPS:
+            return PRIMARY
+        instance = hints.get('instance')
+        if instance is not None and instance._state.db: # Related objects come from their parent's database
+            return instance._state.db
+        return state.replica or PRIMARY
+
+    def db_for_write(self, model, **hints):
+        state = _state.get()
+        if state:
+            state.wrote = True
+        return PRIMARY
+
+    def allow_relation(self, obj1, obj2, **hints):
+        return True # Every database holds the same rows
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        return db == PRIMARY # Replicas receive the schema through replication
+
+
+class ReplicaRoutingMiddleware:
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        state = _RequestState()
+        token = _state.set(state)
+        try:
+            response = self.get_response(request)
+        finally:
+            _state.reset(token)
+        if state.wrote:
+            response.set_cookie(STICKY_COOKIE, '1', max_age=settings.DB_REPLICA_STICKY_SECONDS,
+                                httponly=True, samesite='Lax')
+        if state.replica and response.streaming:
+            # Streamed exports read their rows after this returns; keep them on the same replica
+            response.streaming_content = _routed(state, response.streaming_content)
+        return response
+
+    def process_view(self, request, view_func, view_args, view_kwargs):
+        replicas = getattr(settings, 'DB_REPLICAS', [])
+        if (replicas and request.method in ('GET', 'HEAD') and STICKY_COOKIE not in request.COOKIES
+                and request.resolver_match.url_name in REPLICA_VIEWS):
+            _state.get().replica = random.choice(replicas)
+
+
+def _routed(state, chunks):
+    """Iterate `chunks` with `state` as the routing state of every step."""
+    chunks = iter(chunks)
+    while True:
+        token = _state.set(state)
+        try:
+            chunk = next(chunks, None)
+        finally:
+            _state.reset(token)
+        if chunk is None:
+            return
+        yield chunk
@@ -0,0 +1,85 @@
+# core/db_tuning.py
+"""
+Database tuning profiles (settings.DB_PROFILE, chosen with DJANGO_DB_PROFILE).
+
+settings.py does what can be done in DATABASES (SQLite's IMMEDIATE write
+transactions; PostgreSQL's connection pool and statement timeout). SQLite's
+pragmas are per connection, so they are set here as each connection opens:
+
+- journal_mode=WAL: readers no longer block the writer or each other (the
+  setting is stored in the database file, so it only changes once);
+- synchronous=NORMAL: in WAL mode this is safe against corruption and only
+  syncs at checkpoints, not on every commit;
+- busy_timeout: a writer waits this long for the lock instead of failing at once;
+- cache_size / mmap_size: more of the database in memory per connection.
+
+`manage.py db_profile` reports the settings each database actually runs with.
+"""
+from django.conf import settings
+from django.db.backends.signals import connection_created
+from django.dispatch import receiver
+
+SQLITE_SYNCHRONOUS = {0: 'OFF', 1: 'NORMAL', 2: 'FULL', 3: 'EXTRA'}
+
+
+def tuned():
+    return getattr(settings, 'DB_PROFILE', 'off') == 'tuned'
+
+
+@receiver(connection_created)
+def apply_sqlite_pragmas(sender, connection, **kwargs):
+    if connection.vendor != 'sqlite' or not tuned():
+        return
+    with connection.cursor() as cursor:
+        for name, value in settings.SQLITE_PRAGMAS.items():
+            cursor.execute(f'PRAGMA {name} = {value}')
+
+
+# --- Reporting (manage.py db_profile) ---
+
+def _sqlite_report(connection):
+    wanted = settings.SQLITE_PRAGMAS if tuned() else {}
+    rows = []
+    with connection.cursor() as cursor:
+        for name in ('journal_mode', 'synchronous', 'busy_timeout', 'cache_size', 'mmap_size'):
+            cursor.execute(f'PRAGMA {name}')
+            actual = cursor.fetchone()[0]
+            if name == 'synchronous':
+                actual = SQLITE_SYNCHRONOUS.get(actual, actual)
+            rows.append((name, actual, wanted.get(name)))
+    transaction_mode = connection.settings_dict.get('OPTIONS', {}).get('transaction_mode') or 'DEFERRED'
+    rows.append(('transaction_mode', transaction_mode, 'IMMEDIATE' if tuned() else None))
+    return rows
+
+
+def _postgresql_report(connection):
+    pool = connection.settings_dict.get('OPTIONS', {}).get('pool')
+    with connection.cursor() as cursor:
+        # pg_settings gives statement_timeout in plain milliseconds ('30000', not SHOW's '30s')
+        cursor.execute("SELECT name, setting FROM pg_settings WHERE name IN ('statement_timeout', 'max_connections')")
+        server = dict(cursor.fetchall())
+    return [
+        ('pool', ', '.join(f'{key}={value}' for key, value in pool.items()) if pool else 'off',
+         'on' if tuned() else None),
+        ('CONN_MAX_AGE', connection.settings_dict['CONN_MAX_AGE'], None),
+        ('statement_timeout (ms)', server['statement_timeout'], settings.DB_STATEMENT_TIMEOUT if tuned() else None),
+        ('max_connections', server['max_connections'], None),
+    ]
+
+
+def report(connection):
+    """[(setting, value in effect, value the profile asks for or None)] for `connection`."""
+    if connection.vendor == 'sqlite':
+        return _sqlite_report(connection)
+    if connection.vendor == 'postgresql':
+        return _postgresql_report(connection)
+    return []
+
+
+def matches(actual, wanted):
+    """Whether a reported value is what the profile asks for (pragmas read back in their own spelling)."""
+    if wanted is None:
+        return True
+    if wanted == 'on':
+        return actual != 'off'
+    return str(actual).lower() == str(wanted).lower()
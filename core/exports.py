@@ -0,0 +1,81 @@
+# core/exports.py
+"""
+Result exports shared by the download views and the background export jobs.
+
+Each builder returns (filename stem, header, rows), where rows is a lazy
+generator of plain lists read from the cursor in chunks. Nothing is loaded
+up front, so a view can stream it and a job can write it to a file with
+the same flat memory use.
+"""
+import csv
+import itertools
+
+from .models import Result
+
+# Rows fetched from the database per round trip (server-side cursor on PostgreSQL)
+CSV_EXPORT_CHUNK_SIZE = 2000
+
+
+class Echo:
+    """File-like object whose write() just hands the value back, so csv.writer can feed a generator."""
+    def write(self, value):
+        return value
+
+
+def csv_lines(header, rows):
+    """`header` + `rows` as an iterator of CSV-formatted lines."""
+    writer = csv.writer(Echo())
+    return itertools.chain([writer.writerow(header)], (writer.writerow(row) for row in rows))
+
+
+def _format_recorded(value):
+    # Same output as strftime('%Y-%m-%d %H:%M') (timestamps are stored in UTC), without the strftime cost
+    return value.isoformat(' ', 'minutes')[:16] if value else ''
+
+
+def class_results(school_class):
+    """Every result of the students currently in `school_class`."""
+    results = Result.objects.filter(
+        student__current_class=school_class
+    ).order_by(
+        'student__last_name', 'student__first_name', 'subject__name', 'term_exam_name'
+    ).values_list(
+        'student__student_id', 'student__first_name', 'student__last_name', 'subject__name',
+        'term_exam_name', 'score', 'grade', 'comments', 'date_recorded', 'recorded_by__username'
+    ).iterator(chunk_size=CSV_EXPORT_CHUNK_SIZE)
+
+    rows = (
+        [student_id, f"{first_name} {last_name}", subject, term, score, grade, comments,
+         _format_recorded(date_recorded), recorded_by or 'N/A']
+        for student_id, first_name, last_name, subject, term, score, grade, comments, date_recorded, recorded_by in results
+    )
+    return (
+        f"results_{school_class.name}_{school_class.academic_year}",
+        ['Student ID', 'Student Name', 'Subject', 'Term/Exam',
+         'Score', 'Grade', 'Comments', 'Date Recorded', 'Recorded By'],
+        rows,
+    )
+
+
+def parent_results(username, child_ids):
+    """Every result of a parent's children (`child_ids`)."""
+    results = Result.objects.filter(
+        student__in=child_ids # Filter results for the parent's children
+    ).order_by(
+        'student__last_name', 'student__first_name', 'subject__name', 'term_exam_name'
+    ).values_list(
+        'student__first_name', 'student__last_name', 'student__student_id', 'school_class__name',
+        'subject__name', 'term_exam_name', 'score', 'grade', 'comments', 'date_recorded'
+    ).iterator(chunk_size=CSV_EXPORT_CHUNK_SIZE)
+
+    rows = (
+        [f"{first_name} {last_name}", student_id, class_name or 'N/A', # Handle potential null class
+         subject, term, score, grade, comments, _format_recorded(date_recorded)]
+        for first_name, last_name, student_id, class_name, subject, term, score, grade, comments, date_recorded in results
+    )
+    return (
+        f"results_children_of_{username}",
+        ['Child Name', 'Child Student ID', 'Class', 'Subject', 'Term/Exam',
+         'Score', 'Grade', 'Comments', 'Date Recorded'],
+        rows,
+    )
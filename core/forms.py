@@ -54,4 +54,90 @@ class AssignClassForm(forms.Form):
         required=True,
         label="Assign selected students to class"
     )
-    # You might add options here later, e.g., a checkbox to clear previous class assignments
\ No newline at end of file
+    # You might add options here later, e.g., a checkbox to clear previous class assignments
+
+# --- FORM FOR THE BULK RESULT IMPORT (admin) ---
+class ResultImportForm(forms.Form):
+    import_file = forms.FileField(
+        label="Results file (.csv or .xlsx)",
+        help_text="Columns: Student ID, Subject, Term/Exam, Score, Grade, Comments. "
+                  "Existing results for the same student, subject and term are updated."
+    )
+
+
+# --- FORMS FOR THE CLASS GRADEBOOK GRID ---
+class GradebookSelectForm(forms.Form):
+    """Picks the subject and term shown in the gradebook grid (GET)."""
+    subject = forms.ModelChoiceField(
+        queryset=Subject.objects.order_by('name'),
+        widget=forms.Select(attrs={'class': 'form-select'})
+    )
+    term_exam_name = forms.CharField(
+        max_length=Result._meta.get_field('term_exam_name').max_length,
+        label='Term / Exam Name',
+        widget=forms.TextInput(attrs={'class': 'form-control', 'list': 'term-options'})
+    )
+
+
+class GradebookForm(forms.Form):
+    """One score/grade/comments row per student; all cells are validated together."""
+    def __init__(self, students, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.students = students
+        for student in students:
+            self.fields[f'score_{student.id}'] = forms.FloatField(
+                required=False, min_value=0, max_value=100, # Same range as ResultForm.clean_score
+                widget=forms.NumberInput(attrs={'class': 'form-control form-control-sm', 'step': '0.1'})
+            )
+            self.fields[f'grade_{student.id}'] = forms.CharField(
+                required=False, max_length=Result._meta.get_field('grade').max_length,
+                widget=forms.TextInput(attrs={'class': 'form-control form-control-sm'})
+            )
+            self.fields[f'comments_{student.id}'] = forms.CharField(
+                required=False,
+                widget=forms.TextInput(attrs={'class': 'form-control form-control-sm'})
+            )
+
+    BLANK = (None, '', '') # A row with every cell empty
+
+    def rows(self):
+        """(student, [(bound field, rendered widget)] for score, grade and comments) for the template."""
+        for student in self.students:
+            cells = []
+            for name in ('score', 'grade', 'comments'):
+                cell = self[f'{name}_{student.id}']
+                attrs = None
+                if cell.errors: # Bootstrap highlight, added per render so the widget itself is unchanged
+                    attrs = {'class': f"{cell.field.widget.attrs['class']} is-invalid"}
+                cells.append((cell, cell.as_widget(attrs=attrs)))
+            yield student, cells
+
+    def entries(self):
+        """{student_id: (score, grade, comments)} for every row; an emptied row is BLANK."""
+        return {
+            student.id: (
+                self.cleaned_data[f'score_{student.id}'],
+                self.cleaned_data[f'grade_{student.id}'],
+                self.cleaned_data[f'comments_{student.id}'],
+            )
+            for student in self.students
+        }
+
+
+# --- FORM FOR BATCH REPORT CARDS ---
+class ReportCardForm(forms.Form):
+    """Classes (one, or a whole year group) and the term to print report cards for."""
+    classes = forms.ModelMultipleChoiceField(
+        queryset=SchoolClass.objects.none(),
+        help_text="Select several classes (Ctrl/Cmd-click) for a whole year group.",
+        widget=forms.SelectMultiple(attrs={'class': 'form-select', 'size': 8})
+    )
+    term_exam_name = forms.ChoiceField(
+        label='Term / Exam Name',
+        widget=forms.Select(attrs={'class': 'form-select'})
+    )
+
+    def __init__(self, classes, terms, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.fields['classes'].queryset = classes # Only the classes this user may print
+        self.fields['term_exam_name'].choices = [(term, term) for term in terms]
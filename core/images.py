@@ -0,0 +1,154 @@
+# core/images.py
+"""
+Responsive image variants for carousel, news and student profile images.
+
+Uploaded originals can be several hundred KB, far more than a phone needs. For
+every original this module writes resized copies at a few standard widths, each
+in the original's format (JPEG, or PNG when the image has transparency) and as
+WebP. Copies are re-encoded from pixels only, so EXIF metadata (camera, GPS) is
+dropped; the EXIF orientation is applied first so nothing appears rotated.
+
+Files go next to the original in the upload storage (STORAGES['uploads']), under
+`variants/<name>/<width>w.<ext>`, and one ImageVariants row per original records
+what exists. The {% responsive_image %} tag (core_extras) turns that row into a
+<picture> with WebP and fallback srcsets.
+
+Processing is queued as a background job (core/jobs.py, run by
+`manage.py run_jobs`), so the admin save does not wait for Pillow. Existing
+media is backfilled with `manage.py process_images`, which spreads the work
+over a process pool.
+"""
+import hashlib
+import io
+import os
+import posixpath
+
+from django.core.cache import cache
+from django.core.files.base import ContentFile
+
+from . import jobs
+from .models import ImageVariants
+from .storage import VARIANTS_DIR, upload_storage
+
+WIDTHS = (160, 320, 480, 960, 1440, 1920) # Candidate widths; only those below the original are written
+MAX_WIDTH = WIDTHS[-1]
+JPEG_QUALITY = 82
+WEBP_QUALITY = 80
+CACHE_TIMEOUT = 60 * 60 * 24
+MISSING_TIMEOUT = 60 * 5 # Images not processed yet are checked again after this
+
+FORMATS = {
+    # format -> (extension, MIME type)
+    'JPEG': ('jpg', 'image/jpeg'),
+    'PNG': ('png', 'image/png'),
+    'WEBP': ('webp', 'image/webp'),
+}
+
+def variant_name(source, width, extension):
+    directory, filename = posixpath.split(source)
+    stem = os.path.splitext(filename)[0]
+    return posixpath.join(directory, VARIANTS_DIR, stem, f'{width}w.{extension}')
+
+
+def render(source, storage=None):
+    """
+    Write every variant of the original stored as `source`. Touches files only (no
+    database), so it can run in a worker process. Returns
+    (width, height, [{'width', 'format', 'name'}, ...]), smallest first.
+    """
+    from PIL import Image, ImageOps # Pillow is only needed where images are processed
+
+    storage = storage or upload_storage()
+    with storage.open(source, 'rb') as fh:
+        with Image.open(fh) as original:
+            image = ImageOps.exif_transpose(original)
+            image.load()
+    has_alpha = image.mode in ('RGBA', 'LA') or (image.mode == 'P' and 'transparency' in image.info)
+    image = image.convert('RGBA' if has_alpha else 'RGB')
+    fallback = 'PNG' if has_alpha else 'JPEG'
+
+    widths = [width for width in WIDTHS if width < image.width] + [min(image.width, MAX_WIDTH)]
+    variants = []
+    for width in widths:
+        height = max(1, round(image.height * width / image.width))
+        resized = image if width == image.width else image.resize((width, height), Image.Resampling.LANCZOS)
+        for image_format in (fallback, 'WEBP'):
+            extension = FORMATS[image_format][0]
+            name = variant_name(source, width, extension)
+            if storage.exists(name):
+                storage.delete(name)
+            name = storage.save(name, ContentFile(_encode(resized, image_format)))
+            variants.append({'width': width, 'format': image_format, 'name': name})
+    return image.width, image.height, variants
+
+
+def _encode(image, image_format):
+    buffer = io.BytesIO()
+    if image_format == 'JPEG':
+        image.save(buffer, 'JPEG', quality=JPEG_QUALITY, optimize=True, progressive=True)
+    elif image_format == 'WEBP':
+        image.save(buffer, 'WEBP', quality=WEBP_QUALITY, method=4)
+    else:
+        image.save(buffer, 'PNG', optimize=True)
+    return buffer.getvalue()
+
+
+def store(source, width, height, variants):
+    """Record the variants of `source` (replacing any previous record)."""
+    ImageVariants.objects.update_or_create(
+        source=source, defaults={'width': width, 'height': height, 'variants': variants},
+    )
+    cache.delete(_cache_key(source))
+
+
+def process(source):
+    """Render and record the variants of one original; returns the number of files written."""
+    width, height, variants = render(source)
+    store(source, width, height, variants)
+    return len(variants)
+
+
+def process_later(source, public_group=None):
+    """
+    Queue a job that processes `source`, then invalidates `public_group` of the
+    public page cache so pages pick up the variants (see core.tasks.process_image).
+    """
+    jobs.enqueue('process_image', {'source': source, 'public_group': public_group})
+
+
+def discard(source):
+    """Delete the variant files and record of an original that was replaced or deleted."""
+    record = ImageVariants.objects.filter(source=source).first()
+    if record is None:
+        return
+    storage = upload_storage()
+    for variant in record.variants:
+        storage.delete(variant['name'])
+    record.delete()
+    cache.delete(_cache_key(source))
+
+
+def variants_for(source):
+    """{'width', 'height', 'variants'} for an original, or None if it has not been processed."""
+    key = _cache_key(source)
+    found = cache.get(key)
+    if found is None:
+        record = ImageVariants.objects.filter(source=source).values('width', 'height', 'variants').first()
+        found = record or {} # Cache misses too, so unprocessed images cost no query either
+        cache.set(key, found, CACHE_TIMEOUT if record else MISSING_TIMEOUT)
+    return found or None
+
+
+def srcsets(record):
+    """{format: 'url 480w, url 960w'} for every format in a variants record."""
+    storage = upload_storage()
+    by_format = {}
+    for variant in record['variants']:
+        by_format.setdefault(variant['format'], []).append(
+            f"{storage.url(variant['name'])} {variant['width']}w"
+        )
+    return {image_format: ', '.join(entries) for image_format, entries in by_format.items()}
+
+
+def _cache_key(source):
+    return 'core:image:' + hashlib.md5(source.encode(), usedforsecurity=False).hexdigest()
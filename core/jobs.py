@@ -0,0 +1,169 @@
+# core/jobs.py
+"""
+Background jobs.
+
+Work that is too slow for a web request (result exports, bulk imports, moving
+many students between classes, image processing) is queued as a Job row and
+run by `manage.py run_jobs`, so the request returns at once and the few web
+workers stay free for everyone else.
+
+- Tasks are plain functions registered with @task('name') (see core/tasks.py).
+  A task gets the Job, reads job.params, may write one downloadable file with
+  save_result() and returns a short message for the job page.
+- enqueue() inserts the row in the caller's transaction, so a job never runs
+  before the data it refers to is committed.
+- Workers claim due jobs with a conditional UPDATE, so any number of worker
+  processes (on one host or several) can share the queue on SQLite and
+  PostgreSQL alike.
+- A task that raises is retried with exponential back-off up to
+  job.max_attempts; raising JobError fails the job at once with that message
+  (bad input that a retry cannot fix). A job left 'running' by a killed worker
+  is picked up again after JOBS_STALE_AFTER seconds.
+"""
+import logging
+import tempfile
+import traceback
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.files import File
+from django.core.files.storage import FileSystemStorage
+from django.db import connections
+from django.db.models import Q
+from django.utils import timezone
+
+from .models import Job
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_MAX_ATTEMPTS = 3
+RETRY_DELAY = 30 # Seconds before the first retry; doubled for every further attempt
+PURGE_BATCH_SIZE = 500
+
+_tasks = {} # kind -> task function
+_titles = {} # kind -> title shown on the job page
+
+
+class JobError(Exception):
+    """The job cannot succeed (missing object, expired input): fail without retrying."""
+
+
+def task(kind, title=None):
+    """Register the decorated function as the task run for jobs of `kind`."""
+    def decorator(func):
+        _tasks[kind] = func
+        _titles[kind] = title or kind.replace('_', ' ').capitalize()
+        return func
+    return decorator
+
+
+def title(job):
+    return _titles.get(job.kind, job.kind)
+
+
+def enqueue(kind, params=None, user=None, max_attempts=DEFAULT_MAX_ATTEMPTS):
+    """Queue a job of a registered `kind`; returns the Job."""
+    if kind not in _tasks:
+        raise ValueError(f"Unknown job kind '{kind}'.")
+    return Job.objects.create(
+        kind=kind, params=params or {}, created_by=user if user and user.is_authenticated else None,
+        max_attempts=max_attempts,
+    )
+
+
+def result_storage():
+    """Private storage for job outputs (not under MEDIA_URL)."""
+    return FileSystemStorage(location=settings.JOBS_RESULT_ROOT)
+
+
+def save_result(job, filename, chunks):
+    """Write `chunks` (str or bytes) as the job's downloadable `filename`; returns its storage name."""
+    with tempfile.TemporaryFile() as fh:
+        for chunk in chunks:
+            fh.write(chunk.encode('utf-8') if isinstance(chunk, str) else chunk)
+        fh.seek(0)
+        name = result_storage().save(f'{job.pk}/{filename}', File(fh, name=filename))
+    job.result_name = name
+    Job.objects.filter(pk=job.pk).update(result_name=name)
+    return name
+
+
+def can_view(job, user):
+    """Jobs are visible to whoever queued them and to staff."""
+    return user.is_staff or (job.created_by_id is not None and job.created_by_id == user.pk)
+
+
+# --- Worker side (manage.py run_jobs) ---
+
+def claim(limit):
+    """
+    Mark up to `limit` due jobs as running and return them. Each claim is a
+    conditional UPDATE on the state the job was read in, so when several
+    workers race for a job exactly one of them gets it.
+    """
+    now = timezone.now()
+    stale = now - timedelta(seconds=settings.JOBS_STALE_AFTER)
+    candidates = Job.objects.filter(
+        Q(status='queued', run_after__lte=now) | Q(status='running', started_at__lt=stale)
+    ).order_by('run_after', 'id').values_list('pk', 'status', 'started_at', 'attempts', 'max_attempts')
+
+    claimed = []
+    for pk, status, started_at, attempts, max_attempts in candidates[:limit * 2]:
+        current = Job.objects.filter(pk=pk, status=status, started_at=started_at)
+        if status == 'running' and attempts >= max_attempts:
+            # Abandoned by a worker on its last attempt
+            current.update(status='failed', finished_at=now, message="The job was interrupted too many times.")
+            continue
+        if current.update(status='running', started_at=now, attempts=attempts + 1):
+            claimed.append(Job.objects.get(pk=pk))
+            if len(claimed) == limit:
+                break
+    return claimed
+
+
+def run(job):
+    """Run one claimed job and record the outcome. Never raises."""
+    try:
+        handler = _tasks.get(job.kind)
+        if handler is None:
+            raise JobError(f"Unknown job kind '{job.kind}'.")
+        message = handler(job) or ''
+    except Exception as e:
+        _record_failure(job, e)
+    else:
+        Job.objects.filter(pk=job.pk).update(status='done', finished_at=timezone.now(), message=message)
+    finally:
+        connections.close_all() # Worker threads each have their own connection; do not leak it
+
+
+def _record_failure(job, exc):
+    now = timezone.now()
+    permanent = isinstance(exc, JobError)
+    fields = {'error': traceback.format_exc()}
+    if not permanent and job.attempts < job.max_attempts:
+        delay = RETRY_DELAY * 2 ** (job.attempts - 1)
+        fields.update(status='queued', run_after=now + timedelta(seconds=delay),
+                      message=f"Attempt {job.attempts} of {job.max_attempts} failed; retrying.")
+        logger.warning("Job %s failed (attempt %s), retrying in %ss", job.pk, job.attempts, delay, exc_info=exc)
+    else:
+        fields.update(status='failed', finished_at=now,
+                      message=str(exc) if permanent else "The job failed. An administrator can see the details.")
+        logger.error("Job %s failed", job.pk, exc_info=exc)
+    Job.objects.filter(pk=job.pk).update(**fields)
+
+
+def purge(days=None):
+    """Delete jobs finished more than `days` (default JOBS_KEEP_DAYS) ago, with their files."""
+    days = settings.JOBS_KEEP_DAYS if days is None else days
+    cutoff = timezone.now() - timedelta(days=days)
+    storage = result_storage()
+    finished = Job.objects.filter(status__in=['done', 'failed'], finished_at__lt=cutoff)
+    deleted = 0
+    while True:
+        batch = list(finished.values_list('pk', 'result_name')[:PURGE_BATCH_SIZE])
+        if not batch:
+            return deleted
+        for pk, name in batch:
+            if name:
+                storage.delete(name)
+        deleted += Job.objects.filter(pk__in=[pk for pk, name in batch]).delete()[0]
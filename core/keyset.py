@@ -0,0 +1,174 @@
+# core/keyset.py
+"""
+Keyset (cursor) pagination.
+
+Paginator pages with OFFSET: the database still reads and discards every row
+before the page, so deep pages get slower as history grows. A keyset page
+instead remembers the sort key of the row at its edge and asks for the rows
+just past it, e.g. for announcements ordered by (-timestamp, -id):
+
+    WHERE timestamp <= t AND (timestamp < t OR (timestamp = t AND id < i))
+    ORDER BY timestamp DESC, id DESC LIMIT per_page + 1
+
+which is an index range read of per_page + 1 rows on any page. Links carry the
+cursor (`?after=` / `?before=`, `?last=1`) plus the page number for display;
+the total count comes from the caller (usually cached, see core/public_cache.py)
+so pages need no COUNT(*) either. Ordering fields must be non-null and end in a
+unique field (the primary key) so every row has a distinct position.
+"""
+from django.core.exceptions import ValidationError
+from django.db.models import Q
+from django.utils.http import urlencode
+
+PAGE_PARAMS = ('after', 'before', 'last', 'page')
+CURSOR_SEPARATOR = '~'
+
+
+def page_key(params):
+    """The pagination parameters of a request as one string, for cache keys and ETags."""
+    return '|'.join(params.get(name, '') for name in PAGE_PARAMS)
+
+
+class Position:
+    """Where a requested page starts: 'first', 'last', or just 'after'/'before' a cursor."""
+    def __init__(self, mode, values=None, number=1):
+        self.mode = mode
+        self.values = values
+        self.number = number
+
+
+class KeysetPage:
+    """One page of rows; data only (no queryset), so it can be cached."""
+    is_keyset = True
+
+    def __init__(self, object_list, number, count, per_page, has_previous, has_next, first_cursor, last_cursor):
+        self.object_list = object_list
+        self.count = count
+        self.num_pages = _num_pages(count, per_page)
+        # The number is for display only (carried in the links); the first and last pages are known exactly
+        if not has_previous:
+            self.number = 1
+        elif not has_next:
+            self.number = self.num_pages
+        else:
+            self.number = min(max(number, 2), self.num_pages - 1)
+        self._has_previous = has_previous
+        self._has_next = has_next
+        self.first_cursor = first_cursor
+        self.last_cursor = last_cursor
+
+    def __len__(self):
+        return len(self.object_list)
+
+    def __iter__(self):
+        return iter(self.object_list)
+
+    def __getitem__(self, index):
+        return self.object_list[index]
+
+    def has_previous(self):
+        return self._has_previous
+
+    def has_next(self):
+        return self._has_next
+
+    def has_other_pages(self):
+        return self._has_previous or self._has_next
+
+    # Query strings for the navigation links
+    def first_url(self):
+        return '?'
+
+    def previous_url(self):
+        return '?' + urlencode({'before': self.first_cursor, 'page': self.number - 1})
+
+    def next_url(self):
+        return '?' + urlencode({'after': self.last_cursor, 'page': self.number + 1})
+
+    def last_url(self):
+        return '?' + urlencode({'last': 1})
+
+
+class KeysetPaginator:
+    """Pages `queryset` in `ordering` (e.g. ('-timestamp', '-id')), `per_page` rows at a time."""
+    def __init__(self, queryset, ordering, per_page):
+        self.queryset = queryset
+        self.ordering = tuple(ordering)
+        self.per_page = per_page
+        self.fields = [name.lstrip('-') for name in self.ordering]
+        self.descending = [name.startswith('-') for name in self.ordering]
+
+    def position(self, params):
+        """Parse the request parameters; anything malformed means the first page."""
+        try:
+            number = int(params.get('page', 1))
+        except (TypeError, ValueError):
+            number = 1
+        if params.get('last'):
+            return Position('last')
+        for mode in ('after', 'before'):
+            if params.get(mode):
+                values = self._decode(params[mode])
+                if values is not None:
+                    return Position(mode, values, number)
+        return Position('first')
+
+    def page(self, position, count):
+        """Fetch the page at `position` (one query); `count` is the total number of rows."""
+        per_page = self.per_page
+        if position.mode == 'last':
+            # Size the last page so page boundaries match those counted from the first page
+            size = count - (_num_pages(count, per_page) - 1) * per_page
+            rows = list(self.queryset.order_by(*self._reversed())[:size])[::-1]
+            return self._page(rows, position.number, count, has_previous=count > size, has_next=False)
+        if position.mode == 'before':
+            rows = list(self.queryset.filter(self._beyond(position.values, forward=False))
+                        .order_by(*self._reversed())[:per_page + 1])
+            has_previous = len(rows) > per_page
+            return self._page(rows[:per_page][::-1], position.number, count, has_previous=has_previous, has_next=True)
+        queryset = self.queryset
+        if position.mode == 'after':
+            queryset = queryset.filter(self._beyond(position.values, forward=True))
+        rows = list(queryset.order_by(*self.ordering)[:per_page + 1])
+        return self._page(rows[:per_page], position.number, count,
+                          has_previous=position.mode == 'after', has_next=len(rows) > per_page)
+
+    # --- Helpers ---
+
+    def _page(self, rows, number, count, has_previous, has_next):
+        return KeysetPage(
+            rows, number, count, self.per_page, has_previous, has_next,
+            self._encode(rows[0]) if rows else '', self._encode(rows[-1]) if rows else '',
+        )
+
+    def _reversed(self):
+        return [name[1:] if name.startswith('-') else f'-{name}' for name in self.ordering]
+
+    def _beyond(self, values, forward):
+        """Rows strictly past `values` in the page order (forward) or before them (backward)."""
+        condition = Q()
+        for index, (field, descending) in enumerate(zip(self.fields, self.descending)):
+            lookup = 'lt' if descending == forward else 'gt'
+            equal = dict(zip(self.fields[:index], values[:index]))
+            condition |= Q(**equal, **{f'{field}__{lookup}': values[index]})
+        # Redundant bound on the leading column, so the database can seek the index to the cursor
+        leading = 'lte' if self.descending[0] == forward else 'gte'
+        return Q(**{f'{self.fields[0]}__{leading}': values[0]}) & condition
+
+    def _encode(self, row):
+        return CURSOR_SEPARATOR.join(
+            self.queryset.model._meta.get_field(field).value_to_string(row) for field in self.fields
+        )
+
+    def _decode(self, cursor):
+        parts = cursor.split(CURSOR_SEPARATOR)
+        if len(parts) != len(self.fields):
+            return None
+        try:
+            return [self.queryset.model._meta.get_field(field).to_python(part) for field, part in zip(self.fields, parts)]
+        except (ValidationError, ValueError):
+            return None
+
+
+def _num_pages(count, per_page):
+    return max(1, -(-count // per_page))
@@ -0,0 +1,168 @@
+# core/management/commands/benchmark_views.py
+import json
+import math
+import time
+import tracemalloc
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.test import Client
+
+from core import synthetic
+
+
+class Command(BaseCommand):
+    help = (
+        "Seed a synthetic school in a throwaway test database and measure wall time, SQL query count, "
+        "SQL time and peak Python memory for every core page and the large admin changelists. "
+        "With --baseline, fail if a view's query count or p95 latency regressed."
+    )
+
+    def add_arguments(self, parser):
+        school = parser.add_argument_group('synthetic school')
+        school.add_argument('--classes', type=int, default=6)
+        school.add_argument('--students-per-class', type=int, default=35)
+        school.add_argument('--subjects', type=int, default=8)
+        school.add_argument('--terms', type=int, default=3)
+        school.add_argument('--days', type=int, default=60, help="School days of attendance.")
+        school.add_argument('--seed', type=int, default=0)
+
+        run = parser.add_argument_group('measurement')
+        run.add_argument('--repeat', type=int, default=20, help="Timed requests per view (default 20).")
+        run.add_argument('--warmup', type=int, default=2, help="Untimed requests per view first (default 2).")
+        run.add_argument('--only', action='append', default=[], help="Only benchmark this view label (repeatable).")
+        run.add_argument('--output', help="Write the results as JSON to this file.")
+        run.add_argument('--keepdb', action='store_true', help="Reuse the test database between runs.")
+
+        gate = parser.add_argument_group('threshold mode')
+        gate.add_argument('--baseline', help="JSON from an earlier --output run to compare against.")
+        gate.add_argument('--query-tolerance', type=int, default=0,
+                          help="Extra queries per view allowed over the baseline (default 0).")
+        gate.add_argument('--latency-tolerance', type=float, default=0.25,
+                          help="Allowed p95 slowdown as a fraction of the baseline (default 0.25 = 25%%).")
+
+    def handle(self, *args, **options):
+        with synthetic.throwaway_database(keepdb=options['keepdb']):
+            school = synthetic.build_school(
+                classes=options['classes'], students_per_class=options['students_per_class'],
+                subjects=options['subjects'], terms=options['terms'], days=options['days'], seed=options['seed'],
+            )
+            scenarios = synthetic.view_scenarios(school) + synthetic.admin_scenarios(school)
+            if options['only']:
+                scenarios = [scenario for scenario in scenarios if scenario[0] in options['only']]
+            views = {
+                label: self._measure(url, user, options['repeat'], options['warmup'])
+                for label, url, user in scenarios
+            }
+
+        report = {
+            'vendor': connection.vendor,
+            'school': {key: options[key] for key in ('classes', 'students_per_class', 'subjects', 'terms', 'days', 'seed')},
+            'repeat': options['repeat'],
+            'views': views,
+        }
+        self._print(views)
+        if options['output']:
+            with open(options['output'], 'w') as fh:
+                json.dump(report, fh, indent=2)
+            self.stdout.write(f"Results written to {options['output']}")
+
+        if options['baseline']:
+            with open(options['baseline']) as fh:
+                baseline = json.load(fh)
+            regressions = self._compare(views, baseline['views'], options['query_tolerance'], options['latency_tolerance'])
+            for line in regressions:
+                self.stderr.write(line)
+            if regressions:
+                raise CommandError(f"{len(regressions)} regressions against {options['baseline']}.")
+            self.stdout.write(self.style.SUCCESS("No regressions against the baseline."))
+
+    def _measure(self, url, user, repeat, warmup):
+        client = Client()
+        if user is not None:
+            client.force_login(user)
+        sql = {'count': 0, 'seconds': 0.0}
+
+        def timed_sql(execute, *args):
+            start = time.perf_counter()
+            try:
+                return execute(*args)
+            finally:
+                sql['seconds'] += time.perf_counter() - start
+                sql['count'] += 1
+
+        def fetch():
+            response = client.get(url)
+            if response.streaming:
+                b''.join(response.streaming_content) # Include the time to stream the whole export
+            if response.status_code >= 400:
+                raise CommandError(f"{url} returned HTTP {response.status_code}.")
+            return response
+
+        for _ in range(warmup):
+            fetch()
+
+        wall_times, sql_times, query_counts = [], [], []
+        for _ in range(repeat):
+            sql.update(count=0, seconds=0.0)
+            with connection.execute_wrapper(timed_sql):
+                start = time.perf_counter()
+                fetch()
+                wall_times.append(time.perf_counter() - start)
+            sql_times.append(sql['seconds'])
+            query_counts.append(sql['count'])
+
+        # Peak memory on a separate request: tracemalloc itself slows everything down
+        tracemalloc.start()
+        try:
+            fetch()
+            _, peak = tracemalloc.get_traced_memory()
+        finally:
+            tracemalloc.stop()
+
+        return {
+            'url': url,
+            'queries': max(query_counts),
+            'wall_ms': _summary(wall_times),
+            'sql_ms': _summary(sql_times),
+            'peak_memory_kb': round(peak / 1024, 1),
+        }
+
+    def _print(self, views):
+        self.stdout.write(f"{'view':<30} {'queries':>7} {'p50 ms':>8} {'p95 ms':>8} {'sql ms':>8} {'peak KB':>9}")
+        for label, result in views.items():
+            self.stdout.write(
+                f"{label:<30} {result['queries']:>7} {result['wall_ms']['p50']:>8} {result['wall_ms']['p95']:>8} "
+                f"{result['sql_ms']['mean']:>8} {result['peak_memory_kb']:>9}"
+            )
+
+    def _compare(self, views, baseline, query_tolerance, latency_tolerance):
+        regressions = []
+        for label, result in views.items():
+            before = baseline.get(label)
+            if before is None:
+                continue # New view, nothing to compare against
+            if result['queries'] > before['queries'] + query_tolerance:
+                regressions.append(f"{label}: {result['queries']} queries (baseline {before['queries']})")
+            allowed = before['wall_ms']['p95'] * (1 + latency_tolerance)
+            if result['wall_ms']['p95'] > allowed:
+                regressions.append(
+                    f"{label}: p95 {result['wall_ms']['p95']} ms (baseline {before['wall_ms']['p95']} ms, allowed {allowed:.2f} ms)"
+                )
+        return regressions
+
+
+def _summary(seconds):
+    """mean/p50/p95/max in milliseconds for a list of durations in seconds."""
+    ordered = sorted(seconds)
+
+    def percentile(fraction):
+        # Nearest-rank percentile
+        return ordered[max(0, math.ceil(fraction * len(ordered)) - 1)]
+
+    return {
+        'mean': round(sum(ordered) / len(ordered) * 1000, 2),
+        'p50': round(percentile(0.50) * 1000, 2),
+        'p95': round(percentile(0.95) * 1000, 2),
+        'max': round(ordered[-1] * 1000, 2),
+    }
@@ -0,0 +1,57 @@
+# core/management/commands/check_query_plans.py
+import json
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.test import Client
+
+from core import queryplans, synthetic
+
+
+class Command(BaseCommand):
+    help = (
+        "Render every core view against a throwaway test database, EXPLAIN each query they issue "
+        "and fail if a hot table is read with a full table scan. Works on SQLite and PostgreSQL."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--output', help="Write every captured query and its plan to this JSON file.")
+        parser.add_argument('--keepdb', action='store_true', help="Reuse the test database between runs.")
+
+    def handle(self, *args, **options):
+        # Same isolation as the test runner: a separate test database, never the live one
+        with synthetic.throwaway_database(keepdb=options['keepdb']):
+            report = self._collect_plans()
+
+        if options['output']:
+            with open(options['output'], 'w') as fh:
+                json.dump({'vendor': connection.vendor, 'views': report}, fh, indent=2)
+
+        failures = 0
+        for label, plans in report.items():
+            scanned = [plan for plan in plans if plan['full_scans']]
+            failures += len(scanned)
+            status = self.style.ERROR('FULL SCAN') if scanned else self.style.SUCCESS('ok')
+            self.stdout.write(f"{label:<28} {len(plans):>3} queries  {status}")
+            for plan in scanned:
+                self.stdout.write(f"    tables: {', '.join(plan['full_scans'])}\n    {plan['sql']}\n    {plan['plan']}")
+
+        if failures:
+            raise CommandError(f"{failures} queries fall back to a full table scan on {connection.vendor}.")
+        self.stdout.write(self.style.SUCCESS(f"No full table scans on hot tables ({connection.vendor})."))
+
+    def _collect_plans(self):
+        school = synthetic.build_school()
+        report = {}
+        for label, url, user in synthetic.view_scenarios(school):
+            client = Client()
+            if user is not None:
+                client.force_login(user)
+            with queryplans.capture_queries() as captured:
+                response = client.get(url)
+                if response.streaming:
+                    b''.join(response.streaming_content) # Streaming exports query while being consumed
+            if response.status_code >= 400:
+                raise CommandError(f"{label} ({url}) returned HTTP {response.status_code}.")
+            report[label] = queryplans.full_scans(captured)
+        return report
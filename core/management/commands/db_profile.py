@@ -0,0 +1,38 @@
+# core/management/commands/db_profile.py
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connections
+
+from core import db_tuning
+
+
+class Command(BaseCommand):
+    help = (
+        "Show the database settings in effect (SQLite pragmas, PostgreSQL pool and timeouts) "
+        "next to what the DJANGO_DB_PROFILE tuning profile asks for."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--database', default='default', help="Database alias (default: default).")
+        parser.add_argument('--verify', action='store_true',
+                            help="Exit non-zero if a setting differs from the profile.")
+
+    def handle(self, *args, **options):
+        connection = connections[options['database']]
+        rows = db_tuning.report(connection)
+        self.stdout.write(
+            f"Database '{connection.alias}' ({connection.vendor}, {connection.settings_dict['NAME']}), "
+            f"profile: {settings.DB_PROFILE}"
+        )
+        if not rows:
+            self.stdout.write(f"No tuning applies to {connection.vendor}.")
+            return
+        mismatches = 0
+        for name, actual, wanted in rows:
+            line = f"  {name:<24} {actual}"
+            if not db_tuning.matches(actual, wanted):
+                mismatches += 1
+                line = self.style.WARNING(f"{line}   (profile: {wanted})")
+            self.stdout.write(line)
+        if mismatches and options['verify']:
+            raise CommandError(f"{mismatches} settings differ from the '{settings.DB_PROFILE}' profile.")
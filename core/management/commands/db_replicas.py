@@ -0,0 +1,67 @@
+# core/management/commands/db_replicas.py
+import sqlite3
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connections
+
+from core.db_routers import PRIMARY
+
+
+class Command(BaseCommand):
+    help = (
+        "List the read replicas from DJANGO_DB_REPLICAS and check that each answers "
+        "(with its replication lag on PostgreSQL). For trying replicas locally with SQLite "
+        "files, --sync copies the primary SQLite database into every SQLite replica."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--sync', action='store_true',
+                            help="Copy the primary SQLite database into the SQLite replicas first.")
+
+    def handle(self, *args, **options):
+        replicas = settings.DB_REPLICAS
+        if not replicas:
+            self.stdout.write("No replicas configured (DJANGO_DB_REPLICAS); all reads use the primary.")
+            return
+        if options['sync']:
+            self._sync(replicas)
+
+        failed = 0
+        for alias in replicas:
+            connection = connections[alias]
+            try:
+                with connection.cursor() as cursor:
+                    if connection.vendor == 'postgresql':
+                        cursor.execute("SELECT pg_is_in_recovery(), now() - pg_last_xact_replay_timestamp()")
+                        in_recovery, lag = cursor.fetchone()
+                        state = f"lag {lag}" if in_recovery else "not a streaming replica"
+                    else:
+                        cursor.execute("SELECT 1")
+                        state = "reachable"
+            except Exception as e:
+                failed += 1
+                self.stderr.write(f"{alias} ({connection.vendor}, {connection.settings_dict['NAME']}): {e}")
+                continue
+            self.stdout.write(f"{alias} ({connection.vendor}, {connection.settings_dict['NAME']}): {state}")
+        self.stdout.write(f"Reads of the busiest pages stay on the primary for "
+                          f"{settings.DB_REPLICA_STICKY_SECONDS}s after a browser writes.")
+        if failed:
+            raise CommandError(f"{failed} of {len(replicas)} replicas are unreachable.")
+
+    def _sync(self, replicas):
+        primary = connections[PRIMARY]
+        if primary.vendor != 'sqlite':
+            raise CommandError("--sync only copies SQLite databases; PostgreSQL replicas follow the primary themselves.")
+        primary.ensure_connection()
+        for alias in replicas:
+            connection = connections[alias]
+            if connection.vendor != 'sqlite':
+                continue
+            connection.close()
+            target = sqlite3.connect(connection.settings_dict['NAME'])
+            try:
+                primary.connection.backup(target) # Consistent online copy, even while the site writes
+            finally:
+                target.close()
+            self.stdout.write(f"Copied the primary into {alias}.")
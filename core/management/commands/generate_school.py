@@ -0,0 +1,225 @@
+# core/management/commands/generate_school.py
+import bisect
+import itertools
+import math
+import random
+import time
+from contextlib import contextmanager
+from datetime import datetime, time as dt_time, timedelta
+
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, transaction
+from django.utils import timezone
+from django.utils.dateparse import parse_date
+
+from core import aggregates, attendance, attendance_bitmap, search, synthetic
+from core.models import AttendanceRecord, ParentProfile, Result, SchoolClass, Student, Subject, TeacherProfile
+
+# SQLite settings for the duration of the load only; restored afterwards
+SQLITE_LOAD_PRAGMAS = {
+    'synchronous': 'OFF',
+    'temp_store': 'MEMORY',
+    'cache_size': '-262144', # 256 MB page cache
+}
+
+
+class Command(BaseCommand):
+    help = (
+        "Generate a large, realistic synthetic school directly into the configured database. "
+        "Deterministic for a given --seed and --end-date. "
+        "Production scale: --students 100000 --subjects 10 --terms 5 --days 200 "
+        "(5M results, 20M attendance records)."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--students', type=int, default=1000)
+        parser.add_argument('--students-per-class', type=int, default=35)
+        parser.add_argument('--subjects', type=int, default=10)
+        parser.add_argument('--terms', type=int, default=5, help="Results per student per subject.")
+        parser.add_argument('--days', type=int, default=200, help="School days of attendance per student.")
+        parser.add_argument('--end-date', help="Last attendance date, YYYY-MM-DD (default today).")
+        parser.add_argument('--seed', type=int, default=0)
+        parser.add_argument('--batch-size', type=int, default=50000, help="Rows per insert batch / COPY buffer.")
+        parser.add_argument('--skip-aggregates', action='store_true',
+                            help="Do not rebuild the gradebook aggregates, attendance rollups and student search "
+                                 "documents afterwards (run rebuild_aggregates and rebuild_search_index later).")
+
+    def handle(self, *args, **options):
+        self.rng = random.Random(options['seed'])
+        self.prefix = f"gen{options['seed']}"
+        self.inserter = synthetic.FastInserter(batch_size=options['batch_size'])
+        self.timings = []
+        end_date = parse_date(options['end_date']) if options['end_date'] else timezone.now().date()
+        if end_date is None:
+            raise CommandError("--end-date must be YYYY-MM-DD.")
+        if Student.objects.filter(student_id__startswith=f'{self.prefix}-').exists():
+            raise CommandError(f"A school with seed {options['seed']} already exists; choose another --seed.")
+
+        started = time.perf_counter()
+        with self._fast_load(), transaction.atomic():
+            classes, subjects = self._generate_structure(options)
+            students = self._generate_students(options, classes)
+            self._generate_results(options, students, subjects)
+            self._generate_attendance(options, students, end_date)
+        if not options['skip_aggregates']:
+            with self._timed('gradebook aggregates') as counter:
+                for class_id in classes:
+                    with transaction.atomic():
+                        counter['rows'] += aggregates.rebuild_class(class_id)
+            with self._timed('attendance daily rollup') as counter:
+                for class_id in classes:
+                    with transaction.atomic():
+                        counter['rows'] += attendance.rebuild_class_summaries(class_id)
+            with self._timed('attendance bitmaps') as counter:
+                for class_id in classes:
+                    with transaction.atomic():
+                        counter['rows'] += attendance_bitmap.rebuild_class_years(class_id)
+            with self._timed('student search documents') as counter:
+                with transaction.atomic():
+                    counter['rows'] += search.refresh(search.STUDENT, [pk for pk, _ in students])
+
+        total_rows = sum(rows for _, rows, _ in self.timings)
+        elapsed = time.perf_counter() - started
+        self.stdout.write(self.style.SUCCESS(
+            f"Generated {total_rows:,} rows in {elapsed:.1f}s ({total_rows / elapsed:,.0f} rows/s overall)."
+        ))
+
+    # --- Steps ---
+
+    def _generate_structure(self, options):
+        User = get_user_model()
+        num_classes = math.ceil(options['students'] / options['students_per_class'])
+        with self._timed('teachers, classes, subjects') as counter:
+            admin = User.objects.create_superuser(f'{self.prefix}_admin', password=synthetic.SYNTHETIC_PASSWORD)
+            self.password = admin.password # Hash once, reuse for every generated user
+            teachers = User.objects.bulk_create([
+                User(username=f'{self.prefix}_teacher{c}', first_name='Teacher', last_name=str(c), password=self.password)
+                for c in range(num_classes)
+            ], batch_size=5000)
+            TeacherProfile.objects.bulk_create([TeacherProfile(user=teacher) for teacher in teachers], batch_size=5000)
+            classes = SchoolClass.objects.bulk_create([
+                SchoolClass(name=f'{self.prefix} Grade {c}', academic_year='2025-2026', class_teacher=teacher)
+                for c, teacher in enumerate(teachers)
+            ], batch_size=5000)
+            subjects = Subject.objects.bulk_create([
+                Subject(name=f'{self.prefix} Subject {s}') for s in range(options['subjects'])
+            ])
+            counter['rows'] = 1 + 2 * len(teachers) + len(classes) + len(subjects)
+        return {c.pk: c.class_teacher_id for c in classes}, [s.pk for s in subjects]
+
+    def _generate_students(self, options, classes):
+        """Students in class order, then one parent user per pair of siblings."""
+        User = get_user_model()
+        ops = connection.ops
+        class_ids = list(classes)
+        per_class = options['students_per_class']
+        today = timezone.now().date()
+
+        with self._timed('students') as counter:
+            counter['rows'] = self.inserter.insert(Student, ['student_id', 'first_name', 'last_name', 'date_of_birth', 'current_class_id'], (
+                (f'{self.prefix}-{n:07d}', f'First{n}', f'Last{n % 997}',
+                 ops.adapt_datefield_value(today - timedelta(days=self.rng.randint(6 * 365, 17 * 365))),
+                 class_ids[n // per_class])
+                for n in range(options['students'])
+            ))
+        students = list(
+            Student.objects.filter(student_id__startswith=f'{self.prefix}-')
+            .order_by('student_id').values_list('pk', 'current_class_id')
+        )
+
+        with self._timed('parents and profiles') as counter:
+            parents = User.objects.bulk_create([
+                User(username=f'{self.prefix}_parent{p}', first_name='Parent', last_name=str(p), password=self.password)
+                for p in range(math.ceil(len(students) / 2))
+            ], batch_size=5000)
+            ParentProfile.objects.bulk_create([ParentProfile(user=parent) for parent in parents], batch_size=5000)
+            counter['rows'] = 2 * len(parents)
+        with self._timed('student-parent links') as counter:
+            counter['rows'] = self.inserter.insert(Student.parents.through, ['student_id', 'user_id'], (
+                (student_id, parents[i // 2].pk) for i, (student_id, _) in enumerate(students)
+            ))
+        # (student_id, class_id, class teacher id) for the big tables
+        return [(student_id, class_id, classes[class_id]) for student_id, class_id in students]
+
+    def _generate_results(self, options, students, subjects):
+        ops = connection.ops
+        terms = [f'Term {t + 1}' for t in range(options['terms'])]
+        # One recorded timestamp per term, spread over the past year
+        now = timezone.now()
+        recorded = {
+            term: ops.adapt_datetimefield_value(now - timedelta(days=365 * (len(terms) - t) // len(terms)))
+            for t, term in enumerate(terms)
+        }
+        grade_floors, grade_letters = (60, 70, 80, 90), 'FDCBA'
+        random_score = self.rng.random
+
+        def rows():
+            for student_id, class_id, teacher_id in students:
+                for subject_id in subjects:
+                    for term in terms:
+                        score = round(35 + 65 * random_score(), 1)
+                        grade = grade_letters[bisect.bisect(grade_floors, score)]
+                        yield (student_id, subject_id, class_id, term, score, grade, '', teacher_id,
+                               recorded[term], recorded[term])
+
+        with self._timed('results') as counter:
+            counter['rows'] = self.inserter.insert(Result, [
+                'student_id', 'subject_id', 'school_class_id', 'term_exam_name', 'score', 'grade',
+                'comments', 'recorded_by_id', 'date_recorded', 'last_updated',
+            ], rows())
+
+    def _generate_attendance(self, options, students, end_date):
+        ops = connection.ops
+        dates = synthetic.school_days(options['days'], end_date)
+        adapted = [
+            (ops.adapt_datefield_value(day),
+             ops.adapt_datetimefield_value(timezone.make_aware(datetime.combine(day, dt_time(8, 30)))))
+            for day in dates
+        ]
+        # Cumulative weights: one random() and a bisect per row instead of rng.choices()
+        statuses, weights = zip(*synthetic.STATUS_WEIGHTS)
+        limits = list(itertools.accumulate(weight / sum(weights) for weight in weights))
+        random_draw = self.rng.random
+
+        def rows():
+            for day, stamp in adapted:
+                for student_id, class_id, teacher_id in students:
+                    status = statuses[bisect.bisect(limits, random_draw())]
+                    yield (student_id, day, status, teacher_id, class_id, '', stamp)
+
+        with self._timed('attendance records') as counter:
+            counter['rows'] = self.inserter.insert(AttendanceRecord, [
+                'student_id', 'date', 'status', 'recorded_by_id', 'school_class_id', 'notes', 'timestamp',
+            ], rows())
+
+    # --- Helpers ---
+
+    @contextmanager
+    def _timed(self, label):
+        counter = {'rows': 0}
+        start = time.perf_counter()
+        yield counter
+        elapsed = time.perf_counter() - start
+        self.timings.append((label, counter['rows'], elapsed))
+        rate = counter['rows'] / elapsed if elapsed else 0
+        self.stdout.write(f"{label:<30} {counter['rows']:>12,} rows {elapsed:>8.1f}s {rate:>12,.0f} rows/s")
+
+    @contextmanager
+    def _fast_load(self):
+        """Relax SQLite durability for the load; other backends need no session changes."""
+        if connection.vendor != 'sqlite':
+            yield
+            return
+        with connection.cursor() as cursor:
+            previous = {}
+            for pragma, value in SQLITE_LOAD_PRAGMAS.items():
+                cursor.execute(f'PRAGMA {pragma}')
+                previous[pragma] = cursor.fetchone()[0]
+                cursor.execute(f'PRAGMA {pragma} = {value}')
+        try:
+            yield
+        finally:
+            with connection.cursor() as cursor:
+                for pragma, value in previous.items():
+                    cursor.execute(f'PRAGMA {pragma} = {value}')
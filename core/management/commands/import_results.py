@@ -0,0 +1,40 @@
+# core/management/commands/import_results.py
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand, CommandError
+
+from core import result_import
+
+
+class Command(BaseCommand):
+    help = "Bulk import (upsert) results from a CSV or XLSX file, as the admin's Bulk import does."
+
+    def add_arguments(self, parser):
+        parser.add_argument('path', help="Path to a .csv or .xlsx file.")
+        parser.add_argument('--dry-run', action='store_true', help="Validate and report without writing.")
+        parser.add_argument('--recorded-by', help="Username to record as the author of the results.")
+
+    def handle(self, *args, **options):
+        recorded_by = None
+        if options['recorded_by']:
+            User = get_user_model()
+            try:
+                recorded_by = User.objects.get(username=options['recorded_by'])
+            except User.DoesNotExist:
+                raise CommandError(f"No user named '{options['recorded_by']}'.")
+
+        try:
+            with open(options['path'], 'rb') as fh:
+                plan = result_import.plan_import(fh)
+        except (OSError, result_import.ResultImportError) as e:
+            raise CommandError(str(e))
+
+        for row_number, message in plan.errors:
+            self.stderr.write(f"row {row_number}: {message}")
+        if plan.errors:
+            raise CommandError(f"{len(plan.errors)} rows are invalid; nothing was imported.")
+
+        self.stdout.write(f"{plan.new_count} new, {plan.update_count} updated.")
+        if options['dry_run']:
+            return
+        count = result_import.apply_rows(plan.rows, recorded_by=recorded_by)
+        self.stdout.write(self.style.SUCCESS(f"Imported {count} results."))
@@ -0,0 +1,46 @@
+# core/management/commands/media_gc.py
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand, CommandError
+
+from core import media
+
+
+class Command(BaseCommand):
+    help = (
+        "Delete uploaded files (and their responsive variants) that no carousel image, news image or "
+        "student references any more and have not been used for --grace-hours. Reference counts are "
+        "corrected from the rows first; --verify only checks them, --adopt moves files uploaded before "
+        "content addressing to their content-hash names."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--verify', action='store_true',
+                            help="Only compare stored reference counts with the rows; exit non-zero on mismatch.")
+        parser.add_argument('--dry-run', action='store_true', help="Report what would be deleted without deleting.")
+        parser.add_argument('--grace-hours', type=float, default=24,
+                            help="Keep unreferenced files this long, for uploads still being saved (default 24).")
+        parser.add_argument('--adopt', action='store_true',
+                            help="First move referenced legacy uploads to content-addressed names.")
+
+    def handle(self, *args, **options):
+        if options['verify']:
+            stale = media.stale_counts()
+            for name, stored, actual in stale[:50]:
+                self.stderr.write(f"{name}: stored={stored} references={actual}")
+            if stale:
+                raise CommandError(f"{len(stale)} reference counts are wrong; run without --verify to correct them.")
+            self.stdout.write(self.style.SUCCESS("Reference counts consistent."))
+            return
+
+        dry_run = options['dry_run']
+        if options['adopt']:
+            adopted = media.adopt(dry_run=dry_run)
+            self.stdout.write(f"{'Would adopt' if dry_run else 'Adopted'} {adopted} legacy files.")
+        fixed = len(media.stale_counts()) if dry_run else media.recount()
+        if fixed:
+            self.stdout.write(f"{'Would correct' if dry_run else 'Corrected'} {fixed} reference counts.")
+        deleted, freed = media.collect_garbage(timedelta(hours=options['grace_hours']), dry_run=dry_run)
+        self.stdout.write(self.style.SUCCESS(
+            f"{'Would delete' if dry_run else 'Deleted'} {deleted} unreferenced files ({freed / 1024 / 1024:.1f} MB)."
+        ))
@@ -0,0 +1,68 @@
+# core/management/commands/process_images.py
+import os
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+import django
+from django.core.management.base import BaseCommand
+from django.db import connections
+
+from core import images, public_cache
+from core.models import CarouselImage, ImageVariants, NewsImage, Student
+
+# (model, image field, public cache group to refresh)
+SOURCES = (
+    (CarouselImage, 'image', public_cache.CAROUSEL),
+    (NewsImage, 'image', public_cache.NEWS),
+    (Student, 'profile_picture', None),
+)
+
+
+def _init_worker():
+    # Under the 'spawn' start method workers begin with an unconfigured Django
+    django.setup()
+
+
+class Command(BaseCommand):
+    help = (
+        "Generate the responsive variants (resized JPEG/PNG and WebP copies, without EXIF) of "
+        "existing carousel, news and student profile images. Images are rendered in parallel "
+        "worker processes; already processed images are skipped unless --force is given."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--workers', type=int, default=os.cpu_count() or 1,
+                            help="Number of worker processes (default: one per CPU).")
+        parser.add_argument('--force', action='store_true', help="Re-render images that already have variants.")
+
+    def handle(self, *args, **options):
+        done = set() if options['force'] else set(ImageVariants.objects.values_list('source', flat=True))
+        pending = {} # source name -> public cache group
+        for model, field, group in SOURCES:
+            for name in model.objects.exclude(**{field: ''}).exclude(**{f'{field}__isnull': True}).values_list(field, flat=True):
+                if name not in done:
+                    pending.setdefault(name, group)
+        if not pending:
+            self.stdout.write(self.style.SUCCESS("All images already have variants."))
+            return
+
+        # Workers only touch files; results are recorded here, on this process's connection
+        connections.close_all() # Never share an open connection with forked workers
+        files = failed = 0
+        with ProcessPoolExecutor(max_workers=max(1, options['workers']), initializer=_init_worker) as pool:
+            futures = {pool.submit(images.render, name): name for name in pending}
+            for future in as_completed(futures):
+                name = futures[future]
+                try:
+                    width, height, variants = future.result()
+                except Exception as e: # Missing or unreadable file: report it and carry on
+                    failed += 1
+                    self.stderr.write(f"{name}: {e}")
+                    continue
+                images.store(name, width, height, variants)
+                files += len(variants)
+
+        for group in {group for group in pending.values() if group}:
+            public_cache.bump(group)
+        self.stdout.write(self.style.SUCCESS(
+            f"Processed {len(pending) - failed} images ({files} variant files); {failed} failed."
+        ))
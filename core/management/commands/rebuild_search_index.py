@@ -0,0 +1,39 @@
+# core/management/commands/rebuild_search_index.py
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+
+from core import search
+
+
+class Command(BaseCommand):
+    help = (
+        "Rebuild (or with --verify, check) the search documents of students, news articles and "
+        "announcements and the database's full-text index over them. Run after loading fixtures "
+        "or editing those tables directly in the database."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--verify', action='store_true',
+                            help="Only compare the stored documents with the current rows; exit non-zero on mismatch.")
+        parser.add_argument('--kind', choices=search.KINDS, action='append', default=[],
+                            help="Limit to this kind of object (repeatable). Default: all.")
+
+    def handle(self, *args, **options):
+        kinds = options['kind'] or search.KINDS
+        if options['verify']:
+            problems = [(kind, pk, problem) for kind in kinds for pk, problem in search.verify(kind)]
+            for kind, pk, problem in problems[:50]:
+                self.stderr.write(f"{kind} {pk}: {problem}")
+            if problems:
+                raise CommandError(f"{len(problems)} search documents are out of date; run without --verify to rebuild.")
+            self.stdout.write(self.style.SUCCESS(f"Search documents consistent for {', '.join(kinds)}."))
+            return
+
+        written = {}
+        for kind in kinds:
+            with transaction.atomic():
+                written[kind] = search.rebuild(kind)
+        search.rebuild_index()
+        self.stdout.write(self.style.SUCCESS(
+            "Rebuilt " + ", ".join(f"{count} {kind} documents" for kind, count in written.items()) + "."
+        ))
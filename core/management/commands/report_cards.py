@@ -0,0 +1,47 @@
+# core/management/commands/report_cards.py
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+
+from core import report_cards
+from core.models import SchoolClass, Student
+
+
+class Command(BaseCommand):
+    help = (
+        "Write printable report cards for one term as a zip (one folder per class). Pick classes with "
+        "--class (repeatable) or a whole academic year with --academic-year; rendering runs on a process pool."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--term', required=True, help="Term/exam name, e.g. 'Term 1'.")
+        parser.add_argument('--class', dest='class_ids', type=int, action='append', default=[],
+                            help="SchoolClass id (repeat for several classes).")
+        parser.add_argument('--academic-year', help="Every class of this academic year, e.g. 2024-2025.")
+        parser.add_argument('--output', help="Zip file to write (default: a name derived from the classes and term).")
+        parser.add_argument('--workers', type=int, default=None, help="Rendering processes (default: one per CPU).")
+
+    def handle(self, *args, **options):
+        classes = SchoolClass.objects.order_by('academic_year', 'name')
+        if options['class_ids']:
+            classes = classes.filter(pk__in=options['class_ids'])
+        elif options['academic_year']:
+            classes = classes.filter(academic_year=options['academic_year'])
+        else:
+            raise CommandError("Give --class or --academic-year.")
+        classes = list(classes)
+        if not classes:
+            raise CommandError("No matching classes.")
+
+        started = time.perf_counter()
+        cards = report_cards.collect(Student.objects.filter(current_class__in=classes), options['term'])
+        collected = time.perf_counter()
+        output = options['output'] or report_cards.zip_filename(options['term'], [str(c) for c in classes])
+        with open(output, 'wb') as fh:
+            count = report_cards.write_zip(cards, fh, workers=options['workers'])
+        finished = time.perf_counter()
+
+        self.stdout.write(self.style.SUCCESS(
+            f"Wrote {count} report cards for {len(classes)} classes to {output} "
+            f"(data {collected - started:.2f}s, rendering {finished - collected:.2f}s)."
+        ))
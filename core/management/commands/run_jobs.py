@@ -0,0 +1,60 @@
+# core/management/commands/run_jobs.py
+import signal
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from django.core.management.base import BaseCommand
+from django.db import connections
+
+from core import jobs
+
+PURGE_INTERVAL = 60 * 60 # Seconds between clean-ups of old finished jobs
+
+
+class Command(BaseCommand):
+    help = (
+        "Run queued background jobs (exports, imports, class moves, image processing) on a pool "
+        "of worker threads. Several run_jobs processes can share the queue; each job runs once."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--workers', type=int, default=2, help="Jobs run at the same time (default: 2).")
+        parser.add_argument('--poll', type=float, default=2.0, help="Seconds between checks of an empty queue.")
+        parser.add_argument('--once', action='store_true', help="Exit when no job is due instead of waiting.")
+
+    def handle(self, *args, **options):
+        workers = max(1, options['workers'])
+        stopping = threading.Event()
+
+        def stop(signum, frame):
+            self.stdout.write("Stopping after the running jobs finish...")
+            stopping.set()
+        signal.signal(signal.SIGTERM, stop)
+        signal.signal(signal.SIGINT, stop)
+
+        ran = 0
+        last_purge = 0
+        running = set()
+        with ThreadPoolExecutor(max_workers=workers, thread_name_prefix='jobs') as pool:
+            while not stopping.is_set():
+                running = {future for future in running if not future.done()}
+                claimed = jobs.claim(workers - len(running)) if len(running) < workers else []
+                for job in claimed:
+                    self.stdout.write(f"Running {job}")
+                    running.add(pool.submit(jobs.run, job))
+                ran += len(claimed)
+                if claimed:
+                    continue
+
+                if time.monotonic() - last_purge > PURGE_INTERVAL:
+                    purged = jobs.purge()
+                    if purged:
+                        self.stdout.write(f"Deleted {purged} old jobs.")
+                    last_purge = time.monotonic()
+                if options['once'] and not running:
+                    break
+                connections.close_all() # Do not hold a connection (or a SQLite lock) while idle
+                stopping.wait(options['poll'])
+
+        self.stdout.write(self.style.SUCCESS(f"Ran {ran} jobs."))
@@ -0,0 +1,196 @@
+# core/media.py
+"""
+Reference counting and garbage collection of uploaded files.
+
+The upload storage (core/storage.py) keeps one file per distinct content, so
+several rows may point at the same file. StoredFile.refcount says how many:
+the model signals call retain() when a row starts using a file and release()
+when it stops (new upload, cleared field, deleted row), in the same transaction
+as the row change. Nothing is deleted then; `manage.py media_gc` later removes
+files that have had no references for a grace period, with their responsive
+variants. Like the gradebook aggregates, the counts can be rebuilt from the
+rows themselves (recount) if they ever drift, e.g. after bulk SQL edits.
+"""
+import os
+import posixpath
+from datetime import timedelta
+
+from django.core.files import File
+from django.db import IntegrityError, transaction
+from django.db.models import F
+from django.utils import timezone
+
+from . import images, public_cache
+from .models import CarouselImage, ImageVariants, NewsImage, StoredFile, Student
+from .storage import ROOT, VARIANTS_DIR, is_content_addressed, upload_storage
+
+# Every file field using the upload storage: (model, field name)
+FILE_FIELDS = (
+    (CarouselImage, 'image'),
+    (NewsImage, 'image'),
+    (Student, 'profile_picture'),
+)
+# Folders uploads were written to before content addressing; swept for unreferenced files too
+LEGACY_UPLOAD_DIRS = ('carousel_images', 'news_images', 'student_profiles')
+DEFAULT_GRACE = timedelta(hours=24)
+BATCH_SIZE = 500
+
+
+# --- Live reference counts (called from core.signals) ---
+
+def retain(name):
+    """One more row references `name`."""
+    now = timezone.now()
+    if StoredFile.objects.filter(name=name).update(refcount=F('refcount') + 1, updated_at=now):
+        return
+    try:
+        with transaction.atomic():
+            StoredFile.objects.create(name=name, size=_size(name), refcount=1)
+    except IntegrityError: # Created concurrently
+        StoredFile.objects.filter(name=name).update(refcount=F('refcount') + 1, updated_at=now)
+
+
+def release(name):
+    """One row fewer references `name`; the file stays until media_gc finds it unreferenced."""
+    StoredFile.objects.filter(name=name, refcount__gt=0).update(
+        refcount=F('refcount') - 1, updated_at=timezone.now())
+
+
+# --- Rebuilding the counts ---
+
+def count_references():
+    """{name: number of rows referencing it}, from the rows themselves."""
+    counts = {}
+    for model, field in FILE_FIELDS:
+        for name in model.objects.exclude(**{field: ''}).exclude(**{f'{field}__isnull': True}).values_list(field, flat=True).iterator():
+            counts[name] = counts.get(name, 0) + 1
+    return counts
+
+
+def stale_counts():
+    """[(name, stored refcount or None, actual references)] for every count that is wrong."""
+    actual = count_references()
+    stored = dict(StoredFile.objects.values_list('name', 'refcount'))
+    return sorted(
+        (name, stored.get(name), actual.get(name, 0))
+        for name in stored.keys() | actual.keys()
+        if stored.get(name) != actual.get(name, 0) and not (name not in stored and not actual.get(name))
+    )
+
+
+def recount():
+    """Correct every stored count from the rows (files never tracked get a row). Returns the number fixed."""
+    fixed = stale_counts()
+    now = timezone.now()
+    with transaction.atomic():
+        for name, stored, actual in fixed:
+            if stored is None:
+                StoredFile.objects.create(name=name, size=_size(name), refcount=actual)
+            else:
+                StoredFile.objects.filter(name=name).update(refcount=actual, updated_at=now)
+    return len(fixed)
+
+
+# --- Garbage collection (manage.py media_gc) ---
+
+def collect_garbage(grace=DEFAULT_GRACE, dry_run=False):
+    """
+    Delete files unreferenced for longer than `grace`, with their variants:
+    tracked files whose count is zero, and untracked files left in the upload
+    folders (an upload whose row was never saved, copies from before content
+    addressing). Returns (files deleted, bytes freed).
+    """
+    cutoff = timezone.now() - grace
+    storage = upload_storage()
+    deleted = freed = 0
+
+    # Tracked files: the row is deleted first, and only if it is still unreferenced and
+    # untouched, so a concurrent re-upload of the same content keeps its file
+    unreferenced = StoredFile.objects.filter(refcount=0, updated_at__lt=cutoff)
+    last_pk = 0
+    while True:
+        batch = list(unreferenced.filter(pk__gt=last_pk).order_by('pk').values_list('pk', 'name', 'size', 'updated_at')[:BATCH_SIZE])
+        if not batch:
+            break
+        last_pk = batch[-1][0]
+        for pk, name, size, updated_at in batch:
+            if dry_run or StoredFile.objects.filter(pk=pk, refcount=0, updated_at=updated_at).delete()[0]:
+                if not dry_run:
+                    _delete(storage, name)
+                deleted += 1
+                freed += size
+
+    # Untracked files on disk (checked against the rows too, in case counts were never built)
+    kept = set(StoredFile.objects.values_list('name', flat=True)) | count_references().keys()
+    for name, size, modified in _stored_files(storage):
+        if name in kept or modified >= cutoff:
+            continue
+        if not dry_run:
+            _delete(storage, name)
+        deleted += 1
+        freed += size
+    return deleted, freed
+
+
+def adopt(dry_run=False):
+    """
+    Move files still referenced under their old upload names into the content-addressed
+    layout, pointing every row at the new name (duplicates collapse into one file).
+    The old files lose their references and are removed by the next collection.
+    Returns the number of files adopted.
+    """
+    storage = upload_storage()
+    adopted = 0
+    for name in sorted(count_references()):
+        if is_content_addressed(name) or not storage.exists(name):
+            continue
+        adopted += 1
+        if dry_run:
+            continue
+        with storage.open(name, 'rb') as fh:
+            new_name = storage.save(name, File(fh, name=name))
+        with transaction.atomic():
+            for model, field in FILE_FIELDS:
+                # update(): the signals would count the change twice, the counts are rebuilt below
+                model.objects.filter(**{field: name}).update(**{field: new_name})
+            # Keep the rendered variants under the new name unless it already has its own
+            if ImageVariants.objects.filter(source=new_name).exists():
+                transaction.on_commit(lambda name=name: images.discard(name))
+            else:
+                ImageVariants.objects.filter(source=name).update(source=new_name)
+    if adopted and not dry_run:
+        recount()
+        public_cache.bump(public_cache.CAROUSEL)
+        public_cache.bump(public_cache.NEWS)
+    return adopted
+
+
+# --- Helpers ---
+
+def _size(name):
+    try:
+        return upload_storage().size(name)
+    except OSError:
+        return 0
+
+
+def _delete(storage, name):
+    images.discard(name)
+    storage.delete(name)
+
+
+def _stored_files(storage):
+    """(name, size, modified) of every upload on disk (variant folders excluded)."""
+    for top in (ROOT,) + LEGACY_UPLOAD_DIRS:
+        if not storage.exists(top):
+            continue
+        pending = [top]
+        while pending:
+            directory = pending.pop()
+            subdirectories, files = storage.listdir(directory)
+            pending.extend(posixpath.join(directory, sub) for sub in subdirectories if sub != VARIANTS_DIR)
+            for filename in files:
+                name = posixpath.join(directory, filename)
+                path = storage.path(name)
+                modified = timezone.datetime.fromtimestamp(os.path.getmtime(path), tz=timezone.get_current_timezone())
+                yield name, os.path.getsize(path), modified
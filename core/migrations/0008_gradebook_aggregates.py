@@ -0,0 +1,65 @@
+# Generated by Django 5.1.3 on 2026-10-18 17:09
+
+import django.db.models.deletion
+from django.db import migrations, models
+from django.db.models import Count, Sum
+
+
+def populate_aggregates(apps, schema_editor):
+    """Backfill the aggregate tables from the existing results."""
+    Result = apps.get_model('core', 'Result')
+    StudentTermAggregate = apps.get_model('core', 'StudentTermAggregate')
+    ClassTermSubjectAggregate = apps.get_model('core', 'ClassTermSubjectAggregate')
+    scored = Result.objects.filter(score__isnull=False)
+
+    StudentTermAggregate.objects.bulk_create([
+        StudentTermAggregate(student_id=row['student'], term_exam_name=row['term_exam_name'],
+                             score_sum=row['score_sum'], score_count=row['score_count'])
+        for row in scored.values('student', 'term_exam_name').annotate(
+            score_sum=Sum('score'), score_count=Count('score')).order_by()
+    ], batch_size=1000)
+    ClassTermSubjectAggregate.objects.bulk_create([
+        ClassTermSubjectAggregate(school_class_id=row['student__current_class'], term_exam_name=row['term_exam_name'],
+                                  subject_id=row['subject'], score_sum=row['score_sum'], score_count=row['score_count'])
+        for row in scored.filter(student__current_class__isnull=False).values(
+            'student__current_class', 'term_exam_name', 'subject').annotate(
+            score_sum=Sum('score'), score_count=Count('score')).order_by()
+    ], batch_size=1000)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0007_student_profile_picture'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ClassTermSubjectAggregate',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('term_exam_name', models.CharField(max_length=100)),
+                ('score_sum', models.FloatField(default=0)),
+                ('score_count', models.PositiveIntegerField(default=0)),
+                ('school_class', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='term_subject_aggregates', to='core.schoolclass')),
+                ('subject', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='class_term_aggregates', to='core.subject')),
+            ],
+            options={
+                'unique_together': {('school_class', 'term_exam_name', 'subject')},
+            },
+        ),
+        migrations.CreateModel(
+            name='StudentTermAggregate',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('term_exam_name', models.CharField(max_length=100)),
+                ('score_sum', models.FloatField(default=0)),
+                ('score_count', models.PositiveIntegerField(default=0)),
+                ('student', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='term_aggregates', to='core.student')),
+            ],
+            options={
+                'unique_together': {('student', 'term_exam_name')},
+            },
+        ),
+        migrations.RunPython(populate_aggregates, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,46 @@
+# Generated by Django 5.1.3 on 2026-10-18 17:22
+
+import django.db.models.deletion
+from django.db import migrations, models
+from django.db.models import Count, Q
+
+
+def populate_summaries(apps, schema_editor):
+    """Backfill the daily rollup from the existing attendance records."""
+    AttendanceRecord = apps.get_model('core', 'AttendanceRecord')
+    AttendanceDailySummary = apps.get_model('core', 'AttendanceDailySummary')
+    rows = AttendanceRecord.objects.filter(school_class__isnull=False).values('school_class', 'date').annotate(
+        present_count=Count('pk', filter=Q(status='PRESENT')),
+        absent_count=Count('pk', filter=Q(status='ABSENT')),
+        late_count=Count('pk', filter=Q(status='LATE')),
+        excused_count=Count('pk', filter=Q(status='EXCUSED')),
+    ).order_by()
+    AttendanceDailySummary.objects.bulk_create([
+        AttendanceDailySummary(school_class_id=row.pop('school_class'), **row) for row in rows
+    ], batch_size=1000)
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0009_core_indexes'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='AttendanceDailySummary',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('date', models.DateField()),
+                ('present_count', models.PositiveIntegerField(default=0)),
+                ('absent_count', models.PositiveIntegerField(default=0)),
+                ('late_count', models.PositiveIntegerField(default=0)),
+                ('excused_count', models.PositiveIntegerField(default=0)),
+                ('school_class', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='attendance_days', to='core.schoolclass')),
+            ],
+            options={
+                'verbose_name_plural': 'attendance daily summaries',
+                'unique_together': {('school_class', 'date')},
+            },
+        ),
+        migrations.RunPython(populate_summaries, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,43 @@
+# Generated by Django 5.1.3 on 2026-10-18 17:25
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+def populate_bitmaps(apps, schema_editor):
+    """Backfill the attendance bitmaps from the existing attendance records."""
+    from core.attendance_bitmap import STATUS_CODES, academic_year_of, encode, year_start
+    AttendanceRecord = apps.get_model('core', 'AttendanceRecord')
+    StudentAttendanceYear = apps.get_model('core', 'StudentAttendanceYear')
+    codes = {}
+    for student_id, day, status in AttendanceRecord.objects.values_list('student', 'date', 'status').iterator():
+        year = academic_year_of(day)
+        codes.setdefault((student_id, year), {})[(day - year_start(year)).days] = STATUS_CODES[status]
+    StudentAttendanceYear.objects.bulk_create([
+        StudentAttendanceYear(student_id=student_id, academic_year=year, statuses=encode(day_codes))
+        for (student_id, year), day_codes in codes.items()
+    ], batch_size=1000)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0010_attendance_daily_summary'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='StudentAttendanceYear',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('academic_year', models.PositiveSmallIntegerField(help_text='Calendar year the academic year starts in')),
+                ('statuses', models.BinaryField(max_length=138)),
+                ('student', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='attendance_years', to='core.student')),
+            ],
+            options={
+                'indexes': [models.Index(fields=['academic_year'], name='attendance_year_idx')],
+                'unique_together': {('student', 'academic_year')},
+            },
+        ),
+        migrations.RunPython(populate_bitmaps, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,39 @@
+# Generated by Django 5.1.3 on 2026-10-18 17:37
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0012_attendance_timestamp_auto_now'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AlterModelOptions(
+            name='announcement',
+            options={'ordering': ['-timestamp', '-id']},
+        ),
+        migrations.AlterModelOptions(
+            name='newsarticle',
+            options={'ordering': ['-published_date', '-created_at', '-id']},
+        ),
+        migrations.RemoveIndex(
+            model_name='announcement',
+            name='announcement_timestamp_idx',
+        ),
+        migrations.RemoveIndex(
+            model_name='newsarticle',
+            name='news_published_idx',
+        ),
+        migrations.AddIndex(
+            model_name='announcement',
+            index=models.Index(fields=['-timestamp', '-id'], name='announcement_timestamp_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='newsarticle',
+            index=models.Index(fields=['-published_date', '-created_at', '-id'], name='news_published_idx'),
+        ),
+    ]
@@ -0,0 +1,44 @@
+# Generated by Django 5.1.3 on 2026-10-18 17:55
+
+import core.models
+import core.storage
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0015_jobs'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='carouselimage',
+            name='image',
+            field=models.ImageField(storage=core.storage.upload_storage, upload_to=core.models.carousel_image_path),
+        ),
+        migrations.AlterField(
+            model_name='newsimage',
+            name='image',
+            field=models.ImageField(storage=core.storage.upload_storage, upload_to=core.models.news_image_path),
+        ),
+        migrations.AlterField(
+            model_name='student',
+            name='profile_picture',
+            field=models.ImageField(blank=True, default=None, help_text="Optional: Student's profile picture.", null=True, storage=core.storage.upload_storage, upload_to=core.models.student_profile_picture_path),
+        ),
+        migrations.CreateModel(
+            name='StoredFile',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('name', models.CharField(help_text='Storage name of the file', max_length=255, unique=True)),
+                ('size', models.PositiveBigIntegerField(default=0)),
+                ('refcount', models.PositiveIntegerField(default=0)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('updated_at', models.DateTimeField(auto_now=True, help_text='Last reference change or re-upload')),
+            ],
+            options={
+                'indexes': [models.Index(fields=['refcount', 'updated_at'], name='storedfile_unreferenced_idx')],
+            },
+        ),
+    ]
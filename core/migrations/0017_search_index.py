@@ -0,0 +1,95 @@
+# Generated by Django 5.1.3 on 2026-10-18 17:58
+
+from django.db import migrations, models
+
+FTS_TABLE = 'core_searchdocument_fts'
+
+SQLITE_INDEX = [
+    f"""CREATE VIRTUAL TABLE {FTS_TABLE} USING fts5(
+        title, body, content='core_searchdocument', content_rowid='id',
+        tokenize='unicode61 remove_diacritics 2', prefix='2 3')""",
+    # External-content FTS5 tables are kept in step by triggers on the content table
+    f"""CREATE TRIGGER core_searchdocument_ai AFTER INSERT ON core_searchdocument BEGIN
+        INSERT INTO {FTS_TABLE}(rowid, title, body) VALUES (new.id, new.title, new.body);
+    END""",
+    f"""CREATE TRIGGER core_searchdocument_ad AFTER DELETE ON core_searchdocument BEGIN
+        INSERT INTO {FTS_TABLE}({FTS_TABLE}, rowid, title, body) VALUES ('delete', old.id, old.title, old.body);
+    END""",
+    f"""CREATE TRIGGER core_searchdocument_au AFTER UPDATE ON core_searchdocument BEGIN
+        INSERT INTO {FTS_TABLE}({FTS_TABLE}, rowid, title, body) VALUES ('delete', old.id, old.title, old.body);
+        INSERT INTO {FTS_TABLE}(rowid, title, body) VALUES (new.id, new.title, new.body);
+    END""",
+]
+SQLITE_DROP = [
+    'DROP TRIGGER IF EXISTS core_searchdocument_au',
+    'DROP TRIGGER IF EXISTS core_searchdocument_ad',
+    'DROP TRIGGER IF EXISTS core_searchdocument_ai',
+    f'DROP TABLE IF EXISTS {FTS_TABLE}',
+]
+POSTGRES_INDEX = [
+    "CREATE INDEX searchdocument_fts_idx ON core_searchdocument USING gin (to_tsvector('simple', title || ' ' || body))",
+]
+POSTGRES_DROP = ['DROP INDEX IF EXISTS searchdocument_fts_idx']
+
+
+def create_fulltext_index(apps, schema_editor):
+    """Backend-specific full-text index over the documents (other backends search with icontains)."""
+    statements = {'sqlite': SQLITE_INDEX, 'postgresql': POSTGRES_INDEX}.get(schema_editor.connection.vendor, [])
+    for statement in statements:
+        schema_editor.execute(statement)
+
+
+def drop_fulltext_index(apps, schema_editor):
+    statements = {'sqlite': SQLITE_DROP, 'postgresql': POSTGRES_DROP}.get(schema_editor.connection.vendor, [])
+    for statement in statements:
+        schema_editor.execute(statement)
+
+
+def populate_documents(apps, schema_editor):
+    """Index the existing students, news articles and announcements (same text as core.search builds)."""
+    SearchDocument = apps.get_model('core', 'SearchDocument')
+    Student = apps.get_model('core', 'Student')
+    NewsArticle = apps.get_model('core', 'NewsArticle')
+    Announcement = apps.get_model('core', 'Announcement')
+    documents = []
+    for student in Student.objects.select_related('current_class').prefetch_related('parents').iterator(chunk_size=1000):
+        words = [student.student_id]
+        if student.current_class:
+            words += [student.current_class.name, student.current_class.academic_year]
+        for parent in student.parents.all():
+            words += [parent.username, f"{parent.first_name} {parent.last_name}".strip()]
+        documents.append(SearchDocument(
+            kind='student', object_id=student.pk, title=f"{student.first_name} {student.last_name}"[:300],
+            body=' '.join(words),
+        ))
+    for pk, title, content in NewsArticle.objects.values_list('pk', 'title', 'content').iterator():
+        documents.append(SearchDocument(kind='news', object_id=pk, title=title[:300], body=content))
+    rows = Announcement.objects.values_list('pk', 'title', 'content', 'posted_by__username').iterator()
+    for pk, title, content, username in rows:
+        documents.append(SearchDocument(kind='announcement', object_id=pk, title=title[:300], body=f"{content} {username or ''}"))
+    SearchDocument.objects.bulk_create(documents, batch_size=1000)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0016_stored_files'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='SearchDocument',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('kind', models.CharField(choices=[('student', 'Student'), ('news', 'News article'), ('announcement', 'Announcement')], max_length=20)),
+                ('object_id', models.PositiveBigIntegerField()),
+                ('title', models.CharField(max_length=300)),
+                ('body', models.TextField(blank=True)),
+            ],
+            options={
+                'constraints': [models.UniqueConstraint(fields=('kind', 'object_id'), name='searchdocument_object_uniq')],
+            },
+        ),
+        migrations.RunPython(create_fulltext_index, drop_fulltext_index),
+        migrations.RunPython(populate_documents, migrations.RunPython.noop),
+    ]
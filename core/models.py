@@ -1,12 +1,13 @@
 # core/models.py
 
 from django.db import models
-from django.db.models import Avg, Count, OuterRef, Subquery # Add OuterRef, Subquery
+from django.db.models import OuterRef, Subquery # Add OuterRef, Subquery
 from django.conf import settings # To link to the User model correctly
 # from django.contrib.auth.models import User # Avoid importing User directly
 from django.utils import timezone # For timestamp
-from django.db.models import Avg, Count # Added Count # Import Avg for aggregatio
+from django.utils.functional import cached_property
 import os # Needed for path joining in helper
+from .storage import upload_storage # Content-addressed, deduplicating storage for uploads
 # Choices for Roles (if you want to add a role field to User later, or for logic)
 # class Role(models.TextChoices):
 #     ADMIN = 'ADMIN', 'Admin'
@@ -29,7 +30,7 @@ class SchoolClass(models.Model):
         help_text="Optional: Primary teacher for this class (must be a user marked as teacher)"
     )
 
-    # --- CLASS TERM/SUBJECT AVERAGE METHOD with DEBUGGING ---
+    # --- CLASS TERM/SUBJECT AVERAGE METHOD ---
     @property
     def term_subject_averages(self):
         """
@@ -38,60 +39,31 @@ class SchoolClass(models.Model):
         Returns a nested dictionary:
         { 'Term Name': {'Subject Name': average_score, ...}, ... }
         """
-        # --- Start Debug ---
-        #print(f"\nDEBUG: Calculating term_subject_averages for Class PK={self.pk} ({self})")
-        # --- End Debug ---
-
-        # Get results only for students currently in this specific class
-        # and only results that have a score.
-        class_results_qs = Result.objects.filter(
-            student__current_class=self, # Filter 1: Students must be in THIS class
-            score__isnull=False          # Filter 2: Results must have a numerical score
-        )
+        return SchoolClass.term_subject_averages_for([self.pk]).get(self.pk, {})
 
-        # --- Debug ---
-        #print(f"DEBUG:   Found {class_results_qs.count()} results with scores for students in this class.")
-        # Optional: Print individual results found (can be long if many results)
-        # for res in class_results_qs.select_related('student', 'subject'):
-        #    print(f"DEBUG:     - Result: {res.student.full_name}, {res.subject.name}, {res.term_exam_name}, Score={res.score}")
-        # --- End Debug ---
-
-        term_data = class_results_qs.values(
-            'term_exam_name', # Group by term
-            'subject__name'   # Group by subject name within term
-        ).annotate(
-            average=Avg('score') # Calculate average for each group
+    @classmethod
+    def term_subject_averages_for(cls, class_ids):
+        """
+        Batched version of `term_subject_averages` for several classes at once.
+        Runs a single query over the materialized aggregate rows, however many classes are passed.
+        Returns { class_id: { 'Term Name': {'Subject Name': average_score, ...}, ... }, ... }
+        """
+        # Read the pre-aggregated sum/count rows (maintained by core.aggregates)
+        term_data = ClassTermSubjectAggregate.objects.filter(
+            school_class__in=class_ids,
+            score_count__gt=0
+        ).values(
+            'school_class', 'term_exam_name', 'subject__name', 'score_sum', 'score_count'
         ).order_by(
-            'term_exam_name', 'subject__name' # Optional ordering
+            'school_class', 'term_exam_name', 'subject__name'
         )
 
-        # --- Debug ---
-        # Convert QuerySet to list to evaluate it for printing
-        term_data_list = list(term_data)
-        #print(f"DEBUG:   Aggregated term_data: {term_data_list}")
-        # --- End Debug ---
-
-        # Structure the data into a nested dictionary
+        # Structure the data into { class_id: { term: { subject: average } } }
         averages_data = {}
-        # Use term_data_list which is already evaluated
-        for item in term_data_list:
-            term = item['term_exam_name']
-            subject = item['subject__name']
-            # Check if 'average' key exists and is not None before rounding
-            if item.get('average') is not None:
-                 average = round(item['average'], 1)
-            else:
-                 average = None # Handle case where average might be None
-
-            if average is not None:
-                if term not in averages_data:
-                    averages_data[term] = {}
-                averages_data[term][subject] = average
-
-        # --- Debug ---
-        # print(f"DEBUG:   Final averages_data dictionary: {averages_data}")
-        # --- End Debug ---
-
+        for item in term_data:
+            class_terms = averages_data.setdefault(item['school_class'], {})
+            average = item['score_sum'] / item['score_count']
+            class_terms.setdefault(item['term_exam_name'], {})[item['subject__name']] = round(average, 1)
         return averages_data
     # --- END CLASS AVERAGE METHOD ---
 
@@ -146,10 +118,11 @@ def student_profile_picture_path(instance, filename):
     # file will be uploaded to MEDIA_ROOT/student_profiles/<student_id>/<filename>
     # This helps keep files organized and avoids name collisions.
     _, file_extension = os.path.splitext(filename) # Get file extension
-    # Use student ID for folder name. You could also use a UUID.
+    # Use the school student ID for the folder: instance.id is still None when a new student is saved.
+    # (The default upload storage names files by content hash anyway, see core/storage.py.)
     # Optionally, rename filename to something consistent like 'profile.ext'
     # filename = f'profile{file_extension}'
-    return f'student_profiles/{instance.id}/{filename}'
+    return f'student_profiles/{instance.student_id}/{filename}'
 # --- End Helper Function ---
 
 class Student(models.Model):
@@ -179,6 +152,7 @@ class Student(models.Model):
     # --- ADD PROFILE PICTURE FIELD ---
     profile_picture = models.ImageField(
         upload_to=student_profile_picture_path, # Use helper function for path
+        storage=upload_storage, # Stored once per distinct file (core/storage.py)
         null=True,  # Allow no picture
         blank=True, # Allow empty in forms/admin
         default=None, # Explicitly no default image in DB
@@ -190,22 +164,25 @@ class Student(models.Model):
     def full_name(self):
         return f"{self.first_name} {self.last_name}"
 
-    # --- ADD AVERAGE SCORE METHOD ---
+    # --- AVERAGE SCORE METHODS (read from StudentTermAggregate) ---
+    @cached_property
+    def _term_score_totals(self):
+        """
+        {term_exam_name: (score_sum, score_count)} from the materialized aggregates.
+        Cached per instance so average_score and term_averages share one small query.
+        """
+        rows = self.term_aggregates.filter(score_count__gt=0).order_by('term_exam_name')
+        return {row.term_exam_name: (row.score_sum, row.score_count) for row in rows}
+
     @property
     def average_score(self):
         """Calculates the average score across all recorded results with a numeric score."""
-        # Filter results that have a non-null score and belong to this student
-        results_with_scores = self.results.filter(score__isnull=False)
-        if results_with_scores.exists():
-            # Calculate the average using Django's aggregation
-            average_data = results_with_scores.aggregate(Avg('score'))
-            # 'average_data' will be a dictionary like {'score__avg': 85.5}
-            # Round the average to a reasonable number of decimal places
-            return round(average_data['score__avg'], 1) if average_data['score__avg'] is not None else None
-        return None # Return None if no results with scores exist
-    # --- END AVERAGE SCORE METHOD ---
-
-    # --- ADD TERM AVERAGE METHOD ---
+        totals = self._term_score_totals.values()
+        score_count = sum(count for _, count in totals)
+        if not score_count:
+            return None # Return None if no results with scores exist
+        return round(sum(total for total, _ in totals) / score_count, 1)
+
     @property
     def term_averages(self):
         """
@@ -213,24 +190,11 @@ class Student(models.Model):
         where at least one numeric score exists for that term.
         Returns a dictionary: {'Term Name': average_score, ...}
         """
-        term_data = self.results.filter(
-            score__isnull=False # Only consider results with scores
-        ).values(
-            'term_exam_name' # Group by term name
-        ).annotate(
-            average=Avg('score'), # Calculate average score for each group
-            score_count=Count('score') # Count how many scores contributed
-        ).order_by(
-            'term_exam_name' # Optional: order terms alphabetically
-        )
-
-        # Format the result into a dictionary {term_name: rounded_average}
-        averages_dict = {
-            term['term_exam_name']: round(term['average'], 1)
-            for term in term_data if term['average'] is not None
+        return {
+            term: round(score_sum / score_count, 1)
+            for term, (score_sum, score_count) in self._term_score_totals.items()
         }
-        return averages_dict
-    # --- END TERM AVERAGE METHOD ---
+    # --- END AVERAGE SCORE METHODS ---
 
     def __str__(self):
         return f"{self.full_name} ({self.student_id})"
@@ -264,11 +228,61 @@ class Result(models.Model):
         # Prevent duplicate results for the same student, subject, and term/exam
         unique_together = ('student', 'subject', 'term_exam_name')
         ordering = ['-date_recorded'] # Show newest results first by default
+        indexes = [
+            # Per-student aggregates over results that have a score
+            models.Index(fields=['student', 'score'], name='result_student_score_idx'),
+            # Class gradebook lookups by term and subject
+            models.Index(fields=['school_class', 'term_exam_name', 'subject'], name='result_class_term_subj_idx'),
+            # Admin changelist pages (ResultAdmin.keyset_ordering)
+            models.Index(fields=['-date_recorded', '-id'], name='result_recorded_idx'),
+            # Distinct terms for the admin term filter, one index seek per term (TermFilter)
+            models.Index(fields=['term_exam_name'], name='result_term_idx'),
+        ]
 
     def __str__(self):
         display_mark = self.grade if self.grade else str(self.score)
         return f"{self.student} - {self.subject} ({self.term_exam_name}): {display_mark}"
 
+# --- Materialized Gradebook Aggregates ---
+# Running sum/count of scored results, kept up to date by core.aggregates whenever
+# a Result is saved, deleted or bulk-imported. Averages are read from these few rows
+# instead of aggregating over the Result table on every page view.
+class StudentTermAggregate(models.Model):
+    """Sum and count of a student's numeric scores for one term/exam name."""
+    student = models.ForeignKey(Student, on_delete=models.CASCADE, related_name='term_aggregates')
+    term_exam_name = models.CharField(max_length=100)
+    score_sum = models.FloatField(default=0)
+    score_count = models.PositiveIntegerField(default=0)
+
+    class Meta:
+        unique_together = ('student', 'term_exam_name')
+
+    @property
+    def average(self):
+        return self.score_sum / self.score_count if self.score_count else None
+
+    def __str__(self):
+        return f"{self.student} - {self.term_exam_name}: {self.score_count} scores"
+
+class ClassTermSubjectAggregate(models.Model):
+    """Sum and count of numeric scores for students currently in a class, per term and subject."""
+    school_class = models.ForeignKey(SchoolClass, on_delete=models.CASCADE, related_name='term_subject_aggregates')
+    term_exam_name = models.CharField(max_length=100)
+    subject = models.ForeignKey(Subject, on_delete=models.CASCADE, related_name='class_term_aggregates')
+    score_sum = models.FloatField(default=0)
+    score_count = models.PositiveIntegerField(default=0)
+
+    class Meta:
+        unique_together = ('school_class', 'term_exam_name', 'subject')
+
+    @property
+    def average(self):
+        return self.score_sum / self.score_count if self.score_count else None
+
+    def __str__(self):
+        return f"{self.school_class} - {self.term_exam_name} - {self.subject}: {self.score_count} scores"
+# --- End Materialized Gradebook Aggregates ---
+
 class Announcement(models.Model):
     """Represents a site-wide or role-specific announcement."""
     title = models.CharField(max_length=200)
@@ -290,7 +304,8 @@ class Announcement(models.Model):
     # visible_to = models.CharField(max_length=10, choices=VISIBILITY_CHOICES, default='ALL')
 
     class Meta:
-        ordering = ['-timestamp'] # Show newest first
+        ordering = ['-timestamp', '-id'] # Show newest first; id makes the order total for keyset pagination
+        indexes = [models.Index(fields=['-timestamp', '-id'], name='announcement_timestamp_idx')] # Serves the default ordering and its cursors
 
     def __str__(self):
         return self.title
@@ -322,16 +337,178 @@ class AttendanceRecord(models.Model):
         blank=True
     )
     notes = models.TextField(blank=True, help_text="Optional notes (e.g., reason for absence/lateness)")
-    timestamp = models.DateTimeField(auto_now_add=True) # When the record was created/updated
+    timestamp = models.DateTimeField(auto_now=True) # When the record was created/updated
 
     class Meta:
         # Prevent multiple attendance records for the same student on the same date
         unique_together = ('student', 'date')
         ordering = ['-date', 'student__last_name'] # Order by date then student name
+        indexes = [
+            # Class registers and summaries: filter by class and date, count by status
+            models.Index(fields=['school_class', 'date', 'status'], name='attendance_class_date_idx'),
+            # Admin changelist pages (AttendanceAdmin.keyset_ordering)
+            models.Index(fields=['-date', '-id'], name='attendance_date_idx'),
+        ]
 
     def __str__(self):
         return f"{self.student.full_name} - {self.date}: {self.get_status_display()}"
 
+# --- Daily Attendance Rollup ---
+# Status counts per class and day, kept up to date by core.attendance whenever
+# attendance is saved (registers, admin edits, deletes). Range summaries read one
+# row per school day instead of counting every AttendanceRecord.
+class AttendanceDailySummary(models.Model):
+    """Present/absent/late/excused counts for one class on one date."""
+    school_class = models.ForeignKey(SchoolClass, on_delete=models.CASCADE, related_name='attendance_days')
+    date = models.DateField()
+    present_count = models.PositiveIntegerField(default=0)
+    absent_count = models.PositiveIntegerField(default=0)
+    late_count = models.PositiveIntegerField(default=0)
+    excused_count = models.PositiveIntegerField(default=0)
+
+    class Meta:
+        unique_together = ('school_class', 'date')
+        verbose_name_plural = 'attendance daily summaries'
+
+    @property
+    def total(self):
+        return self.present_count + self.absent_count + self.late_count + self.excused_count
+
+    def __str__(self):
+        return f"{self.school_class} - {self.date}: {self.total} recorded"
+# --- End Daily Attendance Rollup ---
+
+# --- Compact Attendance History ---
+# One academic year of a student's attendance packed into a small bitmap
+# (3 bits per calendar day, see core/attendance_bitmap.py), rebuilt whenever
+# the student's attendance for that year is saved.
+class StudentAttendanceYear(models.Model):
+    """Packed daily attendance statuses for one student and academic year."""
+    student = models.ForeignKey(Student, on_delete=models.CASCADE, related_name='attendance_years')
+    academic_year = models.PositiveSmallIntegerField(help_text="Calendar year the academic year starts in")
+    statuses = models.BinaryField(max_length=138) # 366 days x 3 bits
+
+    class Meta:
+        unique_together = ('student', 'academic_year')
+        indexes = [
+            # Whole-school reports read every bitmap of one year
+            models.Index(fields=['academic_year'], name='attendance_year_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.student} - {self.academic_year}"
+# --- End Compact Attendance History ---
+
+# --- Responsive Image Variants ---
+# Resized, EXIF-free JPEG/PNG and WebP copies of an uploaded image (see core/images.py),
+# keyed by the storage name of the original so any ImageField can use them.
+class ImageVariants(models.Model):
+    """The generated variants of one original image file."""
+    source = models.CharField(max_length=255, unique=True, help_text="Storage name of the original file")
+    width = models.PositiveIntegerField()
+    height = models.PositiveIntegerField()
+    variants = models.JSONField(default=list) # [{'width', 'format', 'name'}, ...], smallest first
+    processed_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        verbose_name_plural = 'image variants'
+
+    def __str__(self):
+        return f"{self.source} ({len(self.variants)} variants)"
+# --- End Responsive Image Variants ---
+
+# --- Stored Upload Files ---
+# Reference counts of uploaded files. The upload storage keeps one file per
+# distinct content (core/storage.py), shared by every row that uploaded it, so a
+# file may only be deleted once nothing references it (manage.py media_gc).
+class StoredFile(models.Model):
+    """One stored upload and how many rows reference it."""
+    name = models.CharField(max_length=255, unique=True, help_text="Storage name of the file")
+    size = models.PositiveBigIntegerField(default=0)
+    refcount = models.PositiveIntegerField(default=0)
+    created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True, help_text="Last reference change or re-upload")
+
+    class Meta:
+        indexes = [
+            # Garbage collection looks for unreferenced files not touched for a while
+            models.Index(fields=['refcount', 'updated_at'], name='storedfile_unreferenced_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.name} ({self.refcount} references)"
+# --- End Stored Upload Files ---
+
+# --- Search Index ---
+# One searchable text per student, news article and announcement (see core/search.py).
+# The full-text index over title and body is backend-specific and created by migration
+# 0017: an FTS5 table kept in step by triggers on SQLite, a GIN tsvector index on PostgreSQL.
+class SearchDocument(models.Model):
+    """The indexed text of one searchable object."""
+    KIND_CHOICES = [
+        ('student', 'Student'),
+        ('news', 'News article'),
+        ('announcement', 'Announcement'),
+    ]
+    kind = models.CharField(max_length=20, choices=KIND_CHOICES)
+    object_id = models.PositiveBigIntegerField()
+    title = models.CharField(max_length=300)
+    body = models.TextField(blank=True)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['kind', 'object_id'], name='searchdocument_object_uniq'),
+        ]
+
+    def __str__(self):
+        return f"{self.kind} {self.object_id}: {self.title}"
+# --- End Search Index ---
+
+# --- Background Jobs ---
+# Work queued by requests (exports, imports, image processing) and run by
+# `manage.py run_jobs` outside the web workers (see core/jobs.py).
+class Job(models.Model):
+    """One queued unit of background work and its outcome."""
+    STATUS_CHOICES = [
+        ('queued', 'Queued'),
+        ('running', 'Running'),
+        ('done', 'Done'),
+        ('failed', 'Failed'),
+    ]
+    kind = models.CharField(max_length=50, help_text="Name of the registered task that runs this job")
+    params = models.JSONField(default=dict, blank=True)
+    status = models.CharField(max_length=10, choices=STATUS_CHOICES, default='queued')
+    created_by = models.ForeignKey(
+        settings.AUTH_USER_MODEL,
+        on_delete=models.SET_NULL,
+        null=True, blank=True,
+        related_name='jobs'
+    )
+    attempts = models.PositiveSmallIntegerField(default=0)
+    max_attempts = models.PositiveSmallIntegerField(default=3)
+    run_after = models.DateTimeField(default=timezone.now, help_text="Not started before this time (retry back-off)")
+    created_at = models.DateTimeField(auto_now_add=True)
+    started_at = models.DateTimeField(null=True, blank=True)
+    finished_at = models.DateTimeField(null=True, blank=True)
+    message = models.TextField(blank=True, help_text="Outcome shown on the job page")
+    error = models.TextField(blank=True, help_text="Traceback of the last failed attempt")
+    result_name = models.CharField(max_length=255, blank=True, help_text="Downloadable output, in the job results storage")
+
+    class Meta:
+        ordering = ['-created_at', '-id']
+        indexes = [
+            # The worker polls for due jobs in run_after order
+            models.Index(fields=['status', 'run_after'], name='job_due_idx'),
+        ]
+
+    @property
+    def is_finished(self):
+        return self.status in ('done', 'failed')
+
+    def __str__(self):
+        return f"{self.kind} #{self.pk} ({self.get_status_display()})"
+# --- End Background Jobs ---
+
 
 
 def carousel_image_path(instance, filename):
@@ -342,7 +519,7 @@ def carousel_image_path(instance, filename):
 
 class CarouselImage(models.Model):
     title = models.CharField(max_length=100, help_text="Optional title/description for the image (e.g., 'Sports Day')")
-    image = models.ImageField(upload_to=carousel_image_path) # Use ImageField
+    image = models.ImageField(upload_to=carousel_image_path, storage=upload_storage) # Use ImageField; deduplicated storage
     caption = models.CharField(max_length=200, blank=True, help_text="Optional caption overlay")
     order = models.PositiveIntegerField(default=0, help_text="Display order (lower numbers appear first)")
     is_active = models.BooleanField(default=True, help_text="Uncheck to hide this image from the carousel")
@@ -375,7 +552,8 @@ class NewsArticle(models.Model):
     updated_at = models.DateTimeField(auto_now=True)
 
     class Meta:
-        ordering = ['-published_date', '-created_at'] # Show newest first
+        ordering = ['-published_date', '-created_at', '-id'] # Show newest first; id makes the order total for keyset pagination
+        indexes = [models.Index(fields=['-published_date', '-created_at', '-id'], name='news_published_idx')] # Serves the default ordering and its cursors
 
     def __str__(self):
         return self.title
@@ -387,7 +565,7 @@ class NewsImage(models.Model):
         on_delete=models.CASCADE, # Delete images if article is deleted
         related_name='images' # Allows article.images.all() access
     )
-    image = models.ImageField(upload_to=news_image_path)
+    image = models.ImageField(upload_to=news_image_path, storage=upload_storage) # Deduplicated storage (core/storage.py)
     caption = models.CharField(max_length=255, blank=True, help_text="Optional caption for this image")
     order = models.PositiveIntegerField(default=0, help_text="Display order within the article")
 
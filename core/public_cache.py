@@ -0,0 +1,104 @@
+# core/public_cache.py
+"""
+Caching for the public pages (homepage, news list, news detail).
+
+Cached data and rendered fragments are keyed by a version number per content
+group. Saving or deleting an Announcement, CarouselImage, NewsArticle or
+NewsImage bumps the version of its group (see core.signals), as does renaming
+or deleting a user, whose name the announcements and news show. Every entry
+built from the old content is simply never read again and expires on its own;
+nothing has to find and delete individual keys. Versions are millisecond
+timestamps of the last change, so they also serve as Last-Modified dates
+(see core/conditional.py).
+
+Querysets are cached as plain lists of model instances. Paginated lists cache
+their row count and each keyset page separately, so a page is served by the
+cache without a COUNT or a SELECT. Values are wrapped in SimpleLazyObject: when the
+template fragment around them is already cached, they are never loaded at all.
+"""
+import hashlib
+import time
+from datetime import datetime, timezone
+
+from django.conf import settings
+from django.core.cache import cache
+from django.utils.functional import SimpleLazyObject
+
+from . import db_routers, keyset
+
+ANNOUNCEMENTS = 'announcements'
+CAROUSEL = 'carousel'
+NEWS = 'news'
+GROUPS = (ANNOUNCEMENTS, CAROUSEL, NEWS)
+# Students, classes and subjects: not on the public pages, versioned the same way for
+# the parent dashboard validator (core/conditional.py)
+SCHOOL = 'school'
+
+
+def timeout():
+    return getattr(settings, 'PUBLIC_CACHE_TIMEOUT', 300)
+
+
+def _version_key(group):
+    return f'core:public:version:{group}'
+
+
+def versions(*groups):
+    """[version of each group], starting any missing version at the current time."""
+    keys = [_version_key(group) for group in groups]
+    current = cache.get_many(keys)
+    for key in keys:
+        if key not in current:
+            # Start from the clock, not 1: an evicted version must not reuse old numbers
+            cache.add(key, _now_ms(), timeout=None)
+            current[key] = cache.get(key)
+    return [current[key] for key in keys]
+
+
+def version(*groups):
+    """A token combining the current versions of `groups`, for use in cache keys."""
+    return '-'.join(str(value) for value in versions(*groups))
+
+
+def modified(*groups):
+    """When any of `groups` last changed (or was first seen by the cache), as an aware datetime."""
+    return datetime.fromtimestamp(max(versions(*groups)) / 1000, tz=timezone.utc)
+
+
+def bump(group):
+    """Invalidate everything cached for `group`; the new version is the time of the change."""
+    key = _version_key(group)
+    current = cache.get(key)
+    # Always move forward, even if two changes land in the same millisecond
+    cache.set(key, max(_now_ms(), current + 1) if current else _now_ms(), timeout=None)
+
+
+def _now_ms():
+    return int(time.time() * 1000)
+
+
+def get_or_build(token, name, builder):
+    """The value cached under `name` for this version token, built and stored on a miss."""
+    def build():
+        with db_routers.primary(): # A lagging replica must not be cached as the new version
+            return builder()
+    return cache.get_or_set(f'core:public:{name}:{token}', build, timeout())
+
+
+def lazy(token, name, builder):
+    """get_or_build() deferred until the value is first used."""
+    return SimpleLazyObject(lambda: get_or_build(token, name, builder))
+
+
+def page(token, name, paginator, params):
+    """
+    Keyset page (core/keyset.py) for the request parameters `params`, served from the
+    cache. The total row count is cached once per version; the page itself is loaded
+    lazily, under a key naming its cursor.
+    """
+    position = paginator.position(params)
+    cursor = hashlib.md5(keyset.page_key(params).encode(), usedforsecurity=False).hexdigest() # Safe in any cache key
+
+    def build():
+        return paginator.page(position, get_or_build(token, f'{name}:count', paginator.queryset.count))
+    return lazy(token, f'{name}:{cursor}', build)
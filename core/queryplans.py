@@ -0,0 +1,91 @@
+# core/queryplans.py
+"""
+Query-plan inspection for the views' SQL, on SQLite and PostgreSQL.
+
+capture_queries() records the exact (sql, params) of every statement a block
+of code runs; explain() asks the database for the plan of one SELECT and
+full_scans() reports which hot tables that plan reads without an index.
+"""
+import json
+from contextlib import contextmanager
+
+from django.db import connection, transaction
+
+# Tables that grow with the school. A sequential scan over any of these is a regression;
+# small lookup tables (subjects, classes, carousel, auth) are allowed to be scanned.
+HOT_TABLES = {
+    'core_result', 'core_attendancerecord', 'core_student', 'core_student_parents',
+    'core_announcement', 'core_newsarticle', 'core_newsimage',
+    'core_studenttermaggregate', 'core_classtermsubjectaggregate', 'core_attendancedailysummary',
+    'core_studentattendanceyear', 'core_searchdocument',
+}
+
+
+@contextmanager
+def capture_queries(using=connection):
+    """Collect (sql, params) for every statement executed inside the block."""
+    captured = []
+
+    def wrapper(execute, sql, params, many, context):
+        captured.append((sql, params))
+        return execute(sql, params, many, context)
+
+    with using.execute_wrapper(wrapper):
+        yield captured
+
+
+def explain(sql, params, using=connection):
+    """
+    Return the plan of one SELECT as (text, full_scans).
+    On PostgreSQL sequential scans are disabled for the EXPLAIN so that a
+    "Seq Scan" in the plan means no usable index exists, not just that the
+    planner preferred it on a tiny table.
+    """
+    vendor = using.vendor
+    with transaction.atomic(using=using.alias), using.cursor() as cursor:
+        if vendor == 'sqlite':
+            cursor.execute(f'EXPLAIN QUERY PLAN {sql}', params)
+            details = [row[3] for row in cursor.fetchall()]
+            return '\n'.join(details), _sqlite_full_scans(details)
+        if vendor == 'postgresql':
+            cursor.execute('SET LOCAL enable_seqscan = off')
+            cursor.execute(f'EXPLAIN (FORMAT JSON) {sql}', params)
+            plan = cursor.fetchone()[0]
+            plan = json.loads(plan) if isinstance(plan, str) else plan
+            return json.dumps(plan, indent=2), _postgres_full_scans(plan[0]['Plan'])
+    raise NotImplementedError(f"Query plans are not supported on {vendor}.")
+
+
+def full_scans(captured, using=connection):
+    """
+    Explain every captured SELECT and return a list of
+    {'sql', 'plan', 'full_scans'} dicts, one per statement.
+    """
+    plans = []
+    for sql, params in captured:
+        if not sql.lstrip().upper().startswith('SELECT'):
+            continue # Writes, savepoints and session bookkeeping
+        plan, scans = explain(sql, params, using=using)
+        plans.append({'sql': sql, 'plan': plan, 'full_scans': sorted(scans)})
+    return plans
+
+
+def _sqlite_full_scans(details):
+    # "SCAN core_result" is a table scan; "SCAN core_result USING INDEX ..." walks an index
+    scans = set()
+    for detail in details:
+        words = detail.split()
+        if len(words) >= 2 and words[0] == 'SCAN' and 'INDEX' not in words:
+            table = words[1]
+            if table in HOT_TABLES:
+                scans.add(table)
+    return scans
+
+
+def _postgres_full_scans(node):
+    scans = set()
+    if node.get('Node Type') == 'Seq Scan' and node.get('Relation Name') in HOT_TABLES:
+        scans.add(node['Relation Name'])
+    for child in node.get('Plans', []):
+        scans |= _postgres_full_scans(child)
+    return scans
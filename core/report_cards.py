@@ -0,0 +1,194 @@
+# core/report_cards.py
+"""
+Printable report cards: one HTML document per student for one term/exam name.
+
+Each card shows the term's results with the class average per subject, the
+student's average for every term so far and an attendance summary for the
+academic year. Data for any number of classes is read in a fixed number of
+grouped queries (students, the term's results, the student term aggregates,
+the class subject aggregates and the attendance bitmaps) and turned into plain
+dicts, so cards can be rendered in worker processes without touching the
+database.
+
+A batch is written as a zip with one folder per class, holding every
+student's card plus `_all.html`, the whole class in one file that prints one
+card per page.
+"""
+import os
+import re
+import zipfile
+from concurrent.futures import ProcessPoolExecutor
+
+import django
+from django.db import connections
+from django.template.loader import render_to_string
+from django.utils import timezone
+from django.utils.safestring import mark_safe
+from django.utils.text import slugify
+
+from . import attendance_bitmap
+from .models import ClassTermSubjectAggregate, Result, SchoolClass, StudentTermAggregate
+
+RENDER_CHUNK_SIZE = 25 # Cards sent to a worker process at a time
+INLINE_RENDER_MAX = 60 # Smaller batches are rendered in-process (pool start-up costs more)
+LOOKUP_CHUNK_SIZE = 500
+
+
+def terms_for(class_ids):
+    """Term/exam names with scored results in these classes, from the small class aggregate table."""
+    return list(
+        ClassTermSubjectAggregate.objects.filter(school_class__in=class_ids, score_count__gt=0)
+        .values_list('term_exam_name', flat=True).distinct().order_by('term_exam_name')
+    )
+
+
+def collect(students, term):
+    """
+    The card data of every student in `students` (a Student queryset) for `term`,
+    as a list of dicts in class, surname, first name order.
+    """
+    rows = list(students.order_by(
+        'current_class__academic_year', 'current_class__name', 'last_name', 'first_name', 'pk'
+    ).values(
+        'pk', 'student_id', 'first_name', 'last_name', 'date_of_birth',
+        'current_class', 'current_class__name', 'current_class__academic_year',
+    ))
+    student_ids = [row['pk'] for row in rows]
+    class_ids = {row['current_class'] for row in rows if row['current_class']}
+
+    results = {student_id: [] for student_id in student_ids}
+    term_averages = {student_id: [] for student_id in student_ids}
+    for chunk in _chunks(student_ids):
+        for student_id, subject, score, grade, comments in Result.objects.filter(
+            student__in=chunk, term_exam_name=term
+        ).order_by('subject__name').values_list('student', 'subject__name', 'score', 'grade', 'comments'):
+            results[student_id].append({'subject': subject, 'score': score, 'grade': grade, 'comments': comments})
+        for student_id, term_name, score_sum, score_count in StudentTermAggregate.objects.filter(
+            student__in=chunk, score_count__gt=0
+        ).order_by('term_exam_name').values_list('student', 'term_exam_name', 'score_sum', 'score_count'):
+            term_averages[student_id].append((term_name, round(score_sum / score_count, 1)))
+
+    class_averages = {
+        class_id: terms.get(term, {}) for class_id, terms in SchoolClass.term_subject_averages_for(class_ids).items()
+    }
+    teachers = _teacher_names(class_ids)
+
+    # Attendance: the academic year of each class, up to today
+    today = timezone.now().date()
+    years = {row['current_class']: _academic_year(row['current_class__academic_year'], today) for row in rows}
+    histories = attendance_bitmap.load_years(student_ids, set(years.values()))
+
+    cards = []
+    for row in rows:
+        student_id = row['pk']
+        year = years[row['current_class']]
+        history = histories.get((student_id, year))
+        counts = history.counts(end_date=today) if history else attendance_bitmap.empty_counts()
+        subject_averages = class_averages.get(row['current_class'], {})
+        card_results = [dict(result, class_average=subject_averages.get(result['subject'])) for result in results[student_id]]
+        scores = [result['score'] for result in card_results if result['score'] is not None]
+        cards.append({
+            'student_id': row['student_id'],
+            'full_name': f"{row['first_name']} {row['last_name']}",
+            'first_name': row['first_name'],
+            'last_name': row['last_name'],
+            'date_of_birth': row['date_of_birth'],
+            'class_id': row['current_class'],
+            'class_name': (f"{row['current_class__name']} ({row['current_class__academic_year']})"
+                           if row['current_class'] else 'Not Assigned'),
+            'class_teacher': teachers.get(row['current_class'], ''),
+            'term': term,
+            'results': card_results,
+            'term_average': round(sum(scores) / len(scores), 1) if scores else None,
+            'term_averages': term_averages[student_id],
+            'attendance': counts,
+            'attendance_rate': attendance_bitmap.attendance_rate(counts),
+            'attendance_year': f"{year}-{year + 1}",
+            'generated': today,
+        })
+    return cards
+
+
+def render_card(card):
+    """The card's HTML fragment (no <html> wrapper)."""
+    return render_to_string('core/report_card.html', {'card': card})
+
+
+def render_document(title, bodies):
+    """A standalone printable HTML document of one or more card fragments."""
+    return render_to_string('core/report_card_document.html', {
+        'title': title, 'bodies': [mark_safe(body) for body in bodies],
+    })
+
+
+def render_cards(cards, workers=None):
+    """
+    (fragment, standalone document) for every card, in the order of `cards`.
+    Large batches are fanned out over a process pool.
+    """
+    workers = workers or os.cpu_count() or 1
+    if workers == 1 or len(cards) <= INLINE_RENDER_MAX:
+        return _render_chunk(cards)
+    connections.close_all() # Never share an open connection with forked workers
+    chunks = [cards[start:start + RENDER_CHUNK_SIZE] for start in range(0, len(cards), RENDER_CHUNK_SIZE)]
+    with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker) as pool:
+        return [rendered for chunk in pool.map(_render_chunk, chunks) for rendered in chunk]
+
+
+def write_zip(cards, fileobj, workers=None):
+    """Write the cards to `fileobj` as a zip; one folder per class. Returns the number of cards."""
+    by_class = {}
+    with zipfile.ZipFile(fileobj, 'w', zipfile.ZIP_DEFLATED) as archive:
+        for card, (body, document) in zip(cards, render_cards(cards, workers)):
+            folder = _folder(card)
+            by_class.setdefault(folder, (card['class_name'], card['term'], []))[2].append(body)
+            name = slugify(f"{card['student_id']} {card['last_name']} {card['first_name']}") or 'student'
+            archive.writestr(f"{folder}/{name}.html", document)
+        for folder, (class_name, term, class_bodies) in by_class.items():
+            archive.writestr(f"{folder}/_all.html",
+                             render_document(f"Report cards: {class_name} - {term}", class_bodies))
+    return len(cards)
+
+
+def zip_filename(term, class_names):
+    label = class_names[0] if len(class_names) == 1 else f"{len(class_names)}_classes"
+    return f"report_cards_{slugify(label)}_{slugify(term)}.zip"
+
+
+# --- Helpers ---
+
+def _init_worker():
+    # Under the 'spawn' start method workers begin with an unconfigured Django
+    django.setup()
+
+
+def _render_chunk(cards):
+    rendered = []
+    for card in cards:
+        body = render_card(card)
+        rendered.append((body, render_document(f"Report card: {card['full_name']} - {card['term']}", [body])))
+    return rendered
+
+
+def _folder(card):
+    return slugify(card['class_name']) or 'not-assigned'
+
+
+def _academic_year(label, today):
+    """'2024-2025' -> 2024; anything else means the current academic year."""
+    match = re.match(r'\s*(\d{4})', label or '')
+    return int(match.group(1)) if match else attendance_bitmap.academic_year_of(today)
+
+
+def _teacher_names(class_ids):
+    return {
+        pk: f"{first_name} {last_name}".strip() or username
+        for pk, username, first_name, last_name in SchoolClass.objects.filter(
+            pk__in=class_ids, class_teacher__isnull=False
+        ).values_list('pk', 'class_teacher__username', 'class_teacher__first_name', 'class_teacher__last_name')
+    }
+
+
+def _chunks(ids):
+    for start in range(0, len(ids), LOOKUP_CHUNK_SIZE):
+        yield ids[start:start + LOOKUP_CHUNK_SIZE]
@@ -0,0 +1,242 @@
+# core/result_import.py
+"""
+Bulk import of Result rows from CSV or XLSX files.
+
+The whole file is handled in one pass with no per-row queries:
+1. student codes and subject names are resolved to primary keys through
+   in-memory maps (one query per 500 distinct students, one for subjects);
+2. every row is validated and the existing (student, subject, term) keys are
+   looked up in bulk, so the preview knows which rows are new or updates;
+3. rows are written with bulk_create(update_conflicts=True) on the Result
+   unique key, in batches, and the gradebook aggregates are refreshed once.
+
+The validated plan is saved to a temporary file, so confirming a dry-run
+preview writes it directly instead of parsing and resolving the file again.
+Imports confirmed into a background job carry their rows in the job's params,
+so the worker never needs the web server's temporary files.
+"""
+import csv
+import io
+import json
+import math
+import os
+import tempfile
+import uuid
+
+from django.conf import settings
+from django.db import transaction
+
+from . import aggregates
+from .models import Result, Student, Subject
+
+UPSERT_BATCH_SIZE = 1000
+LOOKUP_CHUNK_SIZE = 500
+PREVIEW_ROWS = 20
+
+# Accepted header spellings -> field. Includes the headers of the class results CSV export.
+COLUMN_ALIASES = {
+    'student_id': 'student_id', 'student id': 'student_id', 'student': 'student_id',
+    'subject': 'subject', 'subject_name': 'subject',
+    'term_exam_name': 'term_exam_name', 'term/exam': 'term_exam_name', 'term': 'term_exam_name',
+    'term / exam name': 'term_exam_name', 'exam': 'term_exam_name',
+    'score': 'score', 'grade': 'grade', 'comments': 'comments',
+}
+REQUIRED_COLUMNS = ('student_id', 'subject', 'term_exam_name')
+
+
+class ResultImportError(Exception):
+    """The file cannot be imported at all (unreadable, unsupported type, missing columns)."""
+
+
+class ImportPlan:
+    """Outcome of validating an import file: the resolved rows plus what would happen."""
+    def __init__(self):
+        self.rows = []          # (student_pk, subject_pk, class_pk, term, score, grade, comments)
+        self.errors = []        # (row_number, message)
+        self.preview = []       # First PREVIEW_ROWS rows for display
+        self.new_count = 0
+        self.update_count = 0
+        self.token = None       # Set by save_plan()
+
+    @property
+    def is_valid(self):
+        return not self.errors
+
+
+def read_table(uploaded_file):
+    """Yield the rows of a CSV or XLSX upload as lists of cell values, header first."""
+    name = uploaded_file.name.lower()
+    if name.endswith('.csv'):
+        text = io.TextIOWrapper(uploaded_file, encoding='utf-8-sig', newline='')
+        yield from csv.reader(text)
+    elif name.endswith('.xlsx'):
+        from openpyxl import load_workbook
+        workbook = load_workbook(uploaded_file, read_only=True, data_only=True)
+        try:
+            for row in workbook.active.iter_rows(values_only=True):
+                yield ['' if value is None else value for value in row]
+        finally:
+            workbook.close()
+    else:
+        raise ResultImportError("Unsupported file type; upload a .csv or .xlsx file.")
+
+
+def plan_import(uploaded_file):
+    """Parse, resolve and validate an upload in one pass. Returns an ImportPlan."""
+    table = read_table(uploaded_file)
+    header = next(table, None)
+    if not header:
+        raise ResultImportError("The file is empty.")
+    positions = {}
+    for index, title in enumerate(header):
+        field = COLUMN_ALIASES.get(str(title).strip().lower())
+        if field and field not in positions:
+            positions[field] = index
+    missing = [column for column in REQUIRED_COLUMNS if column not in positions]
+    if missing:
+        raise ResultImportError(f"Missing required column(s): {', '.join(missing)}.")
+
+    def cell(row, field):
+        index = positions.get(field)
+        value = row[index] if index is not None and index < len(row) else ''
+        return str(value).strip() if value is not None else ''
+
+    # Read the raw columns once; resolution below works on whole columns at a time
+    raw_rows = [
+        (number, cell(row, 'student_id'), cell(row, 'subject'), cell(row, 'term_exam_name'),
+         cell(row, 'score'), cell(row, 'grade'), cell(row, 'comments'))
+        for number, row in enumerate(table, start=2)
+        if any(str(value).strip() for value in row) # Skip blank lines
+    ]
+
+    students = _student_map({row[1] for row in raw_rows if row[1]})
+    subjects = {name.casefold(): pk for pk, name in Subject.objects.values_list('pk', 'name')}
+
+    plan = ImportPlan()
+    seen = {}
+    for number, code, subject_name, term, score_text, grade, comments in raw_rows:
+        problems = []
+        student = students.get(code)
+        if student is None:
+            problems.append(f"unknown student ID '{code}'" if code else "student ID is required")
+        subject_pk = subjects.get(subject_name.casefold())
+        if subject_pk is None:
+            problems.append(f"unknown subject '{subject_name}'" if subject_name else "subject is required")
+        if not term:
+            problems.append("term/exam name is required")
+        elif len(term) > Result._meta.get_field('term_exam_name').max_length:
+            problems.append("term/exam name is too long")
+        score = None
+        if score_text:
+            try:
+                score = float(score_text)
+            except ValueError:
+                problems.append(f"score '{score_text}' is not a number")
+            else:
+                # Same rule as ResultForm.clean_score; float() also accepts 'nan' and 'inf'
+                if not math.isfinite(score) or score < 0 or score > 100:
+                    problems.append("score must be a number between 0 and 100")
+        if len(grade) > Result._meta.get_field('grade').max_length:
+            problems.append("grade is too long")
+        if student and subject_pk and term:
+            key = (student[0], subject_pk, term)
+            if key in seen:
+                problems.append(f"duplicate of row {seen[key]}")
+            seen.setdefault(key, number)
+
+        if problems:
+            plan.errors.append((number, '; '.join(problems)))
+            continue
+        plan.rows.append((student[0], subject_pk, student[1], term, score, grade, comments))
+        if len(plan.preview) < PREVIEW_ROWS:
+            plan.preview.append((number, code, subject_name, term, score, grade, comments))
+
+    existing = _existing_keys(plan.rows)
+    plan.update_count = sum(1 for row in plan.rows if row[:2] + (row[3],) in existing)
+    plan.new_count = len(plan.rows) - plan.update_count
+    return plan
+
+
+def apply_rows(rows, recorded_by=None):
+    """Upsert resolved rows on (student, subject, term_exam_name); returns the number written."""
+    results = [
+        Result(student_id=student_pk, subject_id=subject_pk, school_class_id=class_pk, term_exam_name=term,
+               score=score, grade=grade, comments=comments, recorded_by=recorded_by)
+        for student_pk, subject_pk, class_pk, term, score, grade, comments in rows
+    ]
+    with transaction.atomic():
+        for start in range(0, len(results), UPSERT_BATCH_SIZE):
+            Result.objects.bulk_create(
+                results[start:start + UPSERT_BATCH_SIZE],
+                update_conflicts=True,
+                unique_fields=['student', 'subject', 'term_exam_name'],
+                update_fields=['score', 'grade', 'comments', 'school_class', 'recorded_by', 'last_updated'],
+            )
+        # bulk_create skips model signals: refresh the gradebook aggregates in one go
+        aggregates.refresh_for_results((row[0], row[3], row[1]) for row in rows)
+    return len(results)
+
+
+# --- Saved plans (dry-run preview -> confirm without a second pass) ---
+
+def save_plan(plan):
+    """Store the resolved rows of a valid plan and return its token."""
+    plan.token = uuid.uuid4().hex
+    with open(_plan_path(plan.token), 'w') as fh:
+        json.dump(plan.rows, fh)
+    return plan.token
+
+
+def load_plan(token, discard=True):
+    """
+    Return the rows saved under `token` and, unless `discard` is False, delete the
+    file (each plan is used once).
+    """
+    path = _plan_path(token)
+    try:
+        with open(path) as fh:
+            rows = [tuple(row) for row in json.load(fh)]
+    except FileNotFoundError:
+        raise ResultImportError("This import preview has expired; upload the file again.")
+    if discard:
+        os.remove(path)
+    return rows
+
+
+def discard_plan(token):
+    """Delete a saved plan (if it is still there)."""
+    try:
+        os.remove(_plan_path(token))
+    except FileNotFoundError:
+        pass
+
+
+def _plan_path(token):
+    if not token.isalnum():
+        raise ResultImportError("Invalid import token.")
+    directory = getattr(settings, 'FILE_UPLOAD_TEMP_DIR', None) or tempfile.gettempdir()
+    return os.path.join(directory, f'result_import_{token}.json')
+
+
+def _student_map(codes):
+    """{student code: (pk, current_class_pk)}, resolved LOOKUP_CHUNK_SIZE codes per query."""
+    codes = sorted(codes)
+    mapping = {}
+    for start in range(0, len(codes), LOOKUP_CHUNK_SIZE):
+        for pk, code, class_pk in Student.objects.filter(
+            student_id__in=codes[start:start + LOOKUP_CHUNK_SIZE]
+        ).values_list('pk', 'student_id', 'current_class'):
+            mapping[code] = (pk, class_pk)
+    return mapping
+
+
+def _existing_keys(rows):
+    """The (student, subject, term) keys among `rows` that already have a Result."""
+    student_pks = sorted({row[0] for row in rows})
+    terms = {row[3] for row in rows}
+    existing = set()
+    for start in range(0, len(student_pks), LOOKUP_CHUNK_SIZE):
+        existing.update(Result.objects.filter(
+            student__in=student_pks[start:start + LOOKUP_CHUNK_SIZE], term_exam_name__in=terms
+        ).values_list('student', 'subject', 'term_exam_name'))
+    return existing
@@ -0,0 +1,193 @@
+# core/search.py
+"""
+Indexed full-text search over students, news articles and announcements.
+
+Searching with `icontains` is a leading-wildcard LIKE, which no index can
+serve, and across the student-parent M2M it also repeats rows. Instead every
+searchable object has one SearchDocument (a title and a body of text), and the
+database's own full-text index answers the query:
+
+- SQLite: an FTS5 table over core_searchdocument (external content, kept in
+  step by triggers), unicode61 tokenizer without diacritics, with prefix indexes.
+- PostgreSQL: a GIN index on to_tsvector('simple', title || ' ' || body),
+  queried with prefix terms ('ann:* & smi:*').
+- other backends: icontains over the documents (one narrow table, no joins).
+
+Every word of the query must match the start of a word in the document, so
+"ann sm" finds Anna Smith. As with the gradebook aggregates, documents are
+rebuilt from the source rows for just the affected objects whenever those
+change (core.signals); `manage.py rebuild_search_index` rebuilds or checks all.
+"""
+import re
+
+from django.contrib.auth import get_user_model
+from django.db import connections
+from django.db.models import Prefetch, Q
+from django.db.models.expressions import RawSQL
+
+from .models import Announcement, NewsArticle, SearchDocument, Student
+
+STUDENT = 'student'
+NEWS = 'news'
+ANNOUNCEMENT = 'announcement'
+KINDS = (STUDENT, NEWS, ANNOUNCEMENT)
+
+FTS_TABLE = 'core_searchdocument_fts' # SQLite FTS5 table (migration 0017)
+PG_DOCUMENT = "to_tsvector('simple', title || ' ' || body)" # Must match the expression of the GIN index
+MAX_QUERY_TERMS = 8
+UPSERT_BATCH_SIZE = 1000
+REFRESH_CHUNK_SIZE = 500
+
+
+# --- Querying ---
+
+def query_terms(query):
+    """The words of a search query, lowercased (letters and digits only, so they are safe in any match syntax)."""
+    return re.findall(r'[^\W_]+', query.lower())[:MAX_QUERY_TERMS]
+
+
+def matching(queryset, kind, query):
+    """
+    `queryset` (of the model searched as `kind`) narrowed to the objects whose
+    document matches every word of `query`; empty if the query has no words.
+    """
+    terms = query_terms(query)
+    if not terms:
+        return queryset.none()
+    vendor = connections[queryset.db].vendor
+    if vendor == 'sqlite':
+        # CROSS JOIN pins the join order: match in the index first, then fetch those documents
+        sql = (
+            f'SELECT d.object_id FROM {FTS_TABLE} CROSS JOIN core_searchdocument d ON d.id = {FTS_TABLE}.rowid '
+            f'WHERE {FTS_TABLE} MATCH %s AND d.kind = %s'
+        )
+        return queryset.filter(pk__in=RawSQL(sql, (' '.join(f'"{term}"*' for term in terms), kind)))
+    if vendor == 'postgresql':
+        sql = f"SELECT object_id FROM core_searchdocument WHERE kind = %s AND {PG_DOCUMENT} @@ to_tsquery('simple', %s)"
+        return queryset.filter(pk__in=RawSQL(sql, (kind, ' & '.join(f'{term}:*' for term in terms))))
+    documents = SearchDocument.objects.filter(kind=kind)
+    for term in terms:
+        documents = documents.filter(Q(title__icontains=term) | Q(body__icontains=term))
+    return queryset.filter(pk__in=documents.values('object_id'))
+
+
+# --- Building documents ---
+
+def _student_documents(ids):
+    students = Student.objects.filter(pk__in=ids).select_related('current_class').prefetch_related(
+        Prefetch('parents', queryset=get_user_model().objects.only('username', 'first_name', 'last_name'))
+    )
+    for student in students:
+        words = [student.student_id]
+        if student.current_class:
+            words += [student.current_class.name, student.current_class.academic_year]
+        for parent in student.parents.all():
+            words += [parent.username, parent.get_full_name()]
+        yield student.pk, student.full_name, ' '.join(words)
+
+
+def _news_documents(ids):
+    for pk, title, content in NewsArticle.objects.filter(pk__in=ids).values_list('pk', 'title', 'content'):
+        yield pk, title, content
+
+
+def _announcement_documents(ids):
+    rows = Announcement.objects.filter(pk__in=ids).values_list('pk', 'title', 'content', 'posted_by__username')
+    for pk, title, content, username in rows:
+        yield pk, title, f"{content} {username or ''}"
+
+
+# kind -> (model, document builder yielding (pk, title, body) for a list of pks)
+SOURCES = {
+    STUDENT: (Student, _student_documents),
+    NEWS: (NewsArticle, _news_documents),
+    ANNOUNCEMENT: (Announcement, _announcement_documents),
+}
+
+
+# --- Keeping documents current ---
+
+def refresh(kind, ids):
+    """Rebuild the documents of these objects of `kind`; deleted objects lose theirs."""
+    ids = sorted(set(ids))
+    build = SOURCES[kind][1]
+    refreshed = 0
+    for start in range(0, len(ids), REFRESH_CHUNK_SIZE):
+        chunk = ids[start:start + REFRESH_CHUNK_SIZE]
+        documents = [
+            SearchDocument(kind=kind, object_id=pk, title=title[:300], body=body)
+            for pk, title, body in build(chunk)
+        ]
+        if documents:
+            SearchDocument.objects.bulk_create(
+                documents, batch_size=UPSERT_BATCH_SIZE, update_conflicts=True,
+                unique_fields=['kind', 'object_id'], update_fields=['title', 'body'],
+            )
+        found = {document.object_id for document in documents}
+        SearchDocument.objects.filter(kind=kind, object_id__in=[pk for pk in chunk if pk not in found]).delete()
+        refreshed += len(documents)
+    return refreshed
+
+
+def refresh_for_user(user_id, student_ids=(), announcement_ids=()):
+    """A user's name changed (or they were deleted): their children and announcements mention it."""
+    refresh(STUDENT, {*student_ids, *Student.objects.filter(parents=user_id).values_list('pk', flat=True)})
+    refresh(ANNOUNCEMENT, {*announcement_ids, *Announcement.objects.filter(posted_by=user_id).values_list('pk', flat=True)})
+
+
+def user_references(user_id):
+    """(student ids, announcement ids) whose documents mention the user; read before deleting them."""
+    return (
+        list(Student.objects.filter(parents=user_id).values_list('pk', flat=True)),
+        list(Announcement.objects.filter(posted_by=user_id).values_list('pk', flat=True)),
+    )
+
+
+# --- Rebuilding (manage.py rebuild_search_index) ---
+
+def _object_ids(kind):
+    """Every pk of the kind's model, in chunks."""
+    model = SOURCES[kind][0]
+    last_pk = 0
+    while True:
+        chunk = list(model.objects.filter(pk__gt=last_pk).order_by('pk').values_list('pk', flat=True)[:REFRESH_CHUNK_SIZE])
+        if not chunk:
+            return
+        yield chunk
+        last_pk = chunk[-1]
+
+
+def rebuild(kind):
+    """Rebuild every document of `kind` and drop those of deleted objects; returns the number written."""
+    model = SOURCES[kind][0]
+    written = sum(refresh(kind, chunk) for chunk in _object_ids(kind))
+    SearchDocument.objects.filter(kind=kind).exclude(object_id__in=model.objects.values('pk')).delete()
+    return written
+
+
+def rebuild_index(using='default'):
+    """Rebuild the backend's full-text index from the documents (SQLite FTS5 only; PostgreSQL indexes an expression)."""
+    connection = connections[using]
+    if connection.vendor == 'sqlite':
+        with connection.cursor() as cursor:
+            cursor.execute(f"INSERT INTO {FTS_TABLE}({FTS_TABLE}) VALUES ('rebuild')")
+
+
+def verify(kind):
+    """[(object_id, problem)] for every document of `kind` that is missing, stale or orphaned."""
+    build = SOURCES[kind][1]
+    problems = []
+    for chunk in _object_ids(kind):
+        stored = {
+            pk: (title, body) for pk, title, body in
+            SearchDocument.objects.filter(kind=kind, object_id__in=chunk).values_list('object_id', 'title', 'body')
+        }
+        for pk, title, body in build(chunk):
+            if pk not in stored:
+                problems.append((pk, 'missing'))
+            elif stored[pk] != (title[:300], body):
+                problems.append((pk, 'stale'))
+    model = SOURCES[kind][0]
+    orphans = SearchDocument.objects.filter(kind=kind).exclude(object_id__in=model.objects.values('pk'))
+    problems += [(pk, 'orphaned') for pk in orphans.values_list('object_id', flat=True)]
+    return problems
@@ -0,0 +1,373 @@
+# core/signals.py
+"""Signal handlers keeping derived tables in sync with the core models."""
+from django.conf import settings
+from django.db import transaction
+from django.db.models import QuerySet
+from django.db.models.signals import m2m_changed, post_delete, post_init, post_save, pre_delete
+from django.dispatch import receiver
+
+from . import access, aggregates, attendance, attendance_bitmap, images, media, public_cache, search
+from .models import (
+    Announcement, AttendanceRecord, CarouselImage, ImageVariants, NewsArticle, NewsImage, ParentProfile, Result,
+    SchoolClass, Student, Subject, TeacherProfile,
+)
+
+
+def _cascaded_from(origin, *models):
+    """Whether a delete started from an instance or queryset of one of `models` (and cascaded here)."""
+    return (origin.model if isinstance(origin, QuerySet) else type(origin)) in models
+
+
+# --- Gradebook aggregates (see core/aggregates.py) ---
+@receiver(post_init, sender=Result)
+def remember_result_key(sender, instance, **kwargs):
+    # Remember the aggregate key as loaded, so an edit that changes the
+    # student, subject or term also refreshes the rows it moved away from.
+    # Read __dict__ directly: deferred fields must not trigger a query per instance.
+    fields = instance.__dict__
+    instance._aggregate_key = (fields.get('student_id'), fields.get('term_exam_name'), fields.get('subject_id'))
+
+
+@receiver(post_save, sender=Result)
+def refresh_aggregates_on_result_save(sender, instance, raw=False, **kwargs):
+    if raw: # Fixture loading; run `manage.py rebuild_aggregates` afterwards
+        return
+    keys = {(instance.student_id, instance.term_exam_name, instance.subject_id)}
+    if instance._aggregate_key[0] is not None:
+        keys.add(instance._aggregate_key)
+    aggregates.refresh_for_results(keys)
+    instance._aggregate_key = (instance.student_id, instance.term_exam_name, instance.subject_id)
+
+
+@receiver(post_delete, sender=Result)
+def refresh_aggregates_on_result_delete(sender, instance, origin=None, **kwargs):
+    if _cascaded_from(origin, Student, Subject): # Refreshed once for the whole cascade, below
+        return
+    aggregates.refresh_for_results({(instance.student_id, instance.term_exam_name, instance.subject_id)})
+
+
+# Deleting a student or subject cascades to its results (and a student's attendance):
+# collect the keys they counted towards up front and refresh them once afterwards,
+# instead of a refresh per deleted row.
+@receiver(pre_delete, sender=Student)
+def remember_student_cascade_keys(sender, instance, **kwargs):
+    # The student's own aggregate rows and attendance bitmaps are deleted with them
+    instance._cascade_keys = (
+        {(instance.current_class_id, term, subject_id) for term, subject_id in Result.objects.filter(
+            student=instance, score__isnull=False).values_list('term_exam_name', 'subject').distinct()},
+        set(AttendanceRecord.objects.filter(student=instance, school_class__isnull=False)
+            .values_list('school_class', 'date').distinct()),
+    )
+
+
+@receiver(post_delete, sender=Student)
+def refresh_aggregates_on_student_delete(sender, instance, **kwargs):
+    class_keys, summary_keys = instance.__dict__.pop('_cascade_keys', ((), ()))
+    aggregates.refresh_class_subjects(class_keys)
+    attendance.refresh_daily_summaries(summary_keys)
+
+
+@receiver(pre_delete, sender=Subject)
+def remember_subject_cascade_keys(sender, instance, **kwargs):
+    # The subject's class aggregate rows are deleted with it; the students' term totals change
+    instance._cascade_keys = set(Result.objects.filter(subject=instance, score__isnull=False)
+                                 .values_list('student', 'term_exam_name').distinct())
+
+
+@receiver(post_delete, sender=Subject)
+def refresh_aggregates_on_subject_delete(sender, instance, **kwargs):
+    aggregates.refresh_for_results(
+        (student_id, term, instance.pk) for student_id, term in instance.__dict__.pop('_cascade_keys', ())
+    )
+
+
+@receiver(post_init, sender=Student)
+def remember_student_class(sender, instance, **kwargs):
+    instance._original_class_id = instance.__dict__.get('current_class_id')
+
+
+@receiver(post_save, sender=Student)
+def refresh_aggregates_on_class_change(sender, instance, created=False, raw=False, **kwargs):
+    if created or raw or instance.current_class_id == instance._original_class_id:
+        return
+    aggregates.refresh_for_student_move(instance.pk, {instance._original_class_id, instance.current_class_id})
+    instance._original_class_id = instance.current_class_id
+# --- End gradebook aggregates ---
+
+
+# --- Daily attendance rollup (see core/attendance.py) ---
+# Covers single-record saves such as the admin's list_editable status column;
+# register saves go through attendance.save_register, which refreshes in bulk.
+# The per-student attendance bitmaps (core/attendance_bitmap.py) are refreshed alongside.
+@receiver(post_init, sender=AttendanceRecord)
+def remember_attendance_key(sender, instance, **kwargs):
+    fields = instance.__dict__
+    instance._summary_key = (fields.get('school_class_id'), fields.get('date'))
+    instance._history_key = (fields.get('student_id'), fields.get('date'))
+
+
+@receiver(post_save, sender=AttendanceRecord)
+def refresh_summary_on_attendance_save(sender, instance, raw=False, **kwargs):
+    if raw: # Fixture loading; run `manage.py rebuild_aggregates` afterwards
+        return
+    attendance.refresh_daily_summaries({(instance.school_class_id, instance.date), instance._summary_key})
+    history_keys = {(instance.student_id, instance.date)}
+    if instance._history_key[0] is not None:
+        history_keys.add(instance._history_key)
+    attendance_bitmap.refresh_for_records(history_keys)
+    instance._summary_key = (instance.school_class_id, instance.date)
+    instance._history_key = (instance.student_id, instance.date)
+
+
+@receiver(post_delete, sender=AttendanceRecord)
+def refresh_summary_on_attendance_delete(sender, instance, origin=None, **kwargs):
+    if _cascaded_from(origin, Student): # See refresh_aggregates_on_student_delete
+        return
+    attendance.refresh_daily_summaries({(instance.school_class_id, instance.date)})
+    attendance_bitmap.refresh_for_records({(instance.student_id, instance.date)})
+# --- End daily attendance rollup ---
+
+
+# --- Cached access contexts (see core/access.py) ---
+# Anything that changes a user's role, classes or children drops their cached context.
+@receiver(post_save, sender=TeacherProfile)
+@receiver(post_delete, sender=TeacherProfile)
+@receiver(post_save, sender=ParentProfile)
+@receiver(post_delete, sender=ParentProfile)
+def invalidate_access_on_profile_change(sender, instance, **kwargs):
+    access.invalidate(instance.user_id)
+
+
+@receiver(post_save, sender=settings.AUTH_USER_MODEL)
+def invalidate_access_on_user_save(sender, instance, **kwargs):
+    access.invalidate(instance.pk) # is_staff may have changed
+
+
+@receiver(post_init, sender=SchoolClass)
+def remember_class_teacher(sender, instance, **kwargs):
+    instance._original_teacher_id = instance.__dict__.get('class_teacher_id')
+
+
+@receiver(post_save, sender=SchoolClass)
+def invalidate_access_on_class_save(sender, instance, **kwargs):
+    if instance.class_teacher_id != instance._original_teacher_id or kwargs.get('created'):
+        access.invalidate(instance._original_teacher_id, instance.class_teacher_id)
+    instance._original_teacher_id = instance.class_teacher_id
+
+
+@receiver(post_delete, sender=SchoolClass)
+def invalidate_access_on_class_delete(sender, instance, **kwargs):
+    access.invalidate(instance.class_teacher_id)
+
+
+@receiver(m2m_changed, sender=Student.parents.through)
+def invalidate_access_on_parent_link(sender, instance, action, reverse, pk_set, **kwargs):
+    if action == 'pre_clear' and not reverse:
+        # pk_set is not given for clear(): find the affected parents before the links go
+        instance._cleared_parent_ids = list(instance.parents.values_list('pk', flat=True))
+    elif action == 'post_clear':
+        access.invalidate(*([instance.pk] if reverse else instance.__dict__.pop('_cleared_parent_ids', [])))
+    elif action in ('post_add', 'post_remove'):
+        access.invalidate(*([instance.pk] if reverse else pk_set))
+
+
+@receiver(pre_delete, sender=Student)
+def invalidate_access_on_student_delete(sender, instance, **kwargs):
+    # The parent links are removed by cascade, which sends no m2m_changed
+    access.invalidate(*instance.parents.values_list('pk', flat=True))
+# --- End cached access contexts ---
+
+
+# --- Public page cache (see core/public_cache.py) ---
+PUBLIC_CACHE_GROUPS = {
+    Announcement: public_cache.ANNOUNCEMENTS,
+    CarouselImage: public_cache.CAROUSEL,
+    NewsArticle: public_cache.NEWS,
+    NewsImage: public_cache.NEWS,
+    SchoolClass: public_cache.SCHOOL,
+    Student: public_cache.SCHOOL,
+    Subject: public_cache.SCHOOL,
+}
+
+
+def _bump_public_cache(group):
+    public_cache.bump(group)
+    # Bump again on commit: a reader between the save and the commit may have cached the old rows
+    transaction.on_commit(lambda: public_cache.bump(group))
+
+
+@receiver(post_save, sender=Announcement)
+@receiver(post_delete, sender=Announcement)
+@receiver(post_save, sender=CarouselImage)
+@receiver(post_delete, sender=CarouselImage)
+@receiver(post_save, sender=NewsArticle)
+@receiver(post_delete, sender=NewsArticle)
+@receiver(post_save, sender=NewsImage)
+@receiver(post_delete, sender=NewsImage)
+@receiver(post_save, sender=SchoolClass)
+@receiver(post_delete, sender=SchoolClass)
+@receiver(post_save, sender=Student)
+@receiver(post_delete, sender=Student)
+@receiver(post_save, sender=Subject)
+@receiver(post_delete, sender=Subject)
+def invalidate_public_cache(sender, **kwargs):
+    _bump_public_cache(PUBLIC_CACHE_GROUPS[sender])
+
+
+# Announcements and news articles show their author's name
+AUTHOR_NAME_FIELDS = ('username', 'first_name', 'last_name')
+AUTHORED_GROUPS = (public_cache.ANNOUNCEMENTS, public_cache.NEWS)
+
+
+def _author_name(user):
+    return tuple(user.__dict__.get(field) for field in AUTHOR_NAME_FIELDS)
+
+
+@receiver(post_init, sender=settings.AUTH_USER_MODEL)
+def remember_author_name(sender, instance, **kwargs):
+    instance._original_author_name = _author_name(instance)
+
+
+@receiver(post_save, sender=settings.AUTH_USER_MODEL)
+def invalidate_public_cache_on_user_save(sender, instance, created=False, **kwargs):
+    if not created and _author_name(instance) != instance._original_author_name:
+        for group in AUTHORED_GROUPS:
+            _bump_public_cache(group)
+        instance._original_author_name = _author_name(instance)
+
+
+@receiver(post_delete, sender=settings.AUTH_USER_MODEL)
+def invalidate_public_cache_on_user_delete(sender, **kwargs):
+    # The authored rows are unlinked by an UPDATE (SET_NULL), which sends no signal
+    for group in AUTHORED_GROUPS:
+        _bump_public_cache(group)
+# --- End public page cache ---
+
+
+# --- Responsive image variants (see core/images.py) ---
+# Image field of each model, and the public cache group to refresh once its variants exist
+IMAGE_FIELDS = {
+    CarouselImage: ('image', public_cache.CAROUSEL),
+    NewsImage: ('image', public_cache.NEWS),
+    Student: ('profile_picture', None),
+}
+
+
+@receiver(post_init, sender=CarouselImage)
+@receiver(post_init, sender=NewsImage)
+@receiver(post_init, sender=Student)
+def remember_image_name(sender, instance, **kwargs):
+    field, _ = IMAGE_FIELDS[sender]
+    image = instance.__dict__.get(field)
+    instance._original_image_name = getattr(image, 'name', image) or None
+
+
+@receiver(post_save, sender=CarouselImage)
+@receiver(post_save, sender=NewsImage)
+@receiver(post_save, sender=Student)
+def process_image_on_save(sender, instance, created=False, raw=False, **kwargs):
+    if raw: # Fixture loading; run `manage.py process_images` and `media_gc --verify` afterwards
+        return
+    field, public_group = IMAGE_FIELDS[sender]
+    name = getattr(instance, field).name or None
+    previous = None if created else instance._original_image_name # A new instance has no stored image yet
+    if name == previous:
+        return
+    # Files are shared by content (core/storage.py): count references here and
+    # leave deleting the file and its variants to `manage.py media_gc`
+    if previous:
+        media.release(previous)
+    if name:
+        media.retain(name)
+        if not ImageVariants.objects.filter(source=name).exists(): # Same content uploaded before
+            images.process_later(name, public_group)
+    instance._original_image_name = name
+
+
+@receiver(post_delete, sender=CarouselImage)
+@receiver(post_delete, sender=NewsImage)
+@receiver(post_delete, sender=Student)
+def release_image_on_delete(sender, instance, **kwargs):
+    name = getattr(instance, IMAGE_FIELDS[sender][0]).name
+    if name:
+        media.release(name)
+# --- End responsive image variants ---
+
+
+# --- Search index (see core/search.py) ---
+SEARCH_KINDS = {
+    Student: search.STUDENT,
+    NewsArticle: search.NEWS,
+    Announcement: search.ANNOUNCEMENT,
+}
+SEARCHED_USER_FIELDS = {'username', 'first_name', 'last_name'}
+
+
+@receiver(post_save, sender=Student)
+@receiver(post_delete, sender=Student)
+@receiver(post_save, sender=NewsArticle)
+@receiver(post_delete, sender=NewsArticle)
+@receiver(post_save, sender=Announcement)
+@receiver(post_delete, sender=Announcement)
+def refresh_search_document(sender, instance, raw=False, **kwargs):
+    if raw: # Fixture loading; run `manage.py rebuild_search_index` afterwards
+        return
+    search.refresh(SEARCH_KINDS[sender], [instance.pk])
+
+
+@receiver(m2m_changed, sender=Student.parents.through)
+def refresh_search_on_parent_link(sender, instance, action, reverse, pk_set, **kwargs):
+    # A student's document lists their parents
+    if not reverse:
+        if action in ('post_add', 'post_remove', 'post_clear'):
+            search.refresh(search.STUDENT, [instance.pk])
+    elif action == 'pre_clear':
+        instance._cleared_child_ids = list(instance.children.values_list('pk', flat=True))
+    elif action == 'post_clear':
+        search.refresh(search.STUDENT, instance.__dict__.pop('_cleared_child_ids', []))
+    elif action in ('post_add', 'post_remove'):
+        search.refresh(search.STUDENT, pk_set)
+
+
+@receiver(post_init, sender=SchoolClass)
+def remember_class_label(sender, instance, **kwargs):
+    fields = instance.__dict__
+    instance._original_label = (fields.get('name'), fields.get('academic_year'))
+
+
+@receiver(post_save, sender=SchoolClass)
+def refresh_search_on_class_rename(sender, instance, created=False, raw=False, **kwargs):
+    label = (instance.name, instance.academic_year)
+    if not created and not raw and label != instance._original_label:
+        search.refresh(search.STUDENT, instance.students.values_list('pk', flat=True))
+    instance._original_label = label
+
+
+@receiver(pre_delete, sender=SchoolClass)
+def remember_class_students(sender, instance, **kwargs):
+    # Deleting the class sets current_class to NULL without saving the students
+    instance._student_ids = list(instance.students.values_list('pk', flat=True))
+
+
+@receiver(post_delete, sender=SchoolClass)
+def refresh_search_on_class_delete(sender, instance, **kwargs):
+    search.refresh(search.STUDENT, instance.__dict__.pop('_student_ids', []))
+
+
+@receiver(post_save, sender=settings.AUTH_USER_MODEL)
+def refresh_search_on_user_save(sender, instance, created=False, update_fields=None, raw=False, **kwargs):
+    # Parents' and announcement authors' names are indexed; logins only save last_login
+    if created or raw or (update_fields is not None and not SEARCHED_USER_FIELDS & set(update_fields)):
+        return
+    search.refresh_for_user(instance.pk)
+
+
+@receiver(pre_delete, sender=settings.AUTH_USER_MODEL)
+def remember_user_search_references(sender, instance, **kwargs):
+    instance._search_references = search.user_references(instance.pk)
+
+
+@receiver(post_delete, sender=settings.AUTH_USER_MODEL)
+def refresh_search_on_user_delete(sender, instance, **kwargs):
+    search.refresh_for_user(instance.pk, *instance.__dict__.pop('_search_references', ((), ())))
+# --- End search index ---
@@ -0,0 +1,83 @@
+# core/storage.py
+"""
+Content-addressed storage for uploaded images.
+
+Django's FileSystemStorage keeps the uploaded file name and appends a random
+suffix on collision, so every re-upload of the same flyer is another copy
+(`2.jpg`, `2_f86HolP.jpg`, ...). ContentAddressedStorage names each file after
+the SHA-256 of its bytes instead:
+
+    uploads/<first two hex digits>/<sha256>.<ext>
+
+so identical uploads resolve to one file, whichever model or upload_to path
+they came from, and saving a file that already exists writes nothing. The
+responsive variants of an image (core/images.py) are written to the same
+storage beside their original, under `variants/` and the names images.py
+gives them, so one set serves every row using that content.
+
+Files are shared, so a file cannot be deleted when one row stops using it:
+StoredFile rows count the references (kept up to date by core.media from
+the model signals) and `manage.py media_gc` deletes what nothing references.
+
+It is the 'uploads' entry of settings.STORAGES and the storage of every
+ImageField (via upload_storage, so the backend can be changed in settings).
+"""
+import hashlib
+import os
+import posixpath
+
+from django.core.files.storage import FileSystemStorage, storages
+from django.utils import timezone
+
+ROOT = 'uploads'
+VARIANTS_DIR = 'variants' # Generated copies of an original, stored under their own names
+HASH_CHUNK_SIZE = 64 * 1024
+
+
+def upload_storage():
+    """Storage for the ImageFields (settings.STORAGES['uploads'])."""
+    return storages['uploads']
+
+
+def is_content_addressed(name):
+    """Whether `name` is a ContentAddressedStorage name (rather than a legacy upload path)."""
+    parts = name.split('/')
+    return len(parts) == 3 and parts[0] == ROOT and len(os.path.splitext(parts[2])[0]) == 64
+
+
+class _StoredConcurrently(FileExistsError):
+    """The content-addressed name was created by another upload between exists() and the write."""
+
+
+class ContentAddressedStorage(FileSystemStorage):
+    """FileSystemStorage that stores each distinct content once, named by its SHA-256."""
+
+    def content_name(self, content, original_name):
+        """The content-addressed name for `content`; the extension comes from the uploaded name."""
+        digest = hashlib.sha256()
+        for chunk in content.chunks(HASH_CHUNK_SIZE):
+            digest.update(chunk.encode('utf-8') if isinstance(chunk, str) else chunk)
+        hexdigest = digest.hexdigest()
+        extension = os.path.splitext(original_name)[1].lower()[:10]
+        return posixpath.join(ROOT, hexdigest[:2], hexdigest + extension)
+
+    def _save(self, name, content):
+        if VARIANTS_DIR in name.split('/')[:-1]:
+            return super()._save(name, content) # A variant: derived from its original, named after it
+        name = self.content_name(content, name)
+        if not self.exists(name):
+            try:
+                return super()._save(name, content)
+            except _StoredConcurrently:
+                pass # Same name, same content: use the other upload's file
+        # Already stored: reuse it, and mark it as wanted so a pending garbage collection keeps it
+        from .models import StoredFile # core.models imports this module
+        StoredFile.objects.filter(name=name).update(updated_at=timezone.now())
+        return name
+
+    def get_available_name(self, name, max_length=None):
+        # FileSystemStorage._save asks for another name when the file appeared since exists();
+        # a suffixed copy of a content-addressed file would defeat the deduplication
+        if is_content_addressed(name):
+            raise _StoredConcurrently(name)
+        return super().get_available_name(name, max_length)
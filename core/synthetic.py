@@ -0,0 +1,301 @@
+# core/synthetic.py
+"""
+Deterministic synthetic school data, used by the query-plan checks, benchmarks
+and the generate_school command.
+
+build_school() creates a complete (small to medium) school with bulk inserts:
+classes with their teachers, students with parents, results for every
+subject/term and a run of school days of attendance. It returns a
+SyntheticSchool describing what was created, so callers can log in as
+a teacher/parent/staff user and hit URLs with real IDs.
+"""
+import io
+import random
+from contextlib import contextmanager
+from datetime import timedelta
+from itertools import islice
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.db import connection
+from django.test.utils import override_settings, setup_test_environment, teardown_test_environment
+from django.urls import reverse
+from django.utils import timezone
+
+from . import aggregates, attendance, attendance_bitmap, search
+from .models import (
+    Announcement, AttendanceRecord, CarouselImage, NewsArticle, NewsImage, ParentProfile,
+    Result, SchoolClass, Student, Subject, TeacherProfile,
+)
+
+# Same password for every synthetic user so test clients can log in
+SYNTHETIC_PASSWORD = 'synthetic-pass'
+STATUS_WEIGHTS = (('PRESENT', 85), ('ABSENT', 7), ('LATE', 6), ('EXCUSED', 2))
+
+
+class SyntheticSchool:
+    """Handles on the objects build_school() created."""
+    def __init__(self, staff, teacher, parent, class_ids, student_ids, subject_ids, article_ids, result_ids):
+        self.staff = staff        # Superuser
+        self.teacher = teacher    # Class teacher of the first class
+        self.parent = parent      # Parent of the first student
+        self.class_ids = class_ids
+        self.student_ids = student_ids
+        self.subject_ids = subject_ids
+        self.article_ids = article_ids
+        self.result_ids = result_ids
+
+
+def plain_static_files():
+    """
+    override_settings() serving static files under their own names. The manifest of
+    hashed names only exists once `collectstatic` has run, which tests do not do.
+    """
+    return override_settings(STORAGES={
+        **settings.STORAGES, 'staticfiles': {'BACKEND': 'django.contrib.staticfiles.storage.StaticFilesStorage'},
+    })
+
+
+@contextmanager
+def throwaway_database(keepdb=False):
+    """
+    Run the block against a freshly migrated test database, exactly like the test
+    runner does, so synthetic data never touches the live database.
+    """
+    setup_test_environment()
+    old_name = connection.creation.create_test_db(verbosity=0, autoclobber=True, keepdb=keepdb)
+    try:
+        # Every view reads the test database through `connection`, where queries are measured
+        with override_settings(DB_REPLICAS=[]), plain_static_files():
+            yield
+    finally:
+        connection.creation.destroy_test_db(old_name, verbosity=0, keepdb=keepdb)
+        teardown_test_environment()
+
+
+def school_days(days, end_date=None):
+    """The last `days` weekdays up to `end_date` (default today), oldest first."""
+    current = end_date or timezone.now().date()
+    dates = []
+    while len(dates) < days:
+        if current.weekday() < 5:
+            dates.append(current)
+        current -= timedelta(days=1)
+    return dates[::-1]
+
+
+def build_school(classes=3, students_per_class=30, subjects=8, terms=3, days=20,
+                 announcements=30, articles=10, seed=0, batch_size=1000):
+    """Create a synthetic school in the default database and return a SyntheticSchool."""
+    rng = random.Random(seed)
+    User = get_user_model()
+    prefix = f"syn{seed}"
+
+    staff = User.objects.create_superuser(f'{prefix}_admin', f'{prefix}_admin@example.com', SYNTHETIC_PASSWORD)
+    hashed = staff.password # Reuse one hash: hashing a password per user is by far the slowest step
+
+    # --- Teachers and classes ---
+    teachers = User.objects.bulk_create([
+        User(username=f'{prefix}_teacher{c}', first_name='Teacher', last_name=str(c), password=hashed)
+        for c in range(classes)
+    ])
+    TeacherProfile.objects.bulk_create([TeacherProfile(user=teacher) for teacher in teachers])
+    school_classes = SchoolClass.objects.bulk_create([
+        SchoolClass(name=f'{prefix} Grade {c}', academic_year='2025-2026', class_teacher=teacher)
+        for c, teacher in enumerate(teachers)
+    ])
+    subject_objs = Subject.objects.bulk_create([Subject(name=f'{prefix} Subject {s}') for s in range(subjects)])
+
+    # --- Students and parents (one parent per two siblings) ---
+    students = Student.objects.bulk_create([
+        Student(
+            student_id=f'{prefix}-{c:03d}-{n:03d}', first_name=f'First{n}', last_name=f'Last{c}-{n}',
+            date_of_birth=timezone.now().date() - timedelta(days=rng.randint(6 * 365, 17 * 365)),
+            current_class=school_class,
+        )
+        for c, school_class in enumerate(school_classes) for n in range(students_per_class)
+    ], batch_size=batch_size)
+    parents = User.objects.bulk_create([
+        User(username=f'{prefix}_parent{p}', first_name='Parent', last_name=str(p), password=hashed)
+        for p in range((len(students) + 1) // 2)
+    ], batch_size=batch_size)
+    ParentProfile.objects.bulk_create([ParentProfile(user=parent) for parent in parents], batch_size=batch_size)
+    Through = Student.parents.through
+    Through.objects.bulk_create([
+        Through(student_id=student.pk, user_id=parents[i // 2].pk) for i, student in enumerate(students)
+    ], batch_size=batch_size)
+
+    # --- Results: every student x subject x term ---
+    term_names = [f'Term {t + 1}' for t in range(terms)]
+    results = Result.objects.bulk_create([
+        Result(
+            student=student, subject=subject, school_class=student.current_class, term_exam_name=term,
+            score=round(rng.uniform(35, 100), 1), recorded_by=student.current_class.class_teacher,
+        )
+        for student in students for subject in subject_objs for term in term_names
+    ], batch_size=batch_size)
+    for school_class in school_classes:
+        aggregates.rebuild_class(school_class.pk) # bulk_create bypasses the aggregate signals
+
+    # --- Attendance for the last `days` school days ---
+    statuses, weights = zip(*STATUS_WEIGHTS)
+    AttendanceRecord.objects.bulk_create([
+        AttendanceRecord(
+            student=student, date=date, status=rng.choices(statuses, weights)[0],
+            school_class=student.current_class, recorded_by=student.current_class.class_teacher,
+        )
+        for date in school_days(days) for student in students
+    ], batch_size=batch_size)
+    for school_class in school_classes:
+        attendance.rebuild_class_summaries(school_class.pk) # Same for the daily attendance rollup
+        attendance_bitmap.rebuild_class_years(school_class.pk) # ... and the per-student bitmaps
+
+    # --- Public content ---
+    now = timezone.now()
+    Announcement.objects.bulk_create([
+        Announcement(title=f'{prefix} Announcement {a}', content='Lorem ipsum dolor sit amet. ' * 10,
+                     posted_by=staff, timestamp=now - timedelta(hours=a))
+        for a in range(announcements)
+    ], batch_size=batch_size)
+    news = NewsArticle.objects.bulk_create([
+        NewsArticle(title=f'{prefix} News {n}', content='Lorem ipsum dolor sit amet. ' * 40,
+                    published_date=now.date() - timedelta(days=n), author=staff)
+        for n in range(articles)
+    ], batch_size=batch_size)
+    NewsImage.objects.bulk_create([
+        NewsImage(article=article, image=f'news_images/{article.pk}/synthetic_{i}.jpg', order=i)
+        for article in news for i in range(2)
+    ], batch_size=batch_size)
+    CarouselImage.objects.bulk_create([
+        CarouselImage(title=f'{prefix} Slide {i}', image=f'carousel_images/synthetic_{i}.jpg', order=i)
+        for i in range(3)
+    ])
+    for kind in search.KINDS:
+        search.rebuild(kind) # bulk_create bypasses the search index signals too
+
+    return SyntheticSchool(
+        staff=staff, teacher=teachers[0], parent=parents[0],
+        class_ids=[c.pk for c in school_classes], student_ids=[s.pk for s in students],
+        subject_ids=[s.pk for s in subject_objs], article_ids=[a.pk for a in news], result_ids=[r.pk for r in results],
+    )
+
+
+def view_scenarios(school):
+    """
+    (label, url, user) for every page in core/urls.py, with IDs taken from `school`
+    and the user each page is meant for (None = anonymous).
+    """
+    class_id, student_id = school.class_ids[0], school.student_ids[0]
+    return [
+        ('home', reverse('home'), None),
+        ('news_list', reverse('news_list'), None),
+        ('news_detail', reverse('news_detail', kwargs={'article_id': school.article_ids[0]}), None),
+        ('dashboard', reverse('dashboard'), school.teacher),
+        ('parent_dashboard', reverse('parent_dashboard'), school.parent),
+        ('teacher_dashboard', reverse('teacher_dashboard'), school.teacher),
+        ('add_result', reverse('add_result', kwargs={'student_id': student_id}), school.teacher),
+        ('edit_result', reverse('edit_result', kwargs={'result_id': school.result_ids[0]}), school.teacher),
+        ('delete_result', reverse('delete_result', kwargs={'result_id': school.result_ids[0]}), school.teacher),
+        ('student_profile', reverse('student_profile', kwargs={'student_id': student_id}), school.teacher),
+        ('student_profile_parent', reverse('student_profile', kwargs={'student_id': student_id}), school.parent),
+        ('take_attendance', reverse('take_attendance', kwargs={'class_id': class_id}), school.teacher),
+        ('take_weekly_attendance', reverse('take_weekly_attendance', kwargs={'class_id': class_id}), school.teacher),
+        ('gradebook', reverse('gradebook', kwargs={'class_id': class_id})
+         + f'?subject={school.subject_ids[0]}&term_exam_name=Term+1', school.teacher),
+        ('view_class_attendance', reverse('view_class_attendance', kwargs={'class_id': class_id}), school.teacher),
+        ('export_class_results', reverse('export_class_results', kwargs={'class_id': class_id}), school.teacher),
+        ('export_parent_results', reverse('export_parent_results'), school.parent),
+        ('absence_report', reverse('absence_report'), school.staff),
+        ('report_cards', reverse('report_cards') + f'?class={class_id}', school.teacher),
+        ('student_report_card', reverse('student_report_card', kwargs={'student_id': student_id})
+         + '?term=Term+1', school.teacher),
+        ('site_search', reverse('site_search') + '?q=first1+last', school.staff),
+        ('site_search_teacher', reverse('site_search') + '?q=first1', school.teacher),
+        ('site_search_anonymous', reverse('site_search') + '?q=lorem', None),
+    ]
+
+
+def admin_scenarios(school):
+    """(label, url, user) for the admin changelists of the largest tables, viewed as staff."""
+    return [
+        ('admin_result_changelist', reverse('admin:core_result_changelist'), school.staff),
+        ('admin_student_changelist', reverse('admin:core_student_changelist'), school.staff),
+        ('admin_attendance_changelist', reverse('admin:core_attendancerecord_changelist'), school.staff),
+        ('admin_result_last_page', reverse('admin:core_result_changelist') + '?last=1', school.staff),
+        ('admin_result_by_student', reverse('admin:core_result_changelist')
+         + f'?student__id__exact={school.student_ids[0]}', school.staff),
+        ('admin_attendance_by_class', reverse('admin:core_attendancerecord_changelist')
+         + f'?school_class__id__exact={school.class_ids[0]}', school.staff),
+        ('admin_student_search', reverse('admin:core_student_changelist') + '?q=first1+last', school.staff),
+        ('admin_result_search', reverse('admin:core_result_changelist') + '?q=first1', school.staff),
+        ('admin_announcement_search', reverse('admin:core_announcement_changelist') + '?q=announcement', school.staff),
+    ]
+
+
+class FastInserter:
+    """
+    Append-only bulk loader for very large synthetic tables.
+
+    Rows are plain tuples in `fields` order (attnames, e.g. 'student_id'), already
+    adapted to database values. Each backend gets its fastest path:
+    - SQLite: executemany() on the raw sqlite3 cursor (no model instances, no
+      per-row parameter conversion). Run it inside one transaction.
+    - PostgreSQL: COPY ... FROM STDIN, one text-format buffer per batch.
+    - anything else: batched bulk_create().
+    """
+    def __init__(self, using=connection, batch_size=50000):
+        self.connection = using
+        self.batch_size = batch_size
+
+    def insert(self, model, fields, rows):
+        """Insert every row from the iterable; returns the number of rows written."""
+        columns = [self.connection.ops.quote_name(model._meta.get_field(name).column) for name in fields]
+        table = self.connection.ops.quote_name(model._meta.db_table)
+        vendor = self.connection.vendor
+        self.connection.ensure_connection()
+        written = 0
+        rows = iter(rows)
+        while True:
+            batch = list(islice(rows, self.batch_size))
+            if not batch:
+                return written
+            if vendor == 'sqlite':
+                self._sqlite_insert(table, columns, batch)
+            elif vendor == 'postgresql':
+                self._postgres_copy(table, columns, batch)
+            else:
+                model.objects.bulk_create([model(**dict(zip(fields, row))) for row in batch], batch_size=1000)
+            written += len(batch)
+
+    def _sqlite_insert(self, table, columns, batch):
+        placeholders = ', '.join('?' * len(columns))
+        cursor = self.connection.connection.cursor()
+        try:
+            cursor.executemany(
+                f'INSERT INTO {table} ({", ".join(columns)}) VALUES ({placeholders})', batch
+            )
+        finally:
+            cursor.close()
+
+    def _postgres_copy(self, table, columns, batch):
+        buffer = io.StringIO()
+        for row in batch:
+            buffer.write('\t'.join(_copy_text(value) for value in row))
+            buffer.write('\n')
+        sql = f'COPY {table} ({", ".join(columns)}) FROM STDIN'
+        with self.connection.connection.cursor() as cursor:
+            if hasattr(cursor, 'copy_expert'): # psycopg2
+                buffer.seek(0)
+                cursor.copy_expert(sql, buffer)
+            else: # psycopg 3
+                with cursor.copy(sql) as copy:
+                    copy.write(buffer.getvalue())
+
+
+def _copy_text(value):
+    """Encode one value for PostgreSQL COPY text format."""
+    if value is None:
+        return '\\N'
+    if isinstance(value, bool):
+        return 't' if value else 'f'
+    return str(value).replace('\\', '\\\\').replace('\t', '\\t').replace('\n', '\\n').replace('\r', '\\r')
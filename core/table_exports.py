@@ -0,0 +1,196 @@
+# core/table_exports.py
+"""
+Chunked CSV/XLSX exports for the django-import-export admins.
+
+import-export's own export appends every row to a tablib Dataset and then
+renders the whole file in memory (an XLSX through a full openpyxl workbook),
+so a year of results takes gigabytes. ChunkedExportMixin keeps the export
+page, the admin's resources and their field selection, but writes the file
+itself:
+
+- rows are read in chunks with the related objects the resource's fields use
+  joined in (select_related; prefetch_related for many-to-many fields), so
+  a foreign key column does not cost a query per row;
+- each row goes straight to a temporary file: CSV through the csv module,
+  XLSX through openpyxl's write-only workbook, which keeps no cells;
+- the response sends that file, and an export of more than
+  `export_in_background_over` rows is written by a background job instead
+  (`export_admin_table`, see core/tasks.py) with a download on its job page.
+"""
+import csv
+import io
+import tempfile
+
+from django.apps import apps
+from django.contrib import admin, messages
+from django.core.exceptions import FieldDoesNotExist, PermissionDenied
+from django.http import FileResponse, HttpRequest, HttpResponseRedirect, QueryDict
+from django.urls import reverse
+from django.utils.html import format_html
+from import_export.formats import base_formats
+from import_export.signals import post_export
+from openpyxl import Workbook
+from openpyxl.cell import WriteOnlyCell
+from openpyxl.cell.cell import ILLEGAL_CHARACTERS_RE
+from openpyxl.styles import Font
+
+from . import jobs
+
+EXPORT_CHUNK_SIZE = 2000 # Rows fetched per round trip
+
+
+# --- Reading rows ---
+
+def related_lookups(model, fields):
+    """(select_related, prefetch_related) paths covering the relations the resource `fields` read."""
+    select, prefetch = set(), set()
+    for field in fields:
+        path, current = [], model
+        for name in (field.attribute or '').split('__'):
+            try:
+                model_field = current._meta.get_field(name)
+            except FieldDoesNotExist: # A property or method, or a dehydrate-only field
+                break
+            if not model_field.is_relation or name != model_field.name: # Plain column, or the key itself (student_id)
+                break
+            path.append(name)
+            if model_field.many_to_many or model_field.one_to_many:
+                prefetch.add('__'.join(path))
+                path = []
+                break
+            current = model_field.related_model
+        if path:
+            select.add('__'.join(path))
+    return sorted(select), sorted(prefetch)
+
+
+def export_rows(resource, queryset, selected_fields=None, native=False):
+    """(header, rows): the resource's export of `queryset`, rows read lazily in chunks."""
+    fields = resource.get_export_fields(selected_fields)
+    select, prefetch = related_lookups(queryset.model, fields)
+    queryset = resource.filter_export(queryset).select_related(*select).prefetch_related(*prefetch)
+    header = resource.get_export_headers(selected_fields)
+    rows = (
+        [resource.export_field(field, instance, force_native_type=native) for field in fields]
+        for instance in queryset.iterator(chunk_size=EXPORT_CHUNK_SIZE)
+    )
+    return header, rows
+
+
+# --- Writing files ---
+
+def _write_csv(fh, header, rows):
+    text = io.TextIOWrapper(fh, encoding='utf-8', newline='')
+    writer = csv.writer(text)
+    writer.writerow(header)
+    count = 0
+    for row in rows:
+        writer.writerow(row)
+        count += 1
+    text.flush()
+    text.detach() # Leave `fh` open for the caller
+    return count
+
+
+def _xlsx_value(value):
+    # openpyxl refuses control characters; tablib's export replaces them the same way
+    if isinstance(value, str):
+        return ILLEGAL_CHARACTERS_RE.sub('\N{REPLACEMENT CHARACTER}', value)
+    return value
+
+
+def _write_xlsx(fh, header, rows):
+    workbook = Workbook(write_only=True)
+    sheet = workbook.create_sheet()
+    sheet.freeze_panes = 'A2'
+    bold = Font(bold=True)
+    header_cells = []
+    for title in header:
+        cell = WriteOnlyCell(sheet, value=title)
+        cell.font = bold
+        header_cells.append(cell)
+    sheet.append(header_cells)
+    count = 0
+    for row in rows:
+        sheet.append([_xlsx_value(value) for value in row])
+        count += 1
+    workbook.save(fh)
+    return count
+
+
+# file extension -> (writer, whether cells keep native types)
+WRITERS = {
+    'csv': (_write_csv, False),
+    'xlsx': (_write_xlsx, True),
+}
+
+
+def write(extension, fh, resource, queryset, selected_fields=None):
+    """Write the export of `queryset` as `extension` ('csv' or 'xlsx') to the binary file `fh`; returns the row count."""
+    writer, native = WRITERS[extension]
+    header, rows = export_rows(resource, queryset, selected_fields, native=native)
+    return writer(fh, header, rows)
+
+
+# --- Admin integration ---
+
+class ChunkedExportMixin:
+    """
+    For ImportExportModelAdmin subclasses: CSV and XLSX exports are written by
+    this module (chunked, to a temporary file, in the background when large).
+    """
+    export_formats = [base_formats.CSV, base_formats.XLSX]
+    export_in_background_over = 10000 # rows
+
+    def _do_file_export(self, file_format, request, queryset, export_form=None):
+        # import-export's single place that turns the export form into a download
+        extension = file_format.get_extension()
+        if extension not in WRITERS:
+            return super()._do_file_export(file_format, request, queryset, export_form=export_form)
+        if not self.has_export_permission(request):
+            raise PermissionDenied
+        resource_index = self.get_resource_index(export_form) if export_form else 0
+        selected_fields = self.get_export_resource_fields_from_form(export_form)
+        filename = self.get_export_filename(request, queryset, file_format)
+
+        limit = self.export_in_background_over
+        if queryset.order_by()[:limit + 1].count() > limit:
+            export_items = None
+            if export_form and 'export_items' in export_form.changed_data:
+                export_items = list(export_form.cleaned_data['export_items'])
+            job = jobs.enqueue('export_admin_table', {
+                'model': self.opts.label_lower, 'query': request.GET.urlencode(), 'export_items': export_items,
+                'format': extension, 'resource': resource_index, 'fields': selected_fields, 'filename': filename,
+            }, user=request.user)
+            self.message_user(request, format_html(
+                'The export has more than {} rows and is being written in the background. '
+                '<a href="{}">Download it from its job page</a> when it is ready.',
+                limit, reverse('job_status', args=[job.pk])), messages.INFO)
+            changelist = reverse(f'admin:{self.opts.app_label}_{self.opts.model_name}_changelist')
+            return HttpResponseRedirect(f"{changelist}?{request.GET.urlencode()}" if request.GET else changelist)
+
+        resource = self.get_export_resource_classes(request)[resource_index](**self.get_export_resource_kwargs(request))
+        fh = tempfile.TemporaryFile()
+        write(extension, fh, resource, queryset, selected_fields)
+        fh.seek(0)
+        post_export.send(sender=None, model=self.model)
+        return FileResponse(fh, as_attachment=True, filename=filename, content_type=file_format.get_content_type())
+
+
+def job_export(job, fh):
+    """Write the export queued by ChunkedExportMixin for `job` to `fh`; returns the row count."""
+    params = job.params
+    if job.created_by is None:
+        raise jobs.JobError("The user who asked for the export no longer exists.")
+    model_admin = admin.site.get_model_admin(apps.get_model(params['model']))
+    # Rebuild the changelist's filters and search as the user who asked for the export
+    request = HttpRequest()
+    request.method = 'GET'
+    request.GET = QueryDict(params['query'])
+    request.user = job.created_by
+    queryset = model_admin.get_export_queryset(request)
+    if params['export_items'] is not None:
+        queryset = queryset.filter(pk__in=params['export_items'])
+    resource_class = model_admin.get_export_resource_classes(request)[params['resource']]
+    resource = resource_class(**model_admin.get_export_resource_kwargs(request))
+    return write(params['format'], fh, resource, queryset, params['fields'])
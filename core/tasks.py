@@ -0,0 +1,111 @@
+# core/tasks.py
+"""
+Background job tasks (queued with core.jobs.enqueue, run by `manage.py run_jobs`).
+
+Permission checks happen where the job is queued; a task only re-checks that
+the objects it refers to still exist.
+"""
+import tempfile
+
+from django.db import transaction
+
+from . import aggregates, exports, images, jobs, public_cache, report_cards, result_import, search, table_exports
+from .models import Job, SchoolClass, Student
+
+
+# --- Result exports ---
+
+@jobs.task('export_class_results', title="Class results export")
+def export_class_results(job):
+    school_class = SchoolClass.objects.filter(pk=job.params['class_id']).first()
+    if school_class is None:
+        raise jobs.JobError("The class no longer exists.")
+    filename, header, rows = exports.class_results(school_class)
+    jobs.save_result(job, f"{filename}.csv", exports.csv_lines(header, rows))
+    return f"Results of {school_class} exported."
+
+
+@jobs.task('export_parent_results', title="Children's results export")
+def export_parent_results(job):
+    username = job.created_by.username if job.created_by else 'parent'
+    filename, header, rows = exports.parent_results(username, job.params['child_ids'])
+    jobs.save_result(job, f"{filename}.csv", exports.csv_lines(header, rows))
+    return "Your children's results exported."
+
+
+@jobs.task('export_admin_table', title="Spreadsheet export")
+def export_admin_table(job):
+    # Queued by the admin export page (core.table_exports.ChunkedExportMixin) for large exports
+    with tempfile.TemporaryFile() as fh:
+        count = table_exports.job_export(job, fh)
+        fh.seek(0)
+        jobs.save_result(job, job.params['filename'], iter(lambda: fh.read(64 * 1024), b''))
+    return f"Exported {count} rows."
+
+
+# --- Bulk result import (confirmed previews, see core/result_import.py) ---
+
+@jobs.task('import_results', title="Result import")
+def import_results(job):
+    # The resolved rows travel in the job itself: the worker may run on another host
+    rows = [tuple(row) for row in job.params['rows']]
+    count = result_import.apply_rows(rows, recorded_by=job.created_by)
+    # Kept until written so a failed attempt can be retried; no need for them afterwards
+    Job.objects.filter(pk=job.pk).update(params={'count': count})
+    return f"Imported {count} results."
+
+
+# --- Report cards (see core/report_cards.py) ---
+
+@jobs.task('report_cards', title="Report cards")
+def generate_report_cards(job):
+    class_ids = job.params['class_ids']
+    term = job.params['term']
+    classes = list(SchoolClass.objects.filter(pk__in=class_ids).order_by('academic_year', 'name'))
+    if not classes:
+        raise jobs.JobError("The classes no longer exist.")
+    cards = report_cards.collect(Student.objects.filter(current_class__in=class_ids), term)
+    with tempfile.TemporaryFile() as fh:
+        count = report_cards.write_zip(cards, fh)
+        fh.seek(0)
+        filename = report_cards.zip_filename(term, [str(school_class) for school_class in classes])
+        jobs.save_result(job, filename, iter(lambda: fh.read(64 * 1024), b''))
+    return f"Generated {count} report cards for {term}."
+
+
+# --- Moving students between classes (admin action) ---
+
+def move_students(student_ids, school_class):
+    """Assign the students to `school_class`; returns how many were updated."""
+    students = Student.objects.filter(pk__in=student_ids)
+    # queryset.update() skips model signals, so refresh the gradebook
+    # aggregates of every class the students leave or join afterwards
+    affected_class_ids = set(students.values_list('current_class', flat=True)) | {school_class.pk}
+    with transaction.atomic():
+        updated_count = students.update(current_class=school_class)
+        for class_id in affected_class_ids:
+            aggregates.rebuild_class(class_id)
+        search.refresh(search.STUDENT, student_ids) # Their documents name the class
+    return updated_count
+
+
+@jobs.task('assign_students_to_class', title="Class assignment")
+def assign_students_to_class(job):
+    school_class = SchoolClass.objects.filter(pk=job.params['class_id']).first()
+    if school_class is None:
+        raise jobs.JobError("The class no longer exists.")
+    updated_count = move_students(job.params['student_ids'], school_class)
+    return f"Assigned {updated_count} students to class {school_class}."
+
+
+# --- Responsive image variants (see core/images.py) ---
+
+@jobs.task('process_image', title="Image processing")
+def process_image(job):
+    try:
+        files = images.process(job.params['source'])
+    except FileNotFoundError:
+        raise jobs.JobError("The image file no longer exists.")
+    if job.params.get('public_group'):
+        public_cache.bump(job.params['public_group']) # Cached pages pick up the variants
+    return f"Generated {files} image variants."
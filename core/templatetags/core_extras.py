@@ -1,6 +1,10 @@
 # core/templatetags/core_extras.py
 
 from django import template
+from django.utils.html import format_html, format_html_join
+
+from core import images
+from core.storage import upload_storage
 
 register = template.Library()
 
@@ -13,4 +17,33 @@ def get_item(dictionary, key):
     """
     if isinstance(dictionary, dict):
         return dictionary.get(key)
-    return None # Return None or '' if it's not a dictionary or key not found
\ No newline at end of file
+    return None # Return None or '' if it's not a dictionary or key not found
+
+@register.simple_tag
+def responsive_image(image, sizes='100vw', **attrs):
+    """
+    <picture> for an ImageField value, with WebP and JPEG/PNG srcsets of its generated
+    variants (core/images.py). Falls back to a plain <img> of the original until the
+    variants exist. Extra keyword arguments become <img> attributes.
+    Usage: {% responsive_image article.image sizes="(max-width: 576px) 100vw, 500px" class="d-block w-100" alt=article.title %}
+    """
+    if not image:
+        return ''
+    attrs.setdefault('loading', 'lazy')
+    record = images.variants_for(image.name)
+    if record is None:
+        return format_html('<img src="{}"{}>', image.url, _attributes(attrs))
+    sets = images.srcsets(record)
+    webp = sets.pop('WEBP', None)
+    fallback_format, fallback = next(iter(sets.items()))
+    largest = [variant for variant in record['variants'] if variant['format'] == fallback_format][-1]
+    return format_html(
+        '<picture>{}<img src="{}" srcset="{}" sizes="{}" width="{}" height="{}"{}></picture>',
+        format_html('<source type="image/webp" srcset="{}" sizes="{}">', webp, sizes) if webp else '',
+        upload_storage().url(largest['name']), fallback, sizes,
+        record['width'], record['height'], _attributes(attrs),
+    )
+
+
+def _attributes(attrs):
+    return format_html_join('', ' {}="{}"', ((name.replace('_', '-'), value) for name, value in attrs.items()))
@@ -0,0 +1,18 @@
+# core/test_runner.py
+"""Test runner for `manage.py test` (settings.TEST_RUNNER)."""
+from django.test.runner import DiscoverRunner
+
+from .synthetic import plain_static_files
+
+
+class TestRunner(DiscoverRunner):
+    """DiscoverRunner with static files served under their own names (see synthetic.plain_static_files)."""
+
+    def setup_test_environment(self, **kwargs):
+        super().setup_test_environment(**kwargs)
+        self.static_files = plain_static_files()
+        self.static_files.enable()
+
+    def teardown_test_environment(self, **kwargs):
+        self.static_files.disable()
+        super().teardown_test_environment(**kwargs)
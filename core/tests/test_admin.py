@@ -0,0 +1,68 @@
+# core/tests/test_admin.py
+from unittest import mock
+
+from django.db import connection
+from django.test import RequestFactory, TestCase
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from core import changelists, synthetic
+from core.admin import TermFilter
+from core.models import Result, Student
+
+
+class ResultAdminFilterTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.school = synthetic.build_school(classes=1, students_per_class=2, subjects=2, terms=2, days=1)
+
+    def term_choices(self):
+        request = RequestFactory().get('/admin/core/result/')
+        return [term for term, _ in TermFilter(request, {}, Result, None).lookup_choices]
+
+    def test_terms_include_unscored_and_classless_results(self):
+        student = Student.objects.get(pk=self.school.student_ids[0])
+        Result.objects.create(student=student, subject_id=self.school.subject_ids[0], term_exam_name='Art project', grade='A')
+        student.current_class = None
+        student.save()
+        Result.objects.create(student=student, subject_id=self.school.subject_ids[1], term_exam_name='Zoo trip', score=70)
+        self.assertEqual(self.term_choices(), ['Art project', 'Term 1', 'Term 2', 'Zoo trip'])
+
+    def test_one_index_seek_per_term(self):
+        with self.assertNumQueries(3): # Two terms, then the seek that finds no more
+            self.assertEqual(self.term_choices(), ['Term 1', 'Term 2'])
+
+
+class EstimatedCountTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.school = synthetic.build_school(classes=1, students_per_class=2, subjects=2, terms=1, days=1)
+
+    def test_counts_stop_at_the_limit(self):
+        results = Result.objects.all()
+        self.assertEqual(changelists.estimated_count(results), (4, changelists.EXACT))
+        with mock.patch.object(changelists, 'COUNT_LIMIT', 3):
+            self.assertEqual(changelists.estimated_count(results), (3, changelists.LOWER_BOUND))
+
+    def test_changelist_shows_a_lower_bound(self):
+        self.client.force_login(self.school.staff)
+        url = reverse('admin:core_result_changelist')
+        with mock.patch.object(changelists, 'COUNT_LIMIT', 3):
+            self.assertContains(self.client.get(url), 'More than 3 results')
+            self.assertContains(self.client.get(url, {'o': '1'}), 'More than 3 results') # Numbered pages
+        self.assertNotContains(self.client.get(url), 'More than')
+
+
+class AnnouncementAdminTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.school = synthetic.build_school(classes=1, students_per_class=1, subjects=1, terms=1, days=1, announcements=30)
+
+    def test_changelist_loads_authors_with_the_rows(self):
+        self.client.force_login(self.school.staff)
+        with CaptureQueriesContext(connection) as captured:
+            response = self.client.get(reverse('admin:core_announcement_changelist'))
+        self.assertContains(response, 'id="filter_posted_by"') # Autocomplete, not a list of every user
+        self.assertContains(response, 'admin/js/autocomplete.js')
+        user_queries = [query for query in captured if 'FROM "auth_user"' in query['sql']]
+        self.assertEqual(len(user_queries), 1) # The logged-in user only
@@ -0,0 +1,69 @@
+# core/tests/test_aggregates.py
+from django.test import TestCase
+
+from core import aggregates, result_import, synthetic
+from core.models import Result, SchoolClass, Student, StudentTermAggregate, Subject
+
+
+class GradebookAggregateTests(TestCase):
+    """The materialized sum/count tables must always equal a live recomputation from Result."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.school = synthetic.build_school(classes=2, students_per_class=4, subjects=3, terms=2, days=5)
+
+    def assertConsistent(self):
+        for class_id in [*SchoolClass.objects.values_list('pk', flat=True), None]:
+            self.assertEqual(aggregates.verify_class(class_id), [], f"class {class_id}")
+
+    def test_rebuilt_aggregates_match_results(self):
+        self.assertConsistent()
+
+    def test_result_edits(self):
+        student = Student.objects.get(pk=self.school.student_ids[0])
+        result = Result.objects.create(student=student, subject_id=self.school.subject_ids[0],
+                                       term_exam_name='Mock', score=40)
+        self.assertConsistent()
+        result.score = 90
+        result.save()
+        self.assertConsistent()
+        # Moving a result to another term/subject also refreshes the key it left
+        result.term_exam_name = 'Final'
+        result.subject_id = self.school.subject_ids[1]
+        result.save()
+        self.assertConsistent()
+        self.assertFalse(StudentTermAggregate.objects.filter(student=student, term_exam_name='Mock').exists())
+        result.score = None # Grade-only results are not counted
+        result.grade = 'A'
+        result.save()
+        self.assertConsistent()
+        result.delete()
+        self.assertConsistent()
+
+    def test_student_changes_class(self):
+        student = Student.objects.get(pk=self.school.student_ids[0])
+        student.current_class_id = self.school.class_ids[1]
+        student.save()
+        self.assertConsistent()
+        student.current_class = None
+        student.save()
+        self.assertConsistent()
+
+    def test_bulk_import_replacing_scores_with_grades(self):
+        # More keys than DELETE_BATCH_SIZE lose their last scored result in one import
+        student = Student.objects.get(pk=self.school.student_ids[0])
+        scored = [
+            (student.pk, self.school.subject_ids[0], student.current_class_id, f'Quiz {number}', 50.0, '', '')
+            for number in range(aggregates.DELETE_BATCH_SIZE + 10)
+        ]
+        result_import.apply_rows(scored)
+        self.assertConsistent()
+        result_import.apply_rows([row[:4] + (None, 'B', '') for row in scored])
+        self.assertConsistent()
+        self.assertFalse(StudentTermAggregate.objects.filter(term_exam_name__startswith='Quiz').exists())
+
+    def test_cascade_deletes(self):
+        Student.objects.filter(pk__in=self.school.student_ids[:2]).delete()
+        self.assertConsistent()
+        Subject.objects.get(pk=self.school.subject_ids[0]).delete()
+        self.assertConsistent()
@@ -0,0 +1,94 @@
+# core/tests/test_attendance.py
+import random
+from datetime import date, timedelta
+
+from django.test import SimpleTestCase, TestCase
+
+from core import attendance, attendance_bitmap, synthetic
+from core.attendance_bitmap import AttendanceYear, STATUS_CODES
+from core.models import AttendanceRecord, SchoolClass, Student
+
+
+class BitmapEncodingTests(SimpleTestCase):
+    """The SWAR counts must agree with decoding the bitmap day by day."""
+
+    def setUp(self):
+        rng = random.Random(1)
+        self.year = 2024
+        self.codes = {index: rng.choice([0, *STATUS_CODES.values()]) for index in range(attendance_bitmap.DAYS_PER_YEAR)}
+        self.history = AttendanceYear(self.year, attendance_bitmap.encode(self.codes))
+        self.start = attendance_bitmap.year_start(self.year)
+
+    def naive_counts(self, first=0, last=attendance_bitmap.DAYS_PER_YEAR):
+        return {
+            f'{status.lower()}_count': sum(1 for index in range(first, last) if self.codes[index] == code)
+            for status, code in STATUS_CODES.items()
+        }
+
+    def test_bitmap_size(self):
+        self.assertEqual(len(attendance_bitmap.encode(self.codes)), attendance_bitmap.BITMAP_BYTES)
+
+    def test_whole_year_counts(self):
+        self.assertEqual(self.history.counts(), self.naive_counts())
+
+    def test_range_counts(self):
+        for first, last in ((0, 1), (5, 40), (100, 101), (200, attendance_bitmap.DAYS_PER_YEAR), (30, 30)):
+            with self.subTest(first=first, last=last):
+                counts = self.history.counts(self.start + timedelta(days=first), self.start + timedelta(days=last - 1))
+                self.assertEqual(counts, self.naive_counts(first, last))
+        # Ranges reaching outside the year are clipped to it
+        self.assertEqual(self.history.counts(self.start - timedelta(days=30), self.start + timedelta(days=999)),
+                         self.naive_counts())
+
+    def test_days_round_trip(self):
+        statuses = {code: status for status, code in STATUS_CODES.items()}
+        for index, (day, status) in enumerate(self.history.days()):
+            self.assertEqual(day, self.start + timedelta(days=index))
+            self.assertEqual(status, statuses.get(self.codes[index]))
+
+
+class AttendanceRollupTests(TestCase):
+    """The daily class rollup and the per-student bitmaps must equal a live recomputation."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.school = synthetic.build_school(classes=2, students_per_class=4, subjects=1, terms=1, days=10)
+
+    def assertConsistent(self):
+        for class_id in SchoolClass.objects.values_list('pk', flat=True):
+            self.assertEqual(attendance.verify_class_summaries(class_id), [], f"class {class_id}")
+        for class_id in [*SchoolClass.objects.values_list('pk', flat=True), None]:
+            self.assertEqual(attendance_bitmap.verify_class_years(class_id), [], f"class {class_id}")
+
+    def test_rebuilt_rollups_match_records(self):
+        self.assertConsistent()
+
+    def test_register_saves(self):
+        school_class = SchoolClass.objects.get(pk=self.school.class_ids[0])
+        days = synthetic.school_days(3)
+        entries = {(student_id, day): ('ABSENT', 'ill') for student_id in self.school.student_ids[:4] for day in days}
+        attendance.save_register(school_class, entries)
+        self.assertConsistent()
+        # A student's record filed under another class is taken over by this one
+        moved = self.school.student_ids[4]
+        attendance.save_register(school_class, {(moved, days[0]): ('LATE', '')})
+        self.assertConsistent()
+
+    def test_single_record_edits(self):
+        record = AttendanceRecord.objects.filter(student=self.school.student_ids[0]).first()
+        record.status = 'EXCUSED'
+        record.save()
+        self.assertConsistent()
+        record.date = date(2021, 10, 4) # Into another academic year
+        record.save()
+        self.assertConsistent()
+        record.delete()
+        self.assertConsistent()
+
+    def test_student_changes_class_and_is_deleted(self):
+        student = Student.objects.get(pk=self.school.student_ids[0])
+        student.current_class_id = self.school.class_ids[1]
+        student.save()
+        self.assertConsistent()
+        student.delete()
+        self.assertConsistent()
@@ -0,0 +1,75 @@
+# core/tests/test_conditional.py
+from django.core.cache import cache
+from django.test import TestCase
+from django.urls import reverse
+
+from core import synthetic
+from core.models import NewsArticle, SchoolClass, Subject
+
+
+class ParentDashboardETagTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.school = synthetic.build_school(classes=2, students_per_class=2, subjects=1, terms=1, days=1)
+        cls.url = reverse('parent_dashboard')
+
+    def setUp(self):
+        cache.clear()
+        self.client.force_login(self.school.parent)
+        self.child = self.school.parent.children.order_by('pk').first()
+
+    def revalidate(self):
+        """A function re-requesting the dashboard with its current ETag, returning the status."""
+        self.client.get(self.url) # Sets the CSRF cookie, which the ETag covers
+        etag = self.client.get(self.url)['ETag']
+        return lambda: self.client.get(self.url, HTTP_IF_NONE_MATCH=etag).status_code
+
+    def test_unchanged_dashboard_is_not_modified(self):
+        self.assertEqual(self.revalidate()(), 304)
+
+    def test_moving_a_child_changes_the_etag(self):
+        status = self.revalidate()
+        self.child.current_class = SchoolClass.objects.exclude(pk=self.child.current_class_id).first()
+        self.child.save()
+        self.assertEqual(status(), 200)
+
+    def test_renaming_a_subject_changes_the_etag(self):
+        status = self.revalidate()
+        subject = Subject.objects.get()
+        subject.name = 'Renamed'
+        subject.save()
+        self.assertEqual(status(), 200)
+
+
+class NewsETagTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.school = synthetic.build_school(classes=1, students_per_class=1, subjects=1, terms=1, days=1, articles=1)
+        cls.article = NewsArticle.objects.select_related('author').get()
+        cls.url = reverse('news_detail', kwargs={'article_id': cls.article.pk})
+
+    def setUp(self):
+        cache.clear()
+
+    def revalidate(self):
+        self.client.get(self.url) # Sets the CSRF cookie, which the ETag covers
+        etag = self.client.get(self.url)['ETag']
+        return lambda: self.client.get(self.url, HTTP_IF_NONE_MATCH=etag).status_code
+
+    def test_logins_keep_the_etag(self):
+        status = self.revalidate()
+        self.client.force_login(self.article.author)
+        self.client.logout()
+        self.assertEqual(status(), 304)
+
+    def test_renaming_the_author_changes_the_etag(self):
+        status = self.revalidate()
+        self.article.author.first_name = 'Renamed'
+        self.article.author.save()
+        self.assertEqual(status(), 200)
+        self.assertContains(self.client.get(self.url), 'Renamed')
+
+    def test_deleting_the_author_changes_the_etag(self):
+        status = self.revalidate()
+        self.article.author.delete()
+        self.assertEqual(status(), 200)
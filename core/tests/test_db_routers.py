@@ -0,0 +1,97 @@
+# core/tests/test_db_routers.py
+from django.contrib.auth.models import User
+from django.contrib.sessions.models import Session
+from django.http import HttpResponse, StreamingHttpResponse
+from django.test import RequestFactory, SimpleTestCase, override_settings
+from django.urls import resolve
+
+from core import db_routers
+from core.db_routers import PRIMARY, STICKY_COOKIE, PrimaryReplicaRouter, ReplicaRoutingMiddleware
+from core.models import Result, Student
+
+
+@override_settings(DB_REPLICAS=['replica1'], DB_REPLICA_STICKY_SECONDS=15)
+class ReplicaRoutingTests(SimpleTestCase):
+    """Routing decisions only: no query is sent to either database."""
+
+    def setUp(self):
+        self.router = PrimaryReplicaRouter()
+        self.factory = RequestFactory()
+
+    def run_request(self, view, method='get', path='/', cookies=None):
+        """Run `view(request)` inside the middleware, as Django would for the URL `path`."""
+        request = getattr(self.factory, method)(path)
+        request.COOKIES.update(cookies or {})
+        request.resolver_match = resolve(path)
+
+        def get_response(request):
+            middleware.process_view(request, view, (), {})
+            return view(request)
+        middleware = ReplicaRoutingMiddleware(get_response)
+        return middleware(request)
+
+    def routed(self, reads):
+        """A view recording where each model in `reads` would be read from."""
+        seen = []
+
+        def view(request):
+            seen.extend(self.router.db_for_read(model) for model in reads)
+            return HttpResponse()
+        return view, seen
+
+    def test_outside_requests_use_the_primary(self):
+        self.assertEqual(self.router.db_for_read(Student), PRIMARY)
+        self.assertEqual(self.router.db_for_write(Student), PRIMARY)
+
+    def test_replica_pages_read_from_a_replica(self):
+        view, seen = self.routed([Student, Result])
+        response = self.run_request(view, path='/news/')
+        self.assertEqual(seen, ['replica1', 'replica1'])
+        self.assertNotIn(STICKY_COOKIE, response.cookies)
+
+    def test_sessions_and_users_always_use_the_primary(self):
+        view, seen = self.routed([Session, User])
+        self.run_request(view, path='/news/')
+        self.assertEqual(seen, [PRIMARY, PRIMARY])
+
+    def test_other_pages_and_posts_use_the_primary(self):
+        view, seen = self.routed([Student])
+        self.run_request(view, path='/admin/')
+        self.run_request(view, method='post', path='/news/')
+        self.assertEqual(seen, [PRIMARY, PRIMARY])
+
+    def test_write_switches_to_primary_and_sets_sticky_cookie(self):
+        seen = []
+
+        def view(request):
+            seen.append(self.router.db_for_read(Student))
+            self.router.db_for_write(Student)
+            seen.append(self.router.db_for_read(Student))
+            return HttpResponse()
+        response = self.run_request(view, path='/news/')
+        self.assertEqual(seen, ['replica1', PRIMARY])
+        self.assertEqual(response.cookies[STICKY_COOKIE]['max-age'], 15)
+
+    def test_sticky_cookie_keeps_reads_on_primary(self):
+        view, seen = self.routed([Student])
+        self.run_request(view, path='/news/', cookies={STICKY_COOKIE: '1'})
+        self.assertEqual(seen, [PRIMARY])
+
+    def test_primary_block(self):
+        seen = []
+
+        def view(request):
+            with db_routers.primary():
+                seen.append(self.router.db_for_read(Student))
+            seen.append(self.router.db_for_read(Student))
+            return HttpResponse()
+        self.run_request(view, path='/news/')
+        self.assertEqual(seen, [PRIMARY, 'replica1'])
+
+    def test_streamed_content_stays_on_the_replica(self):
+        def rows():
+            for _ in range(2):
+                yield self.router.db_for_read(Result).encode() + b'\n'
+
+        response = self.run_request(lambda request: StreamingHttpResponse(rows()), path='/news/')
+        self.assertEqual(b''.join(response.streaming_content), b'replica1\nreplica1\n')
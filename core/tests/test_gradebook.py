@@ -0,0 +1,64 @@
+# core/tests/test_gradebook.py
+from django.test import TestCase
+from django.urls import reverse
+from django.utils.http import urlencode
+
+from core import aggregates, synthetic
+from core.forms import GradebookForm
+from core.models import Result, Student
+
+
+class GradebookTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.school = synthetic.build_school(classes=1, students_per_class=3, subjects=1, terms=1, days=1)
+        cls.students = list(Student.objects.order_by('last_name', 'first_name'))
+        cls.url = reverse('gradebook', kwargs={'class_id': cls.school.class_ids[0]}) + '?' + urlencode(
+            {'subject': cls.school.subject_ids[0], 'term_exam_name': 'Term 1'})
+
+    def setUp(self):
+        self.client.force_login(self.school.teacher)
+
+    def grid(self, **overrides):
+        """POST data keeping every stored mark, with `overrides` (e.g. score_3='')."""
+        data = {}
+        for result in Result.objects.filter(term_exam_name='Term 1'):
+            data[f'score_{result.student_id}'] = result.score
+            data[f'grade_{result.student_id}'] = result.grade
+            data[f'comments_{result.student_id}'] = result.comments
+        data.update(overrides)
+        return data
+
+    def test_save_changed_rows(self):
+        student = self.students[0]
+        response = self.client.post(self.url, self.grid(**{f'score_{student.pk}': '88.5', f'grade_{student.pk}': 'A'}))
+        self.assertRedirects(response, self.url, fetch_redirect_response=False)
+        result = Result.objects.get(student=student, term_exam_name='Term 1')
+        self.assertEqual((result.score, result.grade), (88.5, 'A'))
+        self.assertEqual(aggregates.verify_class(self.school.class_ids[0]), [])
+
+    def test_emptied_row_deletes_the_result(self):
+        student = self.students[1]
+        response = self.client.post(self.url, self.grid(
+            **{f'score_{student.pk}': '', f'grade_{student.pk}': '', f'comments_{student.pk}': ''}))
+        self.assertRedirects(response, self.url, fetch_redirect_response=False)
+        self.assertFalse(Result.objects.filter(student=student, term_exam_name='Term 1').exists())
+        self.assertEqual(Result.objects.filter(term_exam_name='Term 1').count(), len(self.students) - 1)
+        self.assertEqual(aggregates.verify_class(self.school.class_ids[0]), [])
+
+    def test_invalid_cell_saves_nothing(self):
+        student = self.students[0]
+        before = list(Result.objects.order_by('pk').values_list('score', flat=True))
+        response = self.client.post(self.url, self.grid(**{f'score_{student.pk}': '120', f'score_{self.students[1].pk}': '1'}))
+        self.assertEqual(response.status_code, 200)
+        self.assertContains(response, 'is-invalid', count=1)
+        self.assertEqual(list(Result.objects.order_by('pk').values_list('score', flat=True)), before)
+
+    def test_rendering_twice_does_not_repeat_the_error_class(self):
+        student = self.students[0]
+        form = GradebookForm(self.students, {f'score_{student.pk}': '-1'})
+        self.assertFalse(form.is_valid())
+        for _ in range(2):
+            widgets = [widget for row_student, cells in form.rows() if row_student == student for _, widget in cells]
+            self.assertEqual(widgets[0].count('is-invalid'), 1)
+            self.assertNotIn('is-invalid', widgets[1])
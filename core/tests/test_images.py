@@ -0,0 +1,47 @@
+# core/tests/test_images.py
+import io
+import shutil
+import tempfile
+from datetime import timedelta
+
+from django.core.files.base import ContentFile
+from django.test import TestCase, override_settings
+from PIL import Image
+
+from core import images, media
+from core.models import ImageVariants
+from core.storage import upload_storage
+
+
+class ImageVariantTests(TestCase):
+    def setUp(self):
+        uploads, default = tempfile.mkdtemp(), tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, uploads)
+        self.addCleanup(shutil.rmtree, default)
+        # Separate roots, so a variant written to the default storage would not be found
+        settings = override_settings(STORAGES={
+            'default': {'BACKEND': 'django.core.files.storage.FileSystemStorage', 'OPTIONS': {'location': default}},
+            'uploads': {'BACKEND': 'core.storage.ContentAddressedStorage', 'OPTIONS': {'location': uploads}},
+        })
+        settings.enable()
+        self.addCleanup(settings.disable)
+
+    def upload(self, width=400, height=300):
+        buffer = io.BytesIO()
+        Image.new('RGB', (width, height), 'teal').save(buffer, 'JPEG')
+        return upload_storage().save('news_images/photo.jpg', ContentFile(buffer.getvalue()))
+
+    def test_variants_live_beside_the_original(self):
+        source = self.upload()
+        self.assertEqual(images.process(source), 6) # 160, 320 and 400 wide, JPEG and WebP each
+        names = [variant['name'] for variant in ImageVariants.objects.get(source=source).variants]
+        self.assertIn(images.variant_name(source, 400, 'webp'), names)
+        storage = upload_storage()
+        self.assertTrue(all(storage.exists(name) for name in names))
+        self.assertIn(storage.url(names[0]), images.srcsets(images.variants_for(source))['JPEG'])
+
+        self.assertEqual(images.process(source), 6) # Re-rendering keeps the same names
+        self.assertEqual(media.collect_garbage(grace=timedelta(0), dry_run=True)[0], 1) # Only the unreferenced original
+
+        images.discard(source)
+        self.assertFalse(any(storage.exists(name) for name in names))
@@ -0,0 +1,88 @@
+# core/tests/test_keyset.py
+from datetime import timedelta
+
+from django.test import TestCase
+from django.utils import timezone
+
+from core.keyset import KeysetPaginator
+from core.models import Announcement
+
+
+class KeysetPaginationTests(TestCase):
+    """Walking the pages by cursor must visit every row once, in order, on the same boundaries as OFFSET paging."""
+
+    per_page = 4
+
+    @classmethod
+    def setUpTestData(cls):
+        now = timezone.now()
+        # Groups of three announcements share a timestamp: the id breaks the ties
+        Announcement.objects.bulk_create([
+            Announcement(title=f'Announcement {n}', content='...', timestamp=now - timedelta(hours=n // 3))
+            for n in range(11)
+        ])
+
+    def setUp(self):
+        self.queryset = Announcement.objects.all()
+        self.paginator = KeysetPaginator(self.queryset, ('-timestamp', '-id'), self.per_page)
+        self.count = self.queryset.count()
+        ordered = list(self.queryset.order_by('-timestamp', '-id').values_list('pk', flat=True))
+        self.expected = [ordered[start:start + self.per_page] for start in range(0, len(ordered), self.per_page)]
+
+    def page(self, **params):
+        return self.paginator.page(self.paginator.position(params), self.count)
+
+    def ids(self, page):
+        return [row.pk for row in page]
+
+    def test_forward_walk(self):
+        page = self.page()
+        pages = [page]
+        while page.has_next():
+            page = self.page(after=page.last_cursor, page=page.number + 1)
+            pages.append(page)
+        self.assertEqual([self.ids(page) for page in pages], self.expected)
+        self.assertEqual([page.number for page in pages], list(range(1, len(self.expected) + 1)))
+        self.assertFalse(pages[0].has_previous())
+        self.assertTrue(all(page.has_previous() for page in pages[1:]))
+
+    def test_backward_walk_from_last_page(self):
+        page = self.page(last=1)
+        self.assertEqual(page.number, len(self.expected))
+        pages = [page]
+        while page.has_previous():
+            page = self.page(before=page.first_cursor, page=page.number - 1)
+            pages.append(page)
+        # The last page is the short one, so going back lands on the same boundaries as going forward
+        self.assertEqual([self.ids(page) for page in reversed(pages)], self.expected)
+        self.assertEqual(page.number, 1)
+        self.assertFalse(page.has_previous())
+
+    def test_exact_multiple_of_page_size(self):
+        for announcement in Announcement.objects.order_by('timestamp', 'id')[:3]: # 11 -> 8 rows
+            announcement.delete()
+        self.setUp()
+        self.assertEqual(self.count, 2 * self.per_page)
+        first = self.page()
+        second = self.page(after=first.last_cursor, page=2)
+        self.assertFalse(second.has_next())
+        self.assertEqual(self.ids(self.page(last=1)), self.ids(second))
+
+    def test_new_row_does_not_shift_later_pages(self):
+        first = self.page()
+        Announcement.objects.create(title='Newest', content='...', timestamp=timezone.now() + timedelta(hours=1))
+        self.assertEqual(self.ids(self.page(after=first.last_cursor, page=2)), self.expected[1])
+
+    def test_malformed_cursor_means_first_page(self):
+        for cursor in ('nonsense', 'x~y', '~', '2024-01-01~1~2'):
+            with self.subTest(cursor=cursor):
+                page = self.page(after=cursor, page=3)
+                self.assertEqual(self.ids(page), self.expected[0])
+                self.assertFalse(page.has_previous())
+
+    def test_empty_queryset(self):
+        paginator = KeysetPaginator(Announcement.objects.none(), ('-timestamp', '-id'), self.per_page)
+        page = paginator.page(paginator.position({}), 0)
+        self.assertEqual(list(page), [])
+        self.assertFalse(page.has_other_pages())
+        self.assertEqual(page.num_pages, 1)
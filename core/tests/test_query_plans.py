@@ -0,0 +1,34 @@
+# core/tests/test_query_plans.py
+from django.core.cache import cache
+from django.test import Client, TestCase
+
+from core import queryplans, synthetic
+
+
+class QueryPlanTests(TestCase):
+    """
+    Same check as `manage.py check_query_plans`, as part of the test suite: no
+    query issued by a view may read a hot table with a full table scan.
+    """
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.school = synthetic.build_school()
+
+    def setUp(self):
+        cache.clear() # Cached public pages would issue no queries to check
+
+    def test_views_use_indexes(self):
+        for label, url, user in synthetic.view_scenarios(self.school):
+            with self.subTest(view=label):
+                client = Client()
+                if user is not None:
+                    client.force_login(user)
+                with queryplans.capture_queries() as captured:
+                    response = client.get(url)
+                    if response.streaming:
+                        b''.join(response.streaming_content)
+                self.assertLess(response.status_code, 400)
+                self.assertTrue(captured, "no queries captured")
+                scans = [plan for plan in queryplans.full_scans(captured) if plan['full_scans']]
+                self.assertEqual(scans, [], '\n'.join(f"{plan['sql']}\n{plan['plan']}" for plan in scans))
@@ -0,0 +1,92 @@
+# core/tests/test_result_import.py
+import io
+
+from django.test import TestCase
+
+from core import result_import, synthetic
+from core.models import Result, Student, Subject
+
+
+def upload(text, name='results.csv'):
+    fh = io.BytesIO(text.encode('utf-8'))
+    fh.name = name
+    return fh
+
+
+class ResultImportTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.school = synthetic.build_school(classes=1, students_per_class=2, subjects=2, terms=1, days=1)
+        cls.students = list(Student.objects.order_by('pk'))
+        cls.subjects = list(Subject.objects.order_by('pk'))
+
+    def test_plan_counts_new_and_updated_rows(self):
+        first, second = self.students
+        plan = result_import.plan_import(upload(
+            'Student ID,Subject,Term / Exam Name,Score,Grade\n'
+            f'{first.student_id},{self.subjects[0].name},Term 1,75,B\n' # Exists (synthetic term)
+            f'{second.student_id},{self.subjects[1].name.upper()},Mock,,A\n' # Subject names are case-insensitive
+            '\n'
+        ))
+        self.assertTrue(plan.is_valid)
+        self.assertEqual((plan.new_count, plan.update_count), (1, 1))
+        self.assertEqual(plan.rows[1], (second.pk, self.subjects[1].pk, second.current_class_id, 'Mock', None, 'A', ''))
+
+    def test_plan_reports_every_invalid_row(self):
+        code = self.students[0].student_id
+        subject = self.subjects[0].name
+        plan = result_import.plan_import(upload(
+            'student_id,subject,term,score\n'
+            f'nobody,{subject},Term 1,50\n'
+            f'{code},Art,Term 1,50\n'
+            f'{code},{subject},,50\n'
+            f'{code},{subject},Term 9,abc\n'
+            f'{code},{subject},Term 9,101\n'
+            f'{code},{subject},Term 8,10\n'
+            f'{code},{subject},Term 8,20\n'
+        ))
+        self.assertFalse(plan.is_valid)
+        self.assertEqual([number for number, _ in plan.errors], [2, 3, 4, 5, 6, 8])
+        self.assertIn("duplicate of row 7", plan.errors[-1][1])
+
+    def test_plan_rejects_non_finite_scores(self):
+        code = self.students[0].student_id
+        subject = self.subjects[0].name
+        plan = result_import.plan_import(upload(
+            'student_id,subject,term,score\n'
+            f'{code},{subject},Term 1,nan\n'
+            f'{code},{subject},Term 2,inf\n'
+            f'{code},{subject},Term 3,-Infinity\n'
+        ))
+        self.assertEqual(plan.rows, [])
+        self.assertEqual([number for number, _ in plan.errors], [2, 3, 4])
+        self.assertIn("between 0 and 100", plan.errors[0][1])
+
+    def test_missing_columns_and_unsupported_files(self):
+        with self.assertRaisesMessage(result_import.ResultImportError, 'term_exam_name'):
+            result_import.plan_import(upload('student_id,subject,score\n'))
+        with self.assertRaises(result_import.ResultImportError):
+            result_import.plan_import(upload('', name='results.txt'))
+
+    def test_apply_upserts_on_student_subject_term(self):
+        student = self.students[0]
+        plan = result_import.plan_import(upload(
+            'student_id,subject,term,score\n'
+            f'{student.student_id},{self.subjects[0].name},Term 1,12\n'
+            f'{student.student_id},{self.subjects[0].name},Mock,34\n'
+        ))
+        before = Result.objects.count()
+        self.assertEqual(result_import.apply_rows(plan.rows), 2)
+        self.assertEqual(Result.objects.count(), before + 1)
+        self.assertEqual(Result.objects.get(student=student, subject=self.subjects[0], term_exam_name='Term 1').score, 12)
+
+    def test_saved_plan_is_used_once(self):
+        plan = result_import.plan_import(upload(
+            f'student_id,subject,term\n{self.students[0].student_id},{self.subjects[0].name},Mock\n'
+        ))
+        token = result_import.save_plan(plan)
+        self.assertEqual(result_import.load_plan(token), plan.rows)
+        with self.assertRaises(result_import.ResultImportError):
+            result_import.load_plan(token)
+        with self.assertRaises(result_import.ResultImportError):
+            result_import.load_plan('../etc/passwd')
@@ -0,0 +1,42 @@
+# core/tests/test_storage.py
+import os
+import shutil
+import tempfile
+from unittest import mock
+
+from django.core.files.base import ContentFile
+from django.test import TestCase
+
+from core.storage import ContentAddressedStorage, is_content_addressed
+
+
+class ContentAddressedStorageTests(TestCase):
+    def setUp(self):
+        location = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, location)
+        self.storage = ContentAddressedStorage(location=location)
+
+    def stored_files(self):
+        return sorted(os.path.join(directory, name)
+                      for directory, _, names in os.walk(self.storage.location) for name in names)
+
+    def test_identical_content_is_stored_once(self):
+        name = self.storage.save('news_images/flyer.JPG', ContentFile(b'flyer'))
+        self.assertTrue(is_content_addressed(name))
+        self.assertTrue(name.endswith('.jpg'))
+        self.assertEqual(self.storage.save('carousel_images/copy.jpg', ContentFile(b'flyer')), name)
+        self.assertEqual(len(self.stored_files()), 1)
+
+    def test_concurrent_upload_of_the_same_content(self):
+        stored = self.storage.save('a.jpg', ContentFile(b'flyer'))
+        # The other upload passed its exists() check before this file was written
+        exists, missed = self.storage.exists, []
+
+        def exists_once_missed(name):
+            if name == stored and not missed:
+                missed.append(name)
+                return False
+            return exists(name)
+        with mock.patch.object(self.storage, 'exists', exists_once_missed):
+            self.assertEqual(self.storage.save('b.jpg', ContentFile(b'flyer')), stored)
+        self.assertEqual(len(self.stored_files()), 1)
@@ -30,6 +30,12 @@ urlpatterns = [
     # Add URL for taking attendance for a specific class
     path('class/<int:class_id>/attendance/', views.take_attendance, name='take_attendance'),
 
+    # Whole-week attendance register for a class, saved in one submission
+    path('class/<int:class_id>/attendance/week/', views.take_weekly_attendance, name='take_weekly_attendance'),
+
+    # Gradebook grid: one subject and term for the whole class
+    path('class/<int:class_id>/gradebook/', views.gradebook, name='gradebook'),
+
     # Add URL for viewing class attendance history
     path('class/<int:class_id>/attendance/view/', views.view_class_attendance, name='view_class_attendance'),
 
@@ -39,6 +45,20 @@ urlpatterns = [
     # Add URL for exporting parent's children results
     path('parent/results/export/', views.export_parent_results_csv, name='export_parent_results'),
 
+    # Report cards: batch (classes / year group, as a background job) and one student's printable card
+    path('reports/report-cards/', views.report_cards, name='report_cards'),
+    path('student/<int:student_id>/report-card/', views.student_report_card, name='student_report_card'),
+
+    # Background jobs: progress page and the finished file
+    path('jobs/<int:job_id>/', views.job_status, name='job_status'),
+    path('jobs/<int:job_id>/download/', views.job_download, name='job_download'),
+
+    # Staff report: students over the chronic absence threshold for an academic year
+    path('reports/absence/', views.absence_report, name='absence_report'),
+
+    # Site-wide search (students, news, announcements)
+    path('search/', views.site_search, name='site_search'),
+
     # Add URL for the news list page
     path('news/', views.news_list, name='news_list'),
     # Optional: URL for single news detail page
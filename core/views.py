@@ -1,78 +1,94 @@
 # core/views.py
 from django.shortcuts import render, redirect, get_object_or_404 # Add get_object_or_404
 from django.contrib.auth.decorators import login_required
+from django.contrib.admin.views.decorators import staff_member_required # Staff-only reports
 from django.contrib import messages # To show success messages
 from django.utils.dateparse import parse_date # To handle date input
-from django.db import transaction # For atomic saving
+from django.db import DatabaseError, transaction # Reported when an attendance save fails
 from django.utils import timezone
 from datetime import timedelta # For date calculations
-from django.db.models import Count, Q # For counting attendance statuses
-from django.core.paginator import Paginator, EmptyPage, PageNotAnInteger
-from .models import Student, Result, ParentProfile, TeacherProfile, SchoolClass, Announcement, AttendanceRecord, NewsArticle, NewsImage # Add Result
-from .forms import ResultForm # Import the new form
-import csv # Standard Python library for CSV handling
-from django.http import HttpResponse # To return the CSV file
+from django.db.models import Prefetch # For the bounded recent-results prefetch
+from .keyset import KeysetPaginator, page_key # Cursor pagination: every page costs the same
+from .models import Student, Result, SchoolClass, Announcement, AttendanceRecord, NewsArticle, NewsImage, Job # Add Result
+from .forms import ResultForm, GradebookSelectForm, GradebookForm, ReportCardForm # Import the new form
+from . import attendance, attendance_bitmap, result_import # Shared bulk upserts, attendance history
+from .access import request_access, with_access # Cached per-user role, class and child IDs
+from . import search # Full-text index over students, news and announcements
+from . import public_cache # Versioned cache for the public pages
+from . import conditional # ETag / Last-Modified validators (304 without rendering)
+from . import exports, jobs # Result export rows; background jobs (manage.py run_jobs)
+from . import report_cards as report_cards_module # Printable report cards (the view is named report_cards)
+from django.views.decorators.http import condition
+import os
+import zlib # For the gzip-compressed CSV variant
+from django.http import FileResponse, Http404, HttpResponse, StreamingHttpResponse # To stream the CSV file
 from .models import CarouselImage # Import
 
+# How many of a student's most recent results the dashboards show
+RECENT_RESULTS_LIMIT = 5
+# Matches shown per section of the site search page
+SEARCH_RESULTS_LIMIT = 20
+
+def recent_results_prefetch(lookup='results', limit=RECENT_RESULTS_LIMIT):
+    """
+    Prefetch only the newest `limit` results per student into `student.recent_results`.
+    Django turns the sliced queryset into a ROW_NUMBER() window query, so one query
+    fetches the top-N for every student and older results are never loaded.
+    """
+    recent_results = Result.objects.select_related('subject')[:limit] # Meta ordering: newest first
+    return Prefetch(lookup, queryset=recent_results, to_attr='recent_results')
+
+def dashboard_announcements(request):
+    """Announcements for the dashboards, 5 per page, keyset-paginated and served from the public cache."""
+    version = public_cache.version(public_cache.ANNOUNCEMENTS)
+    # Avoid a query per announcement author
+    paginator = KeysetPaginator(Announcement.objects.select_related('posted_by'), Announcement._meta.ordering, 5)
+    return public_cache.page(version, 'dashboard:announcements', paginator, request.GET)
+
 # Homepage view
+# Served from the public cache: in steady state an anonymous visit runs no database queries
+@condition(etag_func=conditional.home_etag, last_modified_func=conditional.home_last_modified)
 def home(request):
-    announcement_list = Announcement.objects.all()  # Get all, order is handled by model Meta
-    paginator = Paginator(announcement_list, 3)  # Show 3 announcements per page
+    version = public_cache.version(public_cache.ANNOUNCEMENTS, public_cache.CAROUSEL)
 
-    page_number = request.GET.get('page')
-    try:
-        announcements = paginator.page(page_number)
-    except PageNotAnInteger:
-        # If page is not an integer, deliver first page.
-        announcements = paginator.page(1)
-    except EmptyPage:
-        # If page is out of range (e.g. 9999), deliver last page of results.
-        announcements = paginator.page(paginator.num_pages)
+    # Show 3 announcements per page, keyset-paginated in the model Meta order.
+    # Malformed cursors deliver the first page.
+    paginator = KeysetPaginator(Announcement.objects.select_related('posted_by'), Announcement._meta.ordering, 3)
+    announcements = public_cache.page(version, 'home:announcements', paginator, request.GET)
 
     # Fetch active carousel images ordered correctly
-    carousel_images = CarouselImage.objects.filter(is_active=True).order_by('order')
+    carousel_images = public_cache.lazy(version, 'home:carousel', lambda: list(
+        CarouselImage.objects.filter(is_active=True).order_by('order')
+    ))
 
-    context = {'page_title': 'Homepage', 'announcements': announcements, 'carousel_images': carousel_images}
+    context = {
+        'page_title': 'Homepage',
+        'announcements': announcements,
+        'carousel_images': carousel_images,
+        'public_cache_version': version, # Keys the cached template fragment
+        'page_key': page_key(request.GET),
+        'public_cache_timeout': public_cache.timeout(),
+    }
     return render(request, 'home.html', context) # Assumes templates/home.html exists
 
 # Parent dashboard view
-@login_required
+@with_access(roles=['parent'], message=None) # Not a parent, redirect home
+@condition(etag_func=conditional.parent_dashboard_etag) # Unchanged dashboards answer 304
 def parent_dashboard(request):
-    try:
-        parent_profile = request.user.parentprofile
-    except ParentProfile.DoesNotExist:
-        # Not a parent, redirect home
-        return redirect('home')
-
-    children = request.user.children.all().prefetch_related('results', 'results__subject', 'current_class')
+    # Only the newest results are shown, so only those are prefetched (bounded per child)
+    children = list(Student.objects.filter(pk__in=request.access.child_ids).select_related('current_class').prefetch_related(recent_results_prefetch()))
 
     # --- Calculate Attendance Summaries ---
     # Define time window (e.g., last 14 days)
     end_date = timezone.now().date()
-    start_date = end_date - timedelta(days=14)
-
-    attendance_summary = {}
-    for child in children:
-        summary = AttendanceRecord.objects.filter(
-            student=child,
-            date__range=[start_date, end_date]  # Filter by date range
-        ).aggregate(
-            absent_count=Count('pk', filter=Q(status='ABSENT')),  # Count absences
-            late_count=Count('pk', filter=Q(status='LATE'))  # Count lates
-        )
-        attendance_summary[child.id] = summary
+    start_date = end_date - timedelta(days=conditional.PARENT_ATTENDANCE_DAYS)
+
+    # Counted from the children's compact attendance bitmaps in one query
+    attendance_summary = attendance_bitmap.range_counts([child.id for child in children], start_date, end_date)
     # --- End Attendance Summaries ---
 
     # --- Paginate Announcements ---
-    announcement_list = Announcement.objects.all()
-    paginator = Paginator(announcement_list, 5) # Show 5 per page on dashboards
-    page_number = request.GET.get('page')
-    try:
-        announcements = paginator.page(page_number)
-    except PageNotAnInteger:
-        announcements = paginator.page(1)
-    except EmptyPage:
-        announcements = paginator.page(paginator.num_pages)
+    announcements = dashboard_announcements(request)
     # --- End Pagination ---
 
     context = {
@@ -80,39 +96,30 @@ def parent_dashboard(request):
         'children_with_results': children,
         'announcements': announcements,
         'attendance_summary': attendance_summary,  # Add summary to context
-        'attendance_period_days': 14,  # Pass period to template
+        'attendance_period_days': conditional.PARENT_ATTENDANCE_DAYS,  # Pass period to template
         'page_title': 'Parent Dashboard'
     }
     return render(request, 'core/parent_dashboard.html', context) # Assumes templates/core/parent_dashboard.html exists
 
-@login_required
+@with_access(roles=['teacher'], message=None) # Not a teacher, redirect home
 def teacher_dashboard(request):
-    # Check if the logged-in user is a teacher
-    try:
-        teacher_profile = request.user.teacherprofile
-    except TeacherProfile.DoesNotExist:
-        # Not a teacher, redirect home
-        return redirect('home')
-
-    # Find classes where this user is the class_teacher
-    # Remember related_name='class_teacher_of' on SchoolClass.class_teacher?
-    assigned_classes = request.user.class_teacher_of.all().prefetch_related('students')
-    # Prefetch students to optimize DB queries
+    # Classes where this user is the class_teacher (IDs from the cached access context)
+    # Students are prefetched in one query and their 5 most recent results in one more
+    # (sliced Prefetch uses a window function), so the page cost does not grow with class size.
+    assigned_classes = list(SchoolClass.objects.filter(pk__in=request.access.class_ids).prefetch_related(
+        Prefetch('students', queryset=Student.objects.prefetch_related(recent_results_prefetch()))
+    ))
+    class_ids = [sc.id for sc in assigned_classes]
 
     # --- Get Today's Attendance Summary for Assigned Classes ---
+    # Read from the daily rollup: one row per assigned class
     today = timezone.now().date()
+    summaries = attendance.class_range_summaries(class_ids, today, today)
+
     attendance_today = {}
     for sc in assigned_classes:
-        summary = AttendanceRecord.objects.filter(
-            school_class=sc,
-            date=today
-        ).aggregate(
-            present_count=Count('pk', filter=Q(status='PRESENT')),
-            absent_count=Count('pk', filter=Q(status='ABSENT')),
-            late_count=Count('pk', filter=Q(status='LATE')),
-            excused_count=Count('pk', filter=Q(status='EXCUSED'))
-        )
-        total_students = sc.students.count()  # Get total students in class
+        summary = summaries[sc.id]
+        total_students = len(sc.students.all())  # Uses the prefetched students, no extra query
         summary['total_students'] = total_students
         summary['not_recorded'] = total_students - (
                     summary['present_count'] + summary['absent_count'] + summary['late_count'] + summary[
@@ -120,19 +127,14 @@ def teacher_dashboard(request):
         attendance_today[sc.id] = summary
     # --- End Today's Summary ---
 
+    # --- Class Averages for all assigned classes in one grouped query ---
+    class_averages = SchoolClass.term_subject_averages_for(class_ids)
+
     # Optional: Gather all students from those classes
     # students_in_classes = Student.objects.filter(current_class__in=assigned_classes).order_by('last_name', 'first_name')
 
     # --- Paginate Announcements ---
-    announcement_list = Announcement.objects.all()
-    paginator = Paginator(announcement_list, 5) # Show 5 per page
-    page_number = request.GET.get('page')
-    try:
-        announcements = paginator.page(page_number)
-    except PageNotAnInteger:
-        announcements = paginator.page(1)
-    except EmptyPage:
-        announcements = paginator.page(paginator.num_pages)
+    announcements = dashboard_announcements(request)
     # --- End Pagination ---
 
     context = {
@@ -140,6 +142,7 @@ def teacher_dashboard(request):
         'assigned_classes': assigned_classes, # Pass the classes queryset
         # 'students_in_classes': students_in_classes, # Alternative/additional way to pass students
         'attendance_today': attendance_today,  # Add today's summary
+        'class_averages': class_averages, # {class_id: {term: {subject: average}}}
         'announcements': announcements,
         'page_title': 'Teacher Dashboard'
     }
@@ -177,13 +180,14 @@ def add_edit_result(request, student_id=None, result_id=None):
         'page_title': 'Edit Result' if result else 'Add New Result',
     })
 
-@login_required
+@with_access()
 def dashboard_redirect(request):
-    if hasattr(request.user, 'parentprofile'):
+    access = request.access
+    if access.is_parent:
         return redirect('parent_dashboard')
-    elif hasattr(request.user, 'teacherprofile'):
+    elif access.is_teacher:
         return redirect('teacher_dashboard')
-    elif request.user.is_staff: # Or is_superuser
+    elif access.is_staff: # Or is_superuser
         # Redirect staff/admin to the Django admin index
         return redirect('admin:index') # Use admin namespace
     else:
@@ -192,30 +196,17 @@ def dashboard_redirect(request):
         return redirect('home') # Or a specific "pending" page
 
 
-@login_required
+@with_access()
 def delete_result(request, result_id):
     # Get the result object or return 404
-    result = get_object_or_404(Result, pk=result_id)
+    result = get_object_or_404(Result.objects.select_related('student', 'subject'), pk=result_id)
     student_name = result.student.full_name # Get student name for messages before deleting
 
     # --- Permission Check ---
     # Allow deletion only by staff or the teacher assigned to the student's current class
-    is_authorized = False
-    if request.user.is_staff:
-        is_authorized = True
-    else:
-        try:
-            teacher_profile = request.user.teacherprofile
-            # Check if teacher is assigned to the student's current class
-            if result.student.current_class in request.user.class_teacher_of.all():
-                 is_authorized = True
-            # Optional: Add check if teacher recorded this specific result?
-            # elif result.recorded_by == request.user:
-            #     is_authorized = True
-        except TeacherProfile.DoesNotExist:
-            pass # User is not a teacher
-
-    if not is_authorized:
+    # Optional: Add check if teacher recorded this specific result?
+    # (result.recorded_by_id == request.user.pk)
+    if not request.access.can_manage_class(result.student.current_class_id):
         messages.error(request, "You do not have permission to delete this result.")
         return redirect('teacher_dashboard') # Or wherever appropriate
 
@@ -233,40 +224,20 @@ def delete_result(request, result_id):
         return render(request, 'core/result_delete_confirm.html', context)
 
 
-@login_required
+@with_access()
 def student_profile(request, student_id):
     student = get_object_or_404(Student.objects.prefetch_related('parents'), pk=student_id) # Prefetch parents
 
     # --- Authorization Check ---
-    is_authorized = False
-    user = request.user
-
-    if user.is_staff: # Staff can see any profile
-        is_authorized = True
-    elif hasattr(user, 'parentprofile'): # Check if user is a parent
-        # Check if this user is listed as one of the student's parents
-        if user in student.parents.all():
-            is_authorized = True
-    elif hasattr(user, 'teacherprofile'): # Check if user is a teacher
-        # Check if teacher is assigned to the student's current class
-        if student.current_class in user.class_teacher_of.all():
-            is_authorized = True
-        # Optional: Add other checks, e.g., if teacher recorded results for this student?
-        # elif Result.objects.filter(student=student, recorded_by=user).exists():
-        #     is_authorized = True
-
-    if not is_authorized:
+    # Staff can see any profile, parents their own children, teachers the students of their classes
+    # Optional: Add other checks, e.g., if teacher recorded results for this student?
+    if not request.access.can_view_student(student):
         # Option 1: Show generic 404 (less informative but hides info)
         # raise Http404("Student profile not found or permission denied.")
         # Option 2: Redirect with message (more user-friendly)
         messages.error(request, "You do not have permission to view this student's profile.")
         # Redirect to their own dashboard or home
-        if hasattr(user, 'parentprofile'):
-            return redirect('parent_dashboard')
-        elif hasattr(user, 'teacherprofile'):
-            return redirect('teacher_dashboard')
-        else:
-            return redirect('home')
+        return redirect(request.access.home_url_name())
 
     # Get results separately if needed, or assume they are handled elsewhere
     # student_results = student.results.all().order_by('-date_recorded')
@@ -291,20 +262,40 @@ def student_profile(request, student_id):
         date__range=[start_date, end_date]
     ).order_by('-date') # Order most recent first within the range
 
-    # --- Calculate Summary for the Filtered Range ---
-    attendance_summary = attendance_records.aggregate(
-        present_count=Count('pk', filter=Q(status='PRESENT')),
-        absent_count=Count('pk', filter=Q(status='ABSENT')),
-        late_count=Count('pk', filter=Q(status='LATE')),
-        excused_count=Count('pk', filter=Q(status='EXCUSED'))
-    )
+    # --- Summary, year overview and heatmap from the compact attendance bitmaps ---
+    # One query for every academic year the range and today touch; no AttendanceRecord scan
+    today = timezone.now().date()
+    current_year = attendance_bitmap.academic_year_of(today)
+    years = set(attendance_bitmap.years_between(start_date, end_date)) | {current_year}
+    histories = attendance_bitmap.load_years([student.pk], years)
+
+    attendance_summary = attendance_bitmap.empty_counts()
+    for (_, year), history in histories.items():
+        for field, count in history.counts(start_date, end_date).items():
+            attendance_summary[field] += count
+
+    year_history = histories.get((student.pk, current_year))
+    if year_history is not None:
+        year_counts = year_history.counts(end_date=today)
+        attendance_year = {
+            'label': f"{current_year}-{current_year + 1}",
+            'counts': year_counts,
+            'rate': attendance_bitmap.attendance_rate(year_counts),
+            'streaks': attendance_bitmap.streaks(year_history, until=today),
+            'heatmap': attendance_bitmap.heatmap(year_history, until=today),
+        }
+    else:
+        attendance_year = None
     # --- End Attendance Fetching/Summary ---
 
     context = {
         'student': student,
+        'access': request.access, # Role flags for the template's action links
+        'teaches_student_class': request.access.teaches(student.current_class_id),
         # 'results': student_results, # Could pass results here too if desired
         'attendance_records': attendance_records, # Pass filtered records
         'attendance_summary': attendance_summary, # Pass summary for the range
+        'attendance_year': attendance_year, # Rate, streaks and heatmap for the current academic year
         'start_date': start_date, # Pass dates back for form pre-filling
         'end_date': end_date,
         'start_date_str': start_date.strftime('%Y-%m-%d'), # Pass string versions too
@@ -313,18 +304,12 @@ def student_profile(request, student_id):
     }
     return render(request, 'core/student_profile.html', context)
 
-@login_required
+@with_access(roles=['teacher'])
 def take_attendance(request, class_id):
-    # Ensure user is a teacher and assigned to this class
-    try:
-        teacher_profile = request.user.teacherprofile
-    except TeacherProfile.DoesNotExist:
-        messages.error(request, "You do not have permission to access this page.")
-        return redirect('home')
-
+    # Ensure user is a teacher (decorator) and assigned to this class
     school_class = get_object_or_404(SchoolClass, pk=class_id)
 
-    if school_class not in request.user.class_teacher_of.all():
+    if not request.access.teaches(school_class.pk):
         messages.error(request, f"You are not assigned to class {school_class}.")
         return redirect('teacher_dashboard')
 
@@ -338,60 +323,30 @@ def take_attendance(request, class_id):
         attendance_date = timezone.now().date() # Fallback to today if parse fails
         attendance_date_str = attendance_date.strftime('%Y-%m-%d')
 
-    # Get existing records for this class & date to pre-fill form
-    existing_records = AttendanceRecord.objects.filter(
-        school_class=school_class,
-        date=attendance_date
-    ).values('student_id', 'status', 'notes') # Get relevant data efficiently
-
-    existing_status = {record['student_id']: {'status': record['status'], 'notes': record['notes']} for record in existing_records}
+    # Get existing records for this class & date to pre-fill form (one query)
+    existing = attendance.existing_register(school_class, [attendance_date])
+    existing_status = {
+        student_id: {'status': status, 'notes': notes}
+        for (student_id, _), (status, notes) in existing.items()
+    }
 
     if request.method == 'POST':
+        entries = {}
+        for student in students:
+            status = request.POST.get(f'status_{student.id}')
+            notes = request.POST.get(f'notes_{student.id}', '') # Get notes, default to empty string
+            if status: # Only process if a status was submitted for the student
+                entries[(student.id, attendance_date)] = (status, notes)
         try:
-            # Use atomic transaction to save all records or none
-            with transaction.atomic():
-                records_to_update = []
-                records_to_create = []
-                for student in students:
-                    status = request.POST.get(f'status_{student.id}')
-                    notes = request.POST.get(f'notes_{student.id}', '') # Get notes, default to empty string
-
-                    if status: # Only process if a status was submitted for the student
-                        record_data = {
-                            'student': student,
-                            'date': attendance_date,
-                            'status': status,
-                            'notes': notes,
-                            'recorded_by': request.user,
-                            'school_class': school_class
-                        }
-
-                        # Check if record exists to update or create
-                        existing = existing_status.get(student.id)
-                        if existing:
-                            # Update existing record only if status or notes changed
-                            if existing['status'] != status or existing['notes'] != notes:
-                                record_to_update = AttendanceRecord.objects.get(student=student, date=attendance_date)
-                                record_to_update.status = status
-                                record_to_update.notes = notes
-                                record_to_update.recorded_by = request.user # Update recorder
-                                records_to_update.append(record_to_update)
-                        else:
-                            # Create new record instance
-                            records_to_create.append(AttendanceRecord(**record_data))
-
-                # Bulk update existing records that changed
-                if records_to_update:
-                    AttendanceRecord.objects.bulk_update(records_to_update, ['status', 'notes', 'recorded_by'])
-
-                # Bulk create new records
-                if records_to_create:
-                    AttendanceRecord.objects.bulk_create(records_to_create)
-
+            # Single upsert on (student, date): concurrent saves of the same register cannot collide
+            attendance.save_register(school_class, entries, recorded_by=request.user, existing=existing)
+        except ValueError as e:
+            messages.error(request, f"Attendance was not saved: {e}")
+        except DatabaseError as e:
+            messages.error(request, f"An error occurred while saving attendance: {e}")
+        else:
             messages.success(request, f"Attendance for {school_class} on {attendance_date.strftime('%Y-%m-%d')} saved successfully.")
             return redirect('teacher_dashboard') # Redirect back after saving
-        except Exception as e:
-             messages.error(request, f"An error occurred while saving attendance: {e}")
 
 
     # Prepare initial data for the template (pre-fill from existing records)
@@ -410,18 +365,141 @@ def take_attendance(request, class_id):
     }
     return render(request, 'core/take_attendance_form.html', context)
 
-@login_required
+@with_access(roles=['teacher'])
+def take_weekly_attendance(request, class_id):
+    """Whole-week register (Monday to Friday) for one class, saved in one submission."""
+    school_class = get_object_or_404(SchoolClass, pk=class_id)
+
+    if not request.access.teaches(school_class.pk):
+        messages.error(request, f"You are not assigned to class {school_class}.")
+        return redirect('teacher_dashboard')
+
+    students = list(Student.objects.filter(current_class=school_class).order_by('last_name', 'first_name'))
+
+    # Any date picks its week; default to the current week
+    week_of = parse_date(request.GET.get('week', '')) or timezone.now().date()
+    days = attendance.week_dates(week_of)
+    existing = attendance.existing_register(school_class, days)
+
+    if request.method == 'POST':
+        entries = {}
+        for student in students:
+            for day in days:
+                status = request.POST.get(f'status_{student.id}_{day:%Y%m%d}')
+                if status: # Blank cells are left as they are
+                    notes = existing.get((student.id, day), (None, ''))[1] # Notes are edited on the daily page
+                    entries[(student.id, day)] = (status, notes)
+        try:
+            saved = attendance.save_register(school_class, entries, recorded_by=request.user, existing=existing)
+        except ValueError as e:
+            messages.error(request, f"Attendance was not saved: {e}")
+        except DatabaseError as e:
+            messages.error(request, f"An error occurred while saving attendance: {e}")
+        else:
+            messages.success(request, f"Attendance for {school_class}, week of {days[0]:%Y-%m-%d}: {saved} records saved.")
+            return redirect(f"{request.path}?week={days[0]:%Y-%m-%d}")
+
+    # One row per student: [(day, field name, current status or '')]
+    register = [
+        (student, [
+            (day, f'status_{student.id}_{day:%Y%m%d}', existing.get((student.id, day), ('', ''))[0])
+            for day in days
+        ])
+        for student in students
+    ]
+
+    context = {
+        'school_class': school_class,
+        'days': days,
+        'register': register,
+        'week_str': days[0].strftime('%Y-%m-%d'),
+        'previous_week_str': (days[0] - timedelta(days=7)).strftime('%Y-%m-%d'),
+        'next_week_str': (days[0] + timedelta(days=7)).strftime('%Y-%m-%d'),
+        'status_choices': AttendanceRecord.STATUS_CHOICES,
+        'page_title': f'Weekly Attendance for {school_class}'
+    }
+    return render(request, 'core/take_weekly_attendance.html', context)
+
+@with_access(roles=['teacher'])
+def gradebook(request, class_id):
+    """
+    Mark entry grid for one class x subject x term: every student on one screen.
+    Existing marks load in one query; saving validates every cell and writes the
+    changed rows with a single bulk upsert on the Result unique key.
+    """
+    school_class = get_object_or_404(SchoolClass, pk=class_id)
+
+    if not request.access.teaches(school_class.pk):
+        messages.error(request, f"You are not assigned to class {school_class}.")
+        return redirect('teacher_dashboard')
+
+    # Subject and term come from the query string on both GET and POST
+    select_form = GradebookSelectForm(request.GET or None)
+    context = {
+        'school_class': school_class,
+        'select_form': select_form,
+        # Terms already used in this class, offered as suggestions (result_class_term_subj_idx)
+        'term_options': Result.objects.filter(school_class=school_class)
+                        .order_by('term_exam_name').values_list('term_exam_name', flat=True).distinct(),
+        'page_title': f'Gradebook for {school_class}',
+    }
+    if not select_form.is_valid():
+        return render(request, 'core/gradebook.html', context)
+
+    subject = select_form.cleaned_data['subject']
+    term = select_form.cleaned_data['term_exam_name']
+    students = list(Student.objects.filter(current_class=school_class).order_by('last_name', 'first_name'))
+
+    # Existing marks for the whole grid in one query
+    existing = {
+        row['student_id']: (row['score'], row['grade'], row['comments'])
+        for row in Result.objects.filter(
+            student__current_class=school_class, subject=subject, term_exam_name=term
+        ).values('student_id', 'score', 'grade', 'comments')
+    }
+
+    if request.method == 'POST':
+        form = GradebookForm(students, request.POST)
+        if form.is_valid():
+            entries = form.entries()
+            # Only rows that differ from what is stored are written; emptied rows delete their result
+            changed = [
+                (student_id, subject.pk, school_class.pk, term, score, grade, comments)
+                for student_id, (score, grade, comments) in entries.items()
+                if (score, grade, comments) != form.BLANK and existing.get(student_id) != (score, grade, comments)
+            ]
+            cleared = [student_id for student_id, row in entries.items() if row == form.BLANK and student_id in existing]
+            with transaction.atomic():
+                result_import.apply_rows(changed, recorded_by=request.user) # One upsert
+                Result.objects.filter(student__in=cleared, subject=subject, term_exam_name=term).delete()
+            message = f"Saved {len(changed)} {subject.name} results for {school_class} ({term})."
+            if cleared:
+                message += f" Deleted {len(cleared)} emptied results."
+            messages.success(request, message)
+            return redirect(f"{request.path}?{request.GET.urlencode()}")
+        messages.error(request, "Some marks are invalid; nothing was saved. Please correct the highlighted cells.")
+    else:
+        initial = {}
+        for student_id, (score, grade, comments) in existing.items():
+            initial[f'score_{student_id}'] = score
+            initial[f'grade_{student_id}'] = grade
+            initial[f'comments_{student_id}'] = comments
+        form = GradebookForm(students, initial=initial)
+
+    context.update({
+        'subject': subject,
+        'term': term,
+        'form': form,
+        'page_title': f'Gradebook for {school_class}: {subject.name} ({term})',
+    })
+    return render(request, 'core/gradebook.html', context)
+
+@with_access(roles=['teacher'])
 def view_class_attendance(request, class_id):
     # --- Permission Checks ---
-    try:
-        teacher_profile = request.user.teacherprofile
-    except TeacherProfile.DoesNotExist:
-        messages.error(request, "You do not have permission to access this page.")
-        return redirect('home')
-
     school_class = get_object_or_404(SchoolClass, pk=class_id)
 
-    if school_class not in request.user.class_teacher_of.all():
+    if not request.access.teaches(school_class.pk):
         messages.error(request, f"You are not assigned to class {school_class}.")
         return redirect('teacher_dashboard')
 
@@ -445,13 +523,8 @@ def view_class_attendance(request, class_id):
         'student'
     ).order_by('-date', 'student__last_name', 'student__first_name')
 
-    # --- Calculate Summary for the Period (Optional but nice) ---
-    attendance_summary = attendance_records.aggregate(
-        present_count=Count('pk', filter=Q(status='PRESENT')),
-        absent_count=Count('pk', filter=Q(status='ABSENT')),
-        late_count=Count('pk', filter=Q(status='LATE')),
-        excused_count=Count('pk', filter=Q(status='EXCUSED'))
-    )
+    # --- Calculate Summary for the Period from the daily rollup (one row per day) ---
+    attendance_summary = attendance.class_range_summaries([school_class.id], start_date, end_date)[school_class.id]
 
     context = {
         'school_class': school_class,
@@ -465,146 +538,239 @@ def view_class_attendance(request, class_id):
     }
     return render(request, 'core/view_class_attendance.html', context)
 
-@login_required
+@staff_member_required
+def absence_report(request):
+    """Whole-school chronic absence for one academic year, computed from the attendance bitmaps."""
+    current_year = attendance_bitmap.academic_year_of(timezone.now().date())
+    try:
+        year = int(request.GET.get('year', current_year))
+        threshold = float(request.GET.get('threshold', 10))
+    except ValueError:
+        year, threshold = current_year, 10.0
+
+    flagged = attendance_bitmap.school_absence_rates(year, threshold=threshold)
+    by_class = {}
+    for row in flagged:
+        class_name = row['class_name'] or 'Not Assigned'
+        by_class[class_name] = by_class.get(class_name, 0) + 1
+
+    context = {
+        'flagged': flagged,
+        'by_class': sorted(by_class.items(), key=lambda item: (-item[1], item[0])),
+        'year': year,
+        'year_label': f"{year}-{year + 1}",
+        'threshold': threshold,
+        'page_title': 'Chronic Absence Report',
+    }
+    return render(request, 'core/absence_report.html', context)
+
+# --- Report Cards ---
+@with_access(roles=['teacher', 'staff'], message="Only teachers and staff can print report cards.")
+def report_cards(request):
+    """Batch report cards for one or more classes: queued as a background job, downloaded as a zip."""
+    classes = SchoolClass.objects.order_by('-academic_year', 'name')
+    if not request.access.is_staff:
+        classes = classes.filter(pk__in=request.access.class_ids) # Teachers: their own classes
+    class_ids = list(classes.values_list('pk', flat=True))
+    form = ReportCardForm(
+        classes, report_cards_module.terms_for(class_ids),
+        request.POST or None, initial={'classes': request.GET.getlist('class')},
+    )
+    if request.method == 'POST' and form.is_valid():
+        selected = form.cleaned_data['classes']
+        job = jobs.enqueue('report_cards', {
+            'class_ids': [school_class.pk for school_class in selected],
+            'term': form.cleaned_data['term_exam_name'],
+        }, user=request.user)
+        messages.info(request, f"Report cards for {len(selected)} class(es) are being generated.")
+        return redirect('job_status', job_id=job.pk)
+    context = {
+        'form': form,
+        'page_title': 'Report Cards',
+    }
+    return render(request, 'core/report_cards.html', context)
+
+@with_access()
+def student_report_card(request, student_id):
+    """One student's printable report card for `?term=`."""
+    student = get_object_or_404(Student, pk=student_id)
+    if not request.access.can_view_student(student):
+        messages.error(request, "You do not have permission to view this student's report card.")
+        return redirect(request.access.home_url_name())
+    term = request.GET.get('term', '')
+    cards = report_cards_module.collect(Student.objects.filter(pk=student.pk), term) if term else []
+    if not cards or not cards[0]['results']:
+        messages.error(request, f"No results recorded for {student.full_name} in '{term}'.")
+        return redirect('student_profile', student_id=student.pk)
+    body = report_cards_module.render_card(cards[0])
+    return HttpResponse(report_cards_module.render_document(f"Report card: {student.full_name} - {term}", [body]))
+# --- End Report Cards ---
+
+# --- Streaming CSV Export Helpers ---
+def _stream_csv(request, filename, header, rows):
+    """
+    Stream `header` + `rows` as a CSV download. Nothing is buffered beyond the current
+    chunk, so memory stays flat and the first bytes go out immediately.
+    `?compress=gzip` streams a gzip-compressed `.csv.gz` instead.
+    """
+    lines = exports.csv_lines(header, rows)
+
+    if request.GET.get('compress') == 'gzip':
+        response = StreamingHttpResponse(_gzip_stream(lines), content_type='application/gzip')
+        filename = f"{filename}.csv.gz"
+    else:
+        response = StreamingHttpResponse(lines, content_type='text/csv')
+        filename = f"{filename}.csv"
+    response['Content-Disposition'] = f'attachment; filename="{filename}"'
+    return response
+
+def _gzip_stream(lines, flush_bytes=64 * 1024):
+    """Incrementally gzip an iterable of text lines, yielding compressed blocks of roughly `flush_bytes`."""
+    compressor = zlib.compressobj(6, zlib.DEFLATED, 31) # wbits=31 -> gzip container
+    pending = []
+    pending_size = 0
+    for line in lines:
+        data = line.encode('utf-8')
+        pending.append(data)
+        pending_size += len(data)
+        if pending_size >= flush_bytes:
+            block = compressor.compress(b''.join(pending))
+            pending, pending_size = [], 0
+            if block:
+                yield block
+    yield compressor.compress(b''.join(pending)) + compressor.flush()
+# --- End Streaming CSV Export Helpers ---
+
+@with_access()
 def export_class_results_csv(request, class_id):
     # --- Permission Check ---
     # Ensure user is staff or the assigned teacher for this class
     school_class = get_object_or_404(SchoolClass, pk=class_id)
-    is_authorized = False
-    if request.user.is_staff:
-        is_authorized = True
-    elif hasattr(request.user, 'teacherprofile'):
-        if school_class in request.user.class_teacher_of.all():
-            is_authorized = True
-
-    if not is_authorized:
+
+    if not request.access.can_manage_class(school_class.pk):
         messages.error(request, f"You do not have permission to export results for {school_class}.")
         # Redirect based on role
-        if hasattr(request.user, 'teacherprofile'):
+        if request.access.is_teacher:
             return redirect('teacher_dashboard')
-        elif request.user.is_staff:
+        elif request.access.is_staff:
              # Admins could perhaps be redirected to the admin page for the class?
              # return redirect('admin:core_schoolclass_changelist') # Example
              return redirect('admin:index')
         else:
             return redirect('home')
 
-    # --- Prepare CSV Response ---
-    response = HttpResponse(
-        content_type='text/csv',
-        headers={'Content-Disposition': f'attachment; filename="results_{school_class.name}_{school_class.academic_year}.csv"'},
-    )
+    # --- Background Export (?background=1): prepare the file in a job, download it when ready ---
+    if request.GET.get('background'):
+        job = jobs.enqueue('export_class_results', {'class_id': school_class.pk}, user=request.user)
+        messages.info(request, f"The results export for {school_class} is being prepared.")
+        return redirect('job_status', job_id=job.pk)
 
-    writer = csv.writer(response)
-    # Write Header Row
-    writer.writerow([
-        'Student ID', 'Student Name', 'Subject', 'Term/Exam',
-        'Score', 'Grade', 'Comments', 'Date Recorded', 'Recorded By'
-    ])
-
-    # --- Get Data ---
-    # Get all students currently in the class
-    students_in_class = Student.objects.filter(current_class=school_class)
-    # Get all results for those students, ordered nicely
-    results = Result.objects.filter(
-        student__in=students_in_class
-    ).select_related( # Optimize related lookups
-        'student', 'subject', 'recorded_by'
-    ).order_by(
-        'student__last_name', 'student__first_name', 'subject__name', 'term_exam_name'
-    )
+    # --- Stream the CSV Response ---
+    # Plain tuples straight from the cursor (no model instances), fetched in chunks
+    return _stream_csv(request, *exports.class_results(school_class))
 
-    # --- Write Data Rows ---
-    for result in results:
-        writer.writerow([
-            result.student.student_id,
-            result.student.full_name,
-            result.subject.name,
-            result.term_exam_name,
-            result.score,
-            result.grade,
-            result.comments,
-            result.date_recorded.strftime('%Y-%m-%d %H:%M') if result.date_recorded else '', # Format date
-            result.recorded_by.username if result.recorded_by else 'N/A'
-        ])
-
-    return response
-
-@login_required
+@with_access(roles=['parent'], message="You must be logged in as a parent to export results.")
 def export_parent_results_csv(request):
-    # --- Permission Check ---
-    # Ensure user is a parent
-    try:
-        parent_profile = request.user.parentprofile
-    except ParentProfile.DoesNotExist:
-        messages.error(request, "You must be logged in as a parent to export results.")
-        return redirect('home') # Or dashboard redirect
-
     # --- Get Parent's Children ---
-    children = request.user.children.all() # Get all children linked to this parent user
-    if not children.exists():
+    children = request.access.child_ids # IDs of all children linked to this parent user
+    if not children:
         messages.info(request, "No children found associated with your account.")
         return redirect('parent_dashboard') # Redirect back if no children
 
-    # --- Prepare CSV Response ---
-    # Create a filename (can be generic or include parent username)
-    parent_name = request.user.username
-    filename = f"results_children_of_{parent_name}.csv"
-    response = HttpResponse(
-        content_type='text/csv',
-        headers={'Content-Disposition': f'attachment; filename="{filename}"'},
-    )
-
-    writer = csv.writer(response)
-    # Write Header Row
-    writer.writerow([
-        'Child Name', 'Child Student ID', 'Class', 'Subject', 'Term/Exam',
-        'Score', 'Grade', 'Comments', 'Date Recorded'
-    ])
-
-    # --- Get Data ---
-    # Get all results for ALL children of this parent
-    results = Result.objects.filter(
-        student__in=children # Filter results for the parent's children
-    ).select_related(
-        'student', 'subject', 'school_class' # Optimize related lookups
-    ).order_by(
-        'student__last_name', 'student__first_name', 'subject__name', 'term_exam_name'
-    )
-
-    # --- Write Data Rows ---
-    for result in results:
-        writer.writerow([
-            result.student.full_name,
-            result.student.student_id,
-            result.school_class.name if result.school_class else 'N/A', # Handle potential null class
-            result.subject.name,
-            result.term_exam_name,
-            result.score,
-            result.grade,
-            result.comments,
-            result.date_recorded.strftime('%Y-%m-%d %H:%M') if result.date_recorded else '',
-        ])
+    # --- Background Export (?background=1) ---
+    if request.GET.get('background'):
+        job = jobs.enqueue('export_parent_results', {'child_ids': sorted(children)}, user=request.user)
+        messages.info(request, "Your children's results export is being prepared.")
+        return redirect('job_status', job_id=job.pk)
+
+    # --- Stream the CSV Response ---
+    # All results for ALL children of this parent, as plain tuples fetched in chunks
+    return _stream_csv(request, *exports.parent_results(request.user.username, children))
+
+# --- Background Job Status and Download ---
+@with_access()
+def job_status(request, job_id):
+    job = get_object_or_404(Job, pk=job_id)
+    if not jobs.can_view(job, request.user):
+        messages.error(request, "You do not have permission to view this job.")
+        return redirect('dashboard')
+    context = {
+        'job': job,
+        'job_title': jobs.title(job),
+        'page_title': 'Background Job',
+    }
+    return render(request, 'core/job_status.html', context)
+
+@with_access()
+def job_download(request, job_id):
+    job = get_object_or_404(Job, pk=job_id)
+    if not jobs.can_view(job, request.user):
+        messages.error(request, "You do not have permission to download this file.")
+        return redirect('dashboard')
+    if job.status != 'done' or not job.result_name:
+        raise Http404("This job has no file to download.")
+    storage = jobs.result_storage()
+    if not storage.exists(job.result_name):
+        raise Http404("This file has expired.")
+    return FileResponse(storage.open(job.result_name, 'rb'), as_attachment=True,
+                        filename=os.path.basename(job.result_name))
+# --- End Background Job Status and Download ---
+
+# --- Site Search ---
+def site_search(request):
+    """
+    Search news and announcements (everyone) and students (staff: all, teachers:
+    their classes, parents: their children) through the full-text index.
+    """
+    query = request.GET.get('q', '').strip()[:200]
+    students = news_articles = announcements = None
+    if query:
+        news_articles = list(search.matching(NewsArticle.objects.all(), search.NEWS, query)[:SEARCH_RESULTS_LIMIT])
+        announcements = list(search.matching(
+            Announcement.objects.select_related('posted_by'), search.ANNOUNCEMENT, query
+        )[:SEARCH_RESULTS_LIMIT])
+        if request.user.is_authenticated:
+            access = request_access(request)
+            visible = Student.objects.select_related('current_class')
+            # Same rules as the student profile (AccessContext.can_view_student)
+            if access.is_staff:
+                pass
+            elif access.is_parent:
+                visible = visible.filter(pk__in=access.child_ids)
+            elif access.is_teacher:
+                visible = visible.filter(current_class__in=access.class_ids)
+            else:
+                visible = visible.none()
+            students = list(search.matching(visible, search.STUDENT, query).order_by('last_name', 'first_name', 'pk')[:SEARCH_RESULTS_LIMIT])
 
-    return response
+    context = {
+        'query': query,
+        'students': students,
+        'news_articles': news_articles,
+        'announcements': announcements,
+        'results_limit': SEARCH_RESULTS_LIMIT,
+        'page_title': 'Search',
+    }
+    return render(request, 'core/search.html', context)
+# --- End Site Search ---
 
 # --- View for the News Listing Page ---
+@condition(etag_func=conditional.news_list_etag, last_modified_func=conditional.news_last_modified)
 def news_list(request):
-    news_article_list = NewsArticle.objects.all().prefetch_related('images') # Prefetch images
+    version = public_cache.version(public_cache.NEWS)
+    news_article_list = NewsArticle.objects.select_related('author').prefetch_related('images') # Prefetch images
 
     # Optional Pagination for news list
-    paginator = Paginator(news_article_list, 5) # Show 5 articles per page
-    page_number = request.GET.get('page')
-    try:
-        news_articles = paginator.page(page_number)
-    except PageNotAnInteger:
-        news_articles = paginator.page(1)
-    except EmptyPage:
-        news_articles = paginator.page(paginator.num_pages)
+    # Show 5 articles per page (keyset pagination), each page cached with its images
+    paginator = KeysetPaginator(news_article_list, NewsArticle._meta.ordering, 5)
+    news_articles = public_cache.page(version, 'news:list', paginator, request.GET)
 
     context = {
         'news_articles': news_articles, # Pass paginated articles
-        'page_title': 'School News'
+        'page_title': 'School News',
+        'public_cache_version': version,
+        'page_key': page_key(request.GET),
+        'public_cache_timeout': public_cache.timeout(),
     }
     # Use a Django template, not a static file
     return render(request, 'core/news_list.html', context)
@@ -615,11 +781,19 @@ def news_list(request):
 #     context = {'article': article, 'page_title': article.title}
 #     return render(request, 'core/news_detail.html', context)
 
+@condition(etag_func=conditional.news_detail_etag, last_modified_func=conditional.news_last_modified)
 def news_detail(request, article_id):
-    # Prefetch images when getting the single article
-    article = get_object_or_404(NewsArticle.objects.prefetch_related('images'), pk=article_id)
+    version = public_cache.version(public_cache.NEWS)
+    # Prefetch images when getting the single article; cached until the news changes
+    article = public_cache.get_or_build(version, f'news:article{article_id}', lambda: (
+        NewsArticle.objects.select_related('author').prefetch_related('images').filter(pk=article_id).first()
+    ))
+    if article is None:
+        raise Http404("No NewsArticle matches the given query.")
     context = {
         'article': article,
-        'page_title': article.title  # Use article title for page title
+        'page_title': article.title,  # Use article title for page title
+        'public_cache_version': version,
+        'public_cache_timeout': public_cache.timeout(),
     }
     return render(request, 'core/news_detail.html', context)
\ No newline at end of file
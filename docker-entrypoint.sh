@@ -0,0 +1,18 @@
+#!/bin/sh
+# Start the web server (default) or the background job worker from the same image:
+#   docker run IMAGE            -> Gunicorn on port 8000
+#   docker run IMAGE worker     -> manage.py run_jobs (exports, imports, report cards, images)
+# Anything else is run as a command (e.g. `docker run IMAGE python manage.py migrate`).
+set -e
+
+case "$1" in
+    web)
+        exec gunicorn --bind "0.0.0.0:${PORT:-8000}" school_system.wsgi:application
+        ;;
+    worker)
+        exec python manage.py run_jobs --workers "${JOBS_WORKERS:-2}"
+        ;;
+    *)
+        exec "$@"
+        ;;
+esac